@@ -0,0 +1,175 @@
+import json
+import mmap
+import numpy as np
+
+# Formato de arquivo colunar usado pelos artefatos binários do build:
+#   8 bytes de assinatura, 8 bytes com o tamanho do cabeçalho JSON,
+#   o cabeçalho e, em seguida, cada coluna alinhada em 8 bytes.
+# O cabeçalho descreve dtype, deslocamento e tamanho de cada coluna, de modo
+# que a leitura é só um mmap e fatias sobre ele, sem nenhum parsing de dados.
+ASSINATURA = b'ARMZ0001'
+
+
+def escrever_colunas(caminho, colunas, cabecalho=None):
+    """Grava um dicionário nome -> array numpy no formato colunar."""
+    cabecalho = dict(cabecalho or {})
+    cabecalho["colunas"] = {}
+
+    deslocamento = 0
+    arrays = []
+    for nome, array in colunas.items():
+        array = np.ascontiguousarray(array)
+        cabecalho["colunas"][nome] = {
+            "dtype": array.dtype.str,
+            "deslocamento": deslocamento,
+            "tamanho": int(array.size),
+        }
+        arrays.append(array)
+        deslocamento += -(-array.nbytes // 8) * 8
+
+    dados_cabecalho = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+    dados_cabecalho += b' ' * (-len(dados_cabecalho) % 8)
+
+    with open(caminho, 'wb') as f:
+        f.write(ASSINATURA)
+        f.write(np.uint64(len(dados_cabecalho)).tobytes())
+        f.write(dados_cabecalho)
+        for array in arrays:
+            f.write(array.tobytes())
+            f.write(b'\0' * (-array.nbytes % 8))
+
+
+def ler_colunas(caminho):
+    """Mapeia o arquivo em memória; retorna (cabeçalho, colunas, mmap).
+
+    As colunas são views somente leitura sobre o mmap: as páginas só são
+    lidas quando acessadas e podem ser compartilhadas entre processos.
+    """
+    with open(caminho, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapa[:8] != ASSINATURA:
+        raise ValueError(f"{caminho} não é um arquivo colunar válido")
+    tamanho_cabecalho = int(np.frombuffer(mapa, dtype=np.uint64, count=1, offset=8)[0])
+    cabecalho = json.loads(mapa[16:16 + tamanho_cabecalho].decode('utf-8'))
+
+    inicio = 16 + tamanho_cabecalho
+    colunas = {}
+    for nome, info in cabecalho["colunas"].items():
+        colunas[nome] = np.frombuffer(
+            mapa, dtype=np.dtype(info["dtype"]), count=info["tamanho"],
+            offset=inicio + info["deslocamento"],
+        )
+    return cabecalho, colunas, mapa
+
+
+def _blob(textos):
+    """Concatena textos em um blob UTF-8 e devolve (offsets, blob)."""
+    codificados = [texto.encode('utf-8') for texto in textos]
+    offsets = np.zeros(len(codificados) + 1, dtype=np.uint64)
+    np.cumsum([len(c) for c in codificados], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(codificados), dtype=np.uint8)
+
+
+def _tabela(valores):
+    """Tabela de strings distintas e o código de cada valor."""
+    tabela = sorted(set(valores))
+    codigo = {valor: i for i, valor in enumerate(tabela)}
+    return tabela, np.array([codigo[v] for v in valores], dtype=np.uint16)
+
+
+def salvar_armazem_chunks(chunks, caminho, ids_faiss):
+    """Grava os metadados dos chunks no formato colunar.
+
+    fonte e tipo viram tabelas de strings com códigos uint16; parte e o id
+    FAISS são colunas inteiras; id, artigo e conteúdo são blobs UTF-8 com
+    offsets. Os aliases (artigos repetidos, ver deduplicacao.py) são um blob
+    de JSON, vazio nos chunks sem repetições.
+    """
+    fontes, codigos_fonte = _tabela([c.get('fonte', '') for c in chunks])
+    tipos, codigos_tipo = _tabela([c.get('tipo', '') or '' for c in chunks])
+
+    colunas = {
+        "fonte": codigos_fonte,
+        "tipo": codigos_tipo,
+        "parte": np.array([c.get('parte', 1) for c in chunks], dtype=np.uint32),
+        "id_faiss": np.asarray(ids_faiss, dtype=np.int64),
+    }
+    for campo in ("id", "artigo", "conteudo"):
+        offsets, blob = _blob([c.get(campo, '') for c in chunks])
+        colunas[f"{campo}_offsets"] = offsets
+        colunas[f"{campo}_blob"] = blob
+    offsets, blob = _blob([json.dumps(c['aliases'], ensure_ascii=False) if c.get('aliases') else ''
+                           for c in chunks])
+    colunas["aliases_offsets"] = offsets
+    colunas["aliases_blob"] = blob
+
+    escrever_colunas(caminho, colunas, {"total": len(chunks), "fontes": fontes, "tipos": tipos})
+
+
+class ArmazemChunks:
+    """Metadados dos chunks sobre um arquivo mapeado em memória.
+
+    Tem a mesma interface da lista de dicionários lida do jsonl (len,
+    indexação e iteração), mas cada linha só é decodificada quando acessada.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        cabecalho, self._colunas, self._mapa = ler_colunas(caminho)
+        self._total = cabecalho["total"]
+        self.fontes = cabecalho["fontes"]
+        self.tipos = cabecalho["tipos"]
+
+    def __len__(self):
+        return self._total
+
+    def _texto(self, campo, i):
+        offsets = self._colunas[f"{campo}_offsets"]
+        inicio, fim = int(offsets[i]), int(offsets[i + 1])
+        return self._colunas[f"{campo}_blob"][inicio:fim].tobytes().decode('utf-8')
+
+    def _aliases(self, i):
+        # Armazéns anteriores à deduplicação não têm a coluna
+        if "aliases_offsets" not in self._colunas:
+            return None
+        texto = self._texto("aliases", i)
+        return json.loads(texto) if texto else None
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._total
+        if not 0 <= i < self._total:
+            raise IndexError(i)
+        chunk = {
+            "id": self._texto("id", i),
+            "fonte": self.fontes[self._colunas["fonte"][i]],
+            "tipo": self.tipos[self._colunas["tipo"][i]],
+            "artigo": self._texto("artigo", i),
+            "parte": int(self._colunas["parte"][i]),
+            "conteudo": self._texto("conteudo", i),
+        }
+        aliases = self._aliases(i)
+        if aliases:
+            chunk["aliases"] = aliases
+        return chunk
+
+    def __iter__(self):
+        for i in range(self._total):
+            yield self[i]
+
+    def ids_faiss(self):
+        return self._colunas["id_faiss"]
+
+    def artigos(self):
+        """Apenas (fonte, artigo, parte, aliases) de cada chunk, sem decodificar o conteúdo."""
+        for i in range(self._total):
+            artigo = {
+                "fonte": self.fontes[self._colunas["fonte"][i]],
+                "artigo": self._texto("artigo", i),
+                "parte": int(self._colunas["parte"][i]),
+            }
+            aliases = self._aliases(i)
+            if aliases:
+                artigo["aliases"] = aliases
+            yield artigo
@@ -0,0 +1 @@
+# Scripts de benchmark; executar a partir de app/, ex.: python -m benchmarks.indices
@@ -0,0 +1,106 @@
+"""Tokens/s da decodificação especulativa (prompt lookup) em relação à normal.
+
+As perguntas são as de benchmarks/perguntas.py, com o contexto recuperado e
+as mensagens montadas como no chatbot, na temperatura de produção e com
+semente fixa; além da velocidade, confere se as respostas são idênticas às
+da decodificação normal. Uso, a partir de app/:
+
+    python -m benchmarks.especulativa --tokens-rascunho 4 10 16 --saida ../bench_especulativa.json
+"""
+import json
+import time
+import argparse
+import numpy as np
+
+from pipeline import carregar_llm
+from recuperacao import MotorRecuperacao
+from geracao import TEMPERATURA, montar_mensagens, criar_rascunho, contar_tokens
+from benchmarks.perguntas import PERGUNTAS
+
+
+def gerar(llm, mensagens, max_tokens, seed):
+    """Resposta, tempo até o primeiro token e tokens/s depois dele."""
+    # Sem reaproveitar o prefixo da pergunta anterior: o prefill é igual
+    # para todos os modos
+    llm.reset()
+
+    inicio = time.perf_counter()
+    primeiro = None
+    partes = []
+    for parte in llm.create_chat_completion(messages=mensagens, max_tokens=max_tokens,
+                                            temperature=TEMPERATURA, seed=seed, stream=True):
+        trecho = parte["choices"][0]["delta"].get("content")
+        if trecho:
+            if primeiro is None:
+                primeiro = time.perf_counter()
+            partes.append(trecho)
+    fim = time.perf_counter()
+
+    resposta = "".join(partes)
+    tokens = contar_tokens(llm, resposta)
+    decodificacao = fim - primeiro if primeiro is not None else 0.0
+    return {
+        "resposta": resposta,
+        "tokens": tokens,
+        "ttft_s": (primeiro or fim) - inicio,
+        "tokens_por_s": (tokens - 1) / decodificacao if tokens > 1 and decodificacao > 0 else 0.0,
+    }
+
+
+def medir(llm, todas_mensagens, max_tokens, seed, referencia=None):
+    resultados = [gerar(llm, mensagens, max_tokens, seed) for mensagens in todas_mensagens]
+    resumo = {
+        "tokens_por_s": float(np.mean([r["tokens_por_s"] for r in resultados])),
+        "ttft_s": float(np.mean([r["ttft_s"] for r in resultados])),
+        "tokens": int(sum(r["tokens"] for r in resultados)),
+    }
+    if referencia is not None:
+        resumo["identicas"] = sum(r["resposta"] == ref["resposta"] for r, ref in zip(resultados, referencia))
+    return resumo, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a decodificação normal com a especulativa (prompt lookup).")
+    parser.add_argument('--tokens-rascunho', type=int, nargs='+', default=[4, 10, 16],
+                        help="tamanhos de rascunho avaliados")
+    parser.add_argument('--max-tokens', type=int, default=256, help="tokens gerados por resposta")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    # Um Llama por modo: com o rascunho, os logits de todas as posições são
+    # calculados desde a criação do contexto. Os pesos são os mesmos (mmap)
+    llm = carregar_llm(especulativa=False)
+    llm.set_cache(None)
+
+    motor = MotorRecuperacao()
+    todas_mensagens = [
+        montar_mensagens(llm, motor.recuperar(pergunta).blocos, [], pergunta)
+        for pergunta in PERGUNTAS
+    ]
+
+    normal, referencia = medir(llm, todas_mensagens, args.max_tokens, args.seed)
+    del llm
+    resultados = {"normal": normal}
+    print(f"normal: {normal['tokens_por_s']:.1f} tok/s, TTFT {normal['ttft_s']:.2f} s")
+
+    llm = carregar_llm(especulativa=True)
+    llm.set_cache(None)
+    for tokens_rascunho in args.tokens_rascunho:
+        llm.draft_model = criar_rascunho(tokens_rascunho)
+        resumo, _ = medir(llm, todas_mensagens, args.max_tokens, args.seed, referencia)
+        resumo["aceleracao"] = resumo["tokens_por_s"] / normal["tokens_por_s"] if normal["tokens_por_s"] else 0.0
+        resultados[f"rascunho_{tokens_rascunho}"] = resumo
+        print(
+            f"rascunho {tokens_rascunho:>2}: {resumo['tokens_por_s']:.1f} tok/s "
+            f"({resumo['aceleracao']:.2f}x), TTFT {resumo['ttft_s']:.2f} s, "
+            f"{resumo['identicas']}/{len(PERGUNTAS)} respostas idênticas"
+        )
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
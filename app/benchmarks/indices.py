@@ -0,0 +1,157 @@
+"""Recall@k, latência e memória dos tipos de índice ANN sobre o corpus real.
+
+A referência é a busca exata (Flat) em float32; o recall@k é a sobreposição
+do top-k de cada índice com o dela, e a economia de memória é medida em
+relação a ela. Inclui os vetores em float16, int8 (sq8) e reduzidos por PCA.
+Uso, a partir de app/:
+
+    python -m benchmarks.indices --k 3 --saida ../bench_indices.json
+"""
+import os
+import json
+import time
+import argparse
+import faiss
+import numpy as np
+
+from indices_ann import criar_index, aplicar_parametros_busca
+from recuperacao import MotorRecuperacao, embeddings_path, NOME_MODELO_EMBEDDINGS
+from benchmarks.perguntas import PERGUNTAS
+
+# Combinações avaliadas: estrutura do índice e variações dos parâmetros de busca
+GRADE = [
+    ({"tipo": "flat"}, [{}]),
+    ({"tipo": "hnsw", "hnsw_m": 16, "ef_construction": 40}, [{"ef_search": ef} for ef in (16, 64, 128)]),
+    ({"tipo": "hnsw", "hnsw_m": 32, "ef_construction": 40}, [{"ef_search": ef} for ef in (16, 64, 128)]),
+    ({"tipo": "ivf", "nlist": 64}, [{"nprobe": n} for n in (1, 4, 16)]),
+    ({"tipo": "ivf", "nlist": 256}, [{"nprobe": n} for n in (4, 16, 64)]),
+    ({"tipo": "ivfpq", "nlist": 64, "pq_m": 16, "pq_bits": 8}, [{"nprobe": n} for n in (4, 16)]),
+    ({"tipo": "ivfpq", "nlist": 64, "pq_m": 32, "pq_bits": 8}, [{"nprobe": n} for n in (4, 16)]),
+    ({"tipo": "flat", "armazenamento": "fp16"}, [{}]),
+    ({"tipo": "flat", "armazenamento": "sq8"}, [{}]),
+    ({"tipo": "flat", "pca": 192}, [{}]),
+    ({"tipo": "flat", "pca": 128}, [{}]),
+    ({"tipo": "flat", "pca": 128, "armazenamento": "sq8"}, [{}]),
+    ({"tipo": "hnsw", "hnsw_m": 32, "ef_construction": 40, "armazenamento": "sq8"}, [{"ef_search": 64}]),
+    ({"tipo": "ivf", "nlist": 256, "armazenamento": "sq8"}, [{"nprobe": n} for n in (16, 64)]),
+]
+
+
+def carregar_corpus(diretorio):
+    """Vetores do corpus, na ordem dos metadados.
+
+    Se os índices salvos (um por fonte) forem exatos, os vetores são
+    reconstruídos deles; caso contrário os chunks são codificados novamente.
+    """
+    with open(os.path.join(diretorio, 'artigos_chunks.jsonl'), 'r', encoding='utf-8') as f:
+        artigos = [json.loads(linha) for linha in f if linha.strip()]
+
+    estado = MotorRecuperacao(diretorio).estado()
+    bases = [
+        faiss.downcast_index(shard.index.index) if isinstance(shard.index, faiss.IndexIDMap) else shard.index
+        for shard in estado.shards
+    ]
+    if all(isinstance(base, faiss.IndexFlat) for base in bases) and len(estado.artigos) == len(artigos):
+        # Dentro de cada shard os vetores seguem a ordem de id_map, cujas
+        # posições nos metadados o estado já resolveu
+        vetores = np.empty((len(artigos), bases[0].d), dtype=np.float32)
+        for shard, base in zip(estado.shards, bases):
+            vetores[shard.posicoes] = base.reconstruct_n(0, base.ntotal)
+        return vetores
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(NOME_MODELO_EMBEDDINGS)
+    textos = [
+        f"[{a.get('tipo', '')}] {a.get('artigo', '')} - {a.get('fonte', '')}\n{a.get('conteudo', '')}"
+        for a in artigos
+    ]
+    return np.asarray(model.encode(textos, batch_size=256, show_progress_bar=True), dtype=np.float32)
+
+
+def carregar_consultas(vetores, amostras, seed=42):
+    """Perguntas fixas codificadas mais uma amostra de chunks do corpus."""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(NOME_MODELO_EMBEDDINGS)
+    perguntas = np.asarray(model.encode(PERGUNTAS), dtype=np.float32)
+
+    rng = np.random.default_rng(seed)
+    amostra = vetores[rng.choice(len(vetores), size=min(amostras, len(vetores)), replace=False)]
+    return np.vstack([perguntas, amostra])
+
+
+def medir(index, consultas, k, referencia):
+    """Recall@k em relação à busca exata e latência por consulta (ms)."""
+    latencias = []
+    acertos = 0
+    for i, consulta in enumerate(consultas):
+        inicio = time.perf_counter()
+        _, I = index.search(consulta[None, :], k)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        acertos += len(set(I[0].tolist()) & set(referencia[i].tolist()))
+
+    return {
+        f"recall@{k}": acertos / (len(consultas) * k),
+        "p50_ms": float(np.percentile(latencias, 50)),
+        "p99_ms": float(np.percentile(latencias, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tipos de índice FAISS.")
+    parser.add_argument('--k', type=int, default=3, help="top-k avaliado (o chatbot usa 3)")
+    parser.add_argument('--amostras', type=int, default=500, help="chunks do corpus usados como consulta")
+    parser.add_argument('--threads', type=int, default=1, help="threads do FAISS durante as buscas")
+    parser.add_argument('--saida', help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+
+    vetores = carregar_corpus(embeddings_path)
+    consultas = carregar_consultas(vetores, args.amostras)
+    ids = np.arange(len(vetores), dtype=np.int64)
+    print(f"{len(vetores)} vetores de dimensão {vetores.shape[1]}, {len(consultas)} consultas")
+
+    exato = criar_index({"tipo": "flat"}, vetores.shape[1])
+    exato.add_with_ids(vetores, ids)
+    _, referencia = exato.search(consultas, args.k)
+    memoria_exato = faiss.serialize_index(exato).nbytes
+
+    resultados = []
+    for estrutura, variacoes in GRADE:
+        inicio = time.perf_counter()
+        try:
+            index = criar_index(estrutura, vetores.shape[1], vetores)
+        except RuntimeError as e:
+            # Ex.: pq_m que não divide a dimensão dos vetores, ou PCA maior que ela
+            print(f"{json.dumps(estrutura, ensure_ascii=False)} ignorado: {e}")
+            continue
+        index.add_with_ids(vetores, ids)
+        tempo_build = time.perf_counter() - inicio
+        memoria = faiss.serialize_index(index).nbytes
+
+        for parametros in variacoes:
+            config = {**estrutura, **parametros}
+            aplicar_parametros_busca(index, config)
+            resultado = {
+                "config": config,
+                "build_s": tempo_build,
+                "memoria_bytes": int(memoria),
+                "economia_memoria": 1 - memoria / memoria_exato,
+                **medir(index, consultas, args.k, referencia),
+            }
+            resultados.append(resultado)
+            print(
+                f"{json.dumps(config, ensure_ascii=False):70s} "
+                f"recall@{args.k}={resultado[f'recall@{args.k}']:.3f} "
+                f"p50={resultado['p50_ms']:.3f}ms p99={resultado['p99_ms']:.3f}ms "
+                f"memória={memoria / 2**20:.2f}MiB (economia de {1 - memoria / memoria_exato:.0%})"
+            )
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em: {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
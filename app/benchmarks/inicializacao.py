@@ -0,0 +1,89 @@
+"""Tempo de inicialização: importações de cada ponto de entrada e carga dos modelos.
+
+As importações são medidas com `python -X importtime` em um processo novo
+por módulo (sem nada em cache no interpretador), agrupadas por pacote. A
+carga dos modelos repete o aquecimento do servidor (PipelineRAG.aquecer):
+índice, encoder das perguntas e Llama, este pelo stub determinístico da
+suíte, a menos que se passe --llm gguf.
+
+Uso, a partir de app/:
+
+    python -m benchmarks.inicializacao --saida ../bench_inicializacao.json
+"""
+import os
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+# Pontos de entrada medidos. convert_jsonl.py e a interface Streamlit rodam
+# ao ser importados; do primeiro mede-se a normalizacao, que ele importa, e a
+# segunda só importa streamlit, httpx e langchain_core
+MODULOS = ['servidor', 'pipeline', 'prepare_embeddings_chunks', 'normalizacao']
+
+
+def tempos_importacao(modulo):
+    """(total em ms, {pacote: ms}) da importação de `modulo` em um processo novo."""
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                              capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+
+    pacotes = defaultdict(float)
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, _, nome = linha[len('import time:'):].split('|')
+        pacotes[nome.strip().split('.')[0]] += int(proprio) / 1000
+    return sum(pacotes.values()), dict(pacotes)
+
+
+def medir_aquecimento(llm):
+    from pipeline import PipelineRAG
+    from telemetria import Inicializacao
+    from benchmarks.suite import SemCache, LlmDeterministico
+
+    inicializacao = Inicializacao()
+    if llm == 'stub':
+        # O stub não tem custo de carga; a etapa "llm" mede só a fila
+        pipeline = PipelineRAG(llm=LlmDeterministico(), cache_respostas=SemCache())
+    else:
+        pipeline = PipelineRAG(cache_respostas=SemCache())
+    pipeline.aquecer(inicializacao)
+    inicializacao.concluir()
+    return {f"{nome}_ms": segundos * 1000 for nome, segundos in inicializacao.etapas.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação e de carga dos modelos.")
+    parser.add_argument('--modulos', nargs='+', default=MODULOS)
+    parser.add_argument('--top', type=int, default=8, help="pacotes mais lentos listados por módulo")
+    parser.add_argument('--llm', choices=['stub', 'gguf'], default='stub')
+    parser.add_argument('--sem-aquecimento', action='store_true', help="mede só as importações")
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    resultados = {"importacao": {}}
+    for modulo in args.modulos:
+        total, pacotes = tempos_importacao(modulo)
+        mais_lentos = dict(sorted(pacotes.items(), key=lambda item: -item[1])[:args.top])
+        resultados["importacao"][modulo] = {"total_ms": total, "pacotes_ms": mais_lentos}
+        print(f"import {modulo}: {total:.0f}ms")
+        for pacote, ms in mais_lentos.items():
+            print(f"    {pacote:<28} {ms:8.1f}ms")
+
+    if not args.sem_aquecimento:
+        resultados["aquecimento"] = medir_aquecimento(args.llm)
+        print("aquecimento: " + ", ".join(f"{nome}={ms:.0f}ms" for nome, ms in resultados["aquecimento"].items()))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em: {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
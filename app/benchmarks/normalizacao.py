@@ -0,0 +1,141 @@
+"""Equivalência e tempo do motor de normalização (normalizacao.py).
+
+Compara a saída de normalizar_documento com a sequência original de
+re.sub do convert_jsonl.py (funções de utils.py), sobre os Markdown de
+data/legislacao_processada e casos de borda, e mede o tempo de cada um.
+Termina com erro se alguma saída divergir. Uso, a partir de app/:
+
+    python -m benchmarks.normalizacao --repeticoes 5
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+
+from utils import (
+    mapeamento_romanos_ordinais,
+    substituir_numeros_romanos,
+    substituir_caracteres_com_re,
+    limpar_sumario_e_imagens,
+)
+from normalizacao import normalizar_documento, pares_titulo_conteudo, padrao_segmentacao
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+processada_path = os.path.join(project_root, 'data', 'legislacao_processada')
+
+# Casos de borda: interações entre as regras que dependem da ordem das passadas
+CASOS = [
+    "Art. 5º Todos são iguais perante a lei, sem distinção de qualquer natureza",
+    "art. 121. Matar alguém: Pena - reclusão, de seis a vinte anos. § 1º Se o agente",
+    "ARTIGO IV, inciso XX, alínea a e o parágrafo único; XIV não é convertido; VI, C, XC, LX",
+    "Presidência da República Secretaria-Geral Subchefia para Assuntos Jurídicos Página 3 de 10",
+    "texto ![figura](img/a.png) meio <!-- image --> fim < image qualquer > fim",
+    "Sumário .......... 12 Título I ..... 3",
+    "C.C. C.P. C.F. Inc. R$ 10/20 “citação” ‘outra’ — travessão – meia-risca",
+    "a-b -- c --- d ___ e ... f .-. g ..*.. h #título **negrito** - item",
+    " o a o  a b o",
+    "art.IV art.12 Art.12 artigo 7-A e art 8º-B",
+    "",
+    "Capítulo .... 12",
+    "Página 1 de 2<image a>12 e Página 3 de 4Presidência da República56 XC<image>.C.P.",
+]
+
+
+def normalizar_legado(texto):
+    """Sequência de re.sub do convert_jsonl.py antes do motor de normalização."""
+    texto_limpo = re.sub(r'\s+', ' ', texto).strip()
+    texto_limpo = limpar_sumario_e_imagens(texto_limpo)
+    texto_limpo = substituir_caracteres_com_re(texto_limpo)
+    texto_limpo = re.sub(r'[-_.]{3,}', '', texto_limpo)
+    texto_limpo = re.sub(r'[-*]', '', texto_limpo)
+    texto_limpo = re.sub(r'[#]', '', texto_limpo)
+    texto_limpo = re.sub(r'(\s)[oa](?=\s)', '', texto_limpo)
+    texto_limpo = re.sub(r'(?i)\b(art(?:igo)?\.?)\b', 'Artigo', texto_limpo)
+    texto_limpo = substituir_numeros_romanos(texto_limpo)
+    for romano, escrito in mapeamento_romanos_ordinais.items():
+        texto_limpo = re.sub(r'Art\. {romano}\b', r'Art\. {escrito}', texto_limpo)
+    return texto_limpo
+
+
+def pares_legado(texto):
+    blocos_texto = re.split(padrao_segmentacao, texto)
+    return [
+        (blocos_texto[i], blocos_texto[i + 1] if i + 1 < len(blocos_texto) else "")
+        for i in range(1, len(blocos_texto), 2)
+    ]
+
+
+def primeira_divergencia(a, b):
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i
+    return min(len(a), len(b))
+
+
+def cronometrar(funcao, texto, repeticoes):
+    """Melhor tempo (s) entre as repetições."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(texto)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark e verificação do motor de normalização.")
+    parser.add_argument('--repeticoes', type=int, default=5, help="repetições de cada medição")
+    parser.add_argument('--saida', help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    divergencias = 0
+    for i, caso in enumerate(CASOS):
+        esperado, obtido = normalizar_legado(caso), normalizar_documento(caso)
+        if esperado != obtido:
+            divergencias += 1
+            print(f"Caso {i} diverge:\n  original: {esperado!r}\n  motor:    {obtido!r}")
+
+    resultados = []
+    for arquivo in sorted(glob.glob(os.path.join(processada_path, '*.md'))):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            texto = f.read()
+        nome = os.path.basename(arquivo)
+
+        esperado, obtido = normalizar_legado(texto), normalizar_documento(texto)
+        if esperado != obtido:
+            divergencias += 1
+            i = primeira_divergencia(esperado, obtido)
+            print(f"{nome} diverge na posição {i}:\n"
+                  f"  original: {esperado[max(0, i - 60):i + 60]!r}\n"
+                  f"  motor:    {obtido[max(0, i - 60):i + 60]!r}")
+        elif pares_legado(esperado) != list(pares_titulo_conteudo(obtido)):
+            divergencias += 1
+            print(f"{nome}: segmentação em artigos diverge")
+
+        tempo_legado = cronometrar(normalizar_legado, texto, args.repeticoes)
+        tempo_motor = cronometrar(normalizar_documento, texto, args.repeticoes)
+        resultados.append({
+            "arquivo": nome,
+            "bytes": len(texto.encode('utf-8')),
+            "original_s": tempo_legado,
+            "motor_s": tempo_motor,
+        })
+        print(f"{nome:50s} {len(texto) / 2**20:6.2f}MiB original={tempo_legado * 1000:8.1f}ms "
+              f"motor={tempo_motor * 1000:8.1f}ms ({tempo_legado / tempo_motor:.1f}x)")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em: {args.saida}")
+
+    if divergencias:
+        print(f"{divergencias} divergências encontradas")
+        sys.exit(1)
+    print("Saídas idênticas às da sequência original")
+
+
+if __name__ == '__main__':
+    main()
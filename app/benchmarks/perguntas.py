@@ -0,0 +1,24 @@
+# Conjunto fixo de perguntas usado pelos benchmarks, para que os resultados
+# sejam comparáveis entre execuções
+PERGUNTAS = [
+    "O que diz o artigo 121 do Código Penal?",
+    "Quais são os direitos fundamentais previstos na Constituição?",
+    "O que é homicídio qualificado?",
+    "Quando cabe habeas corpus?",
+    "Quais crimes são inafiançáveis?",
+    "O que diz o artigo 5 da Constituição Federal?",
+    "Qual a pena para o crime de furto?",
+    "O que caracteriza o crime de roubo?",
+    "Quais são os direitos sociais?",
+    "Como funciona a legítima defesa?",
+    "O que é estado de necessidade?",
+    "Quem pode ser presidente da República?",
+    "Quais são as competências da União?",
+    "O que a Declaração Universal diz sobre a liberdade de expressão?",
+    "Toda pessoa tem direito à vida, à liberdade e à segurança pessoal?",
+    "O que é crime culposo?",
+    "Qual a pena para o crime de estelionato?",
+    "Como é feita a eleição dos deputados federais?",
+    "O que diz a Constituição sobre a educação?",
+    "O que é prescrição da pretensão punitiva?",
+]
@@ -0,0 +1,293 @@
+"""Suíte de desempenho: build, recuperação e geração, com resultados em JSON.
+
+Roda sem rede, sobre os artefatos reais de data/ (os modelos de embeddings
+precisam estar no cache local). Mede:
+
+- blocos/s do build (chunking e codificação) em uma amostra de artigos;
+- latência p50/p95/p99 de recupera_contexto, separada entre as perguntas
+  resolvidas pelo índice de artigos (número citado) e as que vão ao FAISS;
+- tempo até o primeiro token e tokens/s de model_response, nas perguntas
+  fixas de benchmarks/perguntas.py. Por padrão o modelo é um stub
+  determinístico (velocidades fixas de prefill e decodificação), de modo que
+  a medida reflete só o pipeline; com --llm gguf usa o modelo real.
+
+Uso, a partir de app/:
+
+    python -m benchmarks.suite --saida ../bench_suite.json
+    python -m benchmarks.suite --saida ../bench_novo.json --comparar ../bench_suite.json
+
+Com --comparar, as métricas que pioraram mais que --tolerancia em relação ao
+arquivo anterior são listadas e o processo termina com código 1.
+"""
+import os
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+
+import re
+import sys
+import json
+import time
+import argparse
+import itertools
+import platform
+import subprocess
+import numpy as np
+
+from recuperacao import MotorRecuperacao
+from geracao import N_CTX, MAX_TOKENS_RESPOSTA, contar_tokens
+from benchmarks.perguntas import PERGUNTAS
+
+ETAPAS = ['build', 'recuperacao', 'geracao']
+
+
+class LlmDeterministico:
+    """Substituto do Llama com custo fixo por token, para medir o pipeline.
+
+    O prefill custa `ms_prefill` por token do prompt e cada token gerado,
+    `ms_token`; a resposta repete as palavras da pergunta, sempre igual para
+    as mesmas mensagens.
+    """
+
+    def __init__(self, ms_prefill=0.2, ms_token=20.0, tokens_resposta=64, n_ctx=N_CTX):
+        self.ms_prefill = ms_prefill
+        self.ms_token = ms_token
+        self.tokens_resposta = tokens_resposta
+        self._n_ctx = n_ctx
+        self._vocabulario = {}
+        self._palavras = []
+
+    def n_ctx(self):
+        return self._n_ctx
+
+    def tokenize(self, texto, add_bos=False, special=True):
+        tokens = []
+        for palavra in re.findall(rb'\S+', texto):
+            if palavra not in self._vocabulario:
+                self._vocabulario[palavra] = len(self._palavras)
+                self._palavras.append(palavra)
+            tokens.append(self._vocabulario[palavra])
+        return tokens
+
+    def detokenize(self, tokens):
+        return b' '.join(self._palavras[t] for t in tokens)
+
+    def _trechos(self, messages, max_tokens):
+        prompt = "\n".join(m["content"] for m in messages)
+        time.sleep(len(self.tokenize(prompt.encode('utf-8'))) * self.ms_prefill / 1000)
+
+        palavras = messages[-1]["content"].split() or ["..."]
+        for i in range(min(max_tokens, self.tokens_resposta)):
+            if i:
+                time.sleep(self.ms_token / 1000)
+            yield (" " if i else "") + palavras[i % len(palavras)]
+
+    def create_chat_completion(self, messages, max_tokens=MAX_TOKENS_RESPOSTA, stream=False, **kwargs):
+        if not stream:
+            texto = "".join(self._trechos(messages, max_tokens))
+            return {"choices": [{"message": {"role": "assistant", "content": texto}}]}
+        return ({"choices": [{"delta": {"content": trecho}}]} for trecho in self._trechos(messages, max_tokens))
+
+
+class SemCache:
+    """Cache de respostas desligado: toda pergunta passa pelo modelo."""
+
+    def buscar_exata(self, pergunta, versao, escopo=None, historico=None):
+        return None
+
+    def buscar_semelhante(self, vetor, ids, versao, historico=None):
+        return None
+
+    def guardar(self, *args, **kwargs):
+        pass
+
+
+def percentis(valores, prefixo="", unidade="ms"):
+    fator = 1000 if unidade == "ms" else 1
+    return {
+        f"{prefixo}p{p}_{unidade}": float(np.percentile(valores, p) * fator)
+        for p in (50, 95, 99)
+    }
+
+
+def medir_build(artigos):
+    """Blocos/s do chunking e da codificação nos primeiros `artigos` artigos."""
+    from datasets import load_dataset
+    from sentence_transformers import SentenceTransformer
+    import prepare_embeddings_chunks as build
+
+    dataset = load_dataset('json', data_files=build.input_path, split='train')
+    amostra = list(itertools.islice(dataset, artigos))
+    model = SentenceTransformer(build.nome_modelo)
+
+    inicio = time.perf_counter()
+    textos, tokens = [], []
+    for _, texto, ids in build.gerar_chunks(amostra, model.tokenizer, model.max_seq_length):
+        textos.append(texto)
+        tokens.append(ids)
+    tempo_chunking = time.perf_counter() - inicio
+
+    vetores = np.empty((len(textos), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    inicio = time.perf_counter()
+    build.gerar_embeddings(model, textos, vetores, ids=tokens)
+    tempo_codificacao = time.perf_counter() - inicio
+
+    return {
+        "artigos": len(amostra),
+        "blocos": len(textos),
+        "chunking_blocos_por_s": len(textos) / tempo_chunking,
+        "codificacao_blocos_por_s": len(textos) / tempo_codificacao,
+        "total_blocos_por_s": len(textos) / (tempo_chunking + tempo_codificacao),
+    }
+
+
+def medir_recuperacao(pipeline, repeticoes):
+    """Latência de recupera_contexto por caminho: índice de artigos ou FAISS."""
+    caminhos = {"artigos": [], "semantica": []}
+    for pergunta in PERGUNTAS:
+        caminho = "artigos" if pipeline.motor.buscar_artigos(pergunta) else "semantica"
+        caminhos[caminho].append(pergunta)
+
+    # Carrega índice e encoder fora da medida
+    pipeline.recupera_contexto(PERGUNTAS[0])
+
+    resultados = {}
+    for caminho, perguntas in caminhos.items():
+        latencias = []
+        for _ in range(repeticoes):
+            for pergunta in perguntas:
+                inicio = time.perf_counter()
+                pipeline.recupera_contexto(pergunta)
+                latencias.append(time.perf_counter() - inicio)
+        if latencias:
+            resultados[caminho] = {"perguntas": len(perguntas), **percentis(latencias)}
+    return resultados
+
+
+def medir_geracao(pipeline, repeticoes):
+    """Tempo até o primeiro token e tokens/s de model_response (em streaming)."""
+    ttfts, velocidades, totais = [], [], []
+    for _ in range(repeticoes):
+        for pergunta in PERGUNTAS:
+            inicio = time.perf_counter()
+            primeiro = None
+            partes = []
+            for trecho in pipeline.model_response_stream(pergunta, []):
+                if primeiro is None:
+                    primeiro = time.perf_counter()
+                partes.append(trecho)
+            fim = time.perf_counter()
+
+            tokens = contar_tokens(pipeline.llm, "".join(partes))
+            ttfts.append((primeiro or fim) - inicio)
+            totais.append(fim - inicio)
+            if tokens > 1 and primeiro is not None and fim > primeiro:
+                velocidades.append((tokens - 1) / (fim - primeiro))
+
+    return {
+        **percentis(ttfts, "ttft_", "s"),
+        **percentis(totais, "total_", "s"),
+        "tokens_por_s": float(np.mean(velocidades)) if velocidades else 0.0,
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metricas(resultados, prefixo=""):
+    """Métricas numéricas achatadas: {"recuperacao.semantica.p95_ms": ...}."""
+    planas = {}
+    for chave, valor in resultados.items():
+        if isinstance(valor, dict):
+            planas.update(metricas(valor, f"{prefixo}{chave}."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planas[prefixo + chave] = valor
+    return planas
+
+
+def regressoes(atual, anterior, tolerancia):
+    """Métricas que pioraram mais que `tolerancia` (fração) entre duas execuções.
+
+    Vazões (por_s) pioram quando caem; latências (_ms, _s), quando sobem.
+    """
+    atual, anterior = metricas(atual), metricas(anterior)
+    piores = []
+    for nome, valor in sorted(atual.items()):
+        base = anterior.get(nome)
+        if not base:
+            continue
+        if "por_s" in nome:
+            variacao = (base - valor) / base
+        elif nome.endswith(("_ms", "_s")):
+            variacao = (valor - base) / base
+        else:
+            continue
+        if variacao > tolerancia:
+            piores.append(f"{nome}: {base:.4g} -> {valor:.4g} (piora de {variacao:.0%})")
+    return piores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de build, recuperação e geração.")
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+    parser.add_argument('--artigos-build', type=int, default=500, help="artigos codificados no benchmark do build")
+    parser.add_argument('--repeticoes', type=int, default=5, help="passagens pelas perguntas fixas")
+    parser.add_argument('--llm', choices=['stub', 'gguf'], default='stub',
+                        help="stub determinístico (padrão) ou o modelo GGUF do chatbot")
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior, para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="piora aceita na comparação (fração)")
+    args = parser.parse_args()
+
+    resultados = {
+        "meta": {
+            "commit": commit_atual(),
+            "data": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "llm": args.llm,
+            "repeticoes": args.repeticoes,
+        },
+    }
+
+    if 'build' in args.etapas:
+        resultados["build"] = medir_build(args.artigos_build)
+        print(f"build: {resultados['build']['total_blocos_por_s']:.1f} blocos/s")
+
+    if 'recuperacao' in args.etapas or 'geracao' in args.etapas:
+        from pipeline import PipelineRAG, carregar_llm
+
+        llm = carregar_llm() if args.llm == 'gguf' else LlmDeterministico()
+        pipeline = PipelineRAG(llm=llm, motor=MotorRecuperacao(), cache_respostas=SemCache())
+
+        if 'recuperacao' in args.etapas:
+            resultados["recuperacao"] = medir_recuperacao(pipeline, args.repeticoes)
+            for caminho, medida in resultados["recuperacao"].items():
+                print(f"recuperação ({caminho}): p50={medida['p50_ms']:.2f}ms p95={medida['p95_ms']:.2f}ms "
+                      f"p99={medida['p99_ms']:.2f}ms")
+
+        if 'geracao' in args.etapas:
+            resultados["geracao"] = medir_geracao(pipeline, args.repeticoes)
+            print(f"geração: TTFT p50={resultados['geracao']['ttft_p50_s']:.3f}s, "
+                  f"{resultados['geracao']['tokens_por_s']:.1f} tokens/s")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em: {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        piores = regressoes(resultados, anterior, args.tolerancia)
+        for linha in piores:
+            print(f"Regressão: {linha}")
+        if piores:
+            sys.exit(1)
+        print("Nenhuma regressão acima da tolerância.")
+
+
+if __name__ == '__main__':
+    main()
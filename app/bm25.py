@@ -0,0 +1,186 @@
+import re
+import math
+import numpy as np
+
+from armazem import escrever_colunas, ler_colunas
+from indice_artigos import normalizar_texto
+
+# Parâmetros usuais do BM25: saturação da frequência do termo e peso da
+# normalização pelo tamanho do chunk
+K1 = 1.2
+B = 0.75
+
+# Palavras funcionais do português, que não discriminam chunks
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em entre na nas no nos o os ou para
+pela pelas pelo pelos por que se sem sua suas seu seus um uma umas uns
+""".split())
+
+_padrao_termos = re.compile(r'\w+')
+
+
+def tokenizar(texto):
+    """Termos do texto: minúsculas, sem acentos e sem palavras funcionais."""
+    return [t for t in _padrao_termos.findall(normalizar_texto(texto)) if t not in STOPWORDS]
+
+
+def postings_textos(textos):
+    """Postings dos textos, como (vocabulário, termo, chunk, tf, tamanhos).
+
+    termo é o índice no vocabulário e chunk a posição em `textos`; tamanhos
+    é o número de termos de cada texto.
+    """
+    codigos = {}
+    termos, chunks, frequencias_chunk = [], [], []
+    tamanhos = np.zeros(len(textos), dtype=np.uint32)
+    for posicao, texto in enumerate(textos):
+        lista = tokenizar(texto)
+        tamanhos[posicao] = len(lista)
+        frequencias = {}
+        for termo in lista:
+            frequencias[termo] = frequencias.get(termo, 0) + 1
+        for termo, tf in frequencias.items():
+            termos.append(codigos.setdefault(termo, len(codigos)))
+            chunks.append(posicao)
+            frequencias_chunk.append(min(tf, 0xFFFF))
+    return (list(codigos), np.array(termos, dtype=np.int64), np.array(chunks, dtype=np.uint32),
+            np.array(frequencias_chunk, dtype=np.uint16), tamanhos)
+
+
+def postings_armazenadas(caminho, inicio, fim):
+    """As mesmas postings de postings_textos(), lidas de um índice gravado,
+    para os chunks de `inicio` a `fim` (exclusive), renumerados a partir de 0.
+
+    Permite ao build reaproveitar os termos das fontes sem alterações, sem
+    tokenizar os textos de novo.
+    """
+    _, colunas, _ = ler_colunas(caminho)
+    offsets = colunas["postings_offsets"].astype(np.int64)
+    chunks = colunas["postings_chunk"]
+    selecionadas = (chunks >= inicio) & (chunks < fim)
+    termos = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))[selecionadas]
+    usados, termos = np.unique(termos, return_inverse=True)
+
+    termo_offsets = colunas["termo_offsets"]
+    blob = colunas["termo_blob"]
+    vocabulario = [blob[int(termo_offsets[t]):int(termo_offsets[t + 1])].tobytes().decode('utf-8') for t in usados]
+    return (vocabulario, termos.astype(np.int64), chunks[selecionadas] - np.uint32(inicio),
+            colunas["postings_tf"][selecionadas].copy(), colunas["tamanho_chunk"][inicio:fim].copy())
+
+
+def salvar_bm25(partes, caminho):
+    """Grava o índice invertido no formato colunar do armazém.
+
+    `partes` são postings (postings_textos ou postings_armazenadas) de blocos
+    consecutivos de chunks, na ordem final. Os termos ficam em ordem
+    alfabética, em um blob UTF-8; as listas de postings (posição do chunk e
+    frequência do termo) de todos os termos ficam contíguas, com offsets por
+    termo, como nos demais artefatos.
+    """
+    vocabulario = sorted({termo for parte in partes for termo in parte[0]})
+    codigo = {termo: i for i, termo in enumerate(vocabulario)}
+
+    termos, chunks, frequencias, tamanhos = [], [], [], []
+    deslocamento = 0
+    for vocabulario_parte, termos_parte, chunks_parte, tf_parte, tamanhos_parte in partes:
+        mapa = np.array([codigo[termo] for termo in vocabulario_parte], dtype=np.int64)
+        termos.append(mapa[termos_parte] if len(termos_parte) else termos_parte)
+        chunks.append(chunks_parte.astype(np.uint32) + np.uint32(deslocamento))
+        frequencias.append(tf_parte)
+        tamanhos.append(tamanhos_parte)
+        deslocamento += len(tamanhos_parte)
+
+    termos = np.concatenate(termos) if termos else np.empty(0, dtype=np.int64)
+    chunks = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint32)
+    frequencias = np.concatenate(frequencias) if frequencias else np.empty(0, dtype=np.uint16)
+    tamanhos = np.concatenate(tamanhos) if tamanhos else np.empty(0, dtype=np.uint32)
+
+    # Postings de cada termo contíguas e, dentro do termo, na ordem dos chunks
+    ordem = np.lexsort((chunks, termos))
+    termos_codificados = [termo.encode('utf-8') for termo in vocabulario]
+    termo_offsets = np.zeros(len(vocabulario) + 1, dtype=np.uint64)
+    np.cumsum([len(t) for t in termos_codificados], out=termo_offsets[1:])
+    postings_offsets = np.zeros(len(vocabulario) + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(termos, minlength=len(vocabulario)), out=postings_offsets[1:])
+
+    colunas = {
+        "termo_offsets": termo_offsets,
+        "termo_blob": np.frombuffer(b''.join(termos_codificados), dtype=np.uint8),
+        "postings_offsets": postings_offsets,
+        "postings_chunk": chunks[ordem],
+        "postings_tf": frequencias[ordem],
+        "tamanho_chunk": tamanhos,
+    }
+    cabecalho = {
+        "total": len(tamanhos),
+        "media_tamanho": float(tamanhos.mean()) if len(tamanhos) else 0.0,
+        "k1": K1,
+        "b": B,
+    }
+    escrever_colunas(caminho, colunas, cabecalho)
+
+
+class IndiceBM25:
+    """Índice invertido BM25 mapeado em memória.
+
+    Só o vocabulário é decodificado (no primeiro uso); as postings de cada
+    termo da pergunta são fatias do mmap.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        cabecalho, self._colunas, self._mapa = ler_colunas(caminho)
+        self.total = cabecalho["total"]
+        self.k1 = cabecalho["k1"]
+        self.b = cabecalho["b"]
+
+        # Parte do BM25 que só depende do tamanho do chunk
+        tamanhos = self._colunas["tamanho_chunk"].astype(np.float32)
+        media = cabecalho["media_tamanho"] or 1.0
+        self._normalizacao = self.k1 * (1 - self.b + self.b * tamanhos / media)
+        self._termos = None
+
+    def __len__(self):
+        return self.total
+
+    def _vocabulario(self):
+        if self._termos is None:
+            offsets = self._colunas["termo_offsets"]
+            blob = self._colunas["termo_blob"].tobytes()
+            self._termos = {
+                blob[int(offsets[i]):int(offsets[i + 1])].decode('utf-8'): i
+                for i in range(len(offsets) - 1)
+            }
+        return self._termos
+
+    def buscar(self, pergunta, top_k, permitidos=None):
+        """Posições e pontuações dos top_k chunks, da maior para a menor.
+
+        `permitidos` (máscara booleana por chunk) restringe a busca a parte
+        do corpus, como os shards escolhidos pelo roteamento.
+        """
+        termos = self._vocabulario()
+        offsets = self._colunas["postings_offsets"]
+        pontuacoes = np.zeros(self.total, dtype=np.float32)
+
+        for termo in set(tokenizar(pergunta)):
+            indice = termos.get(termo)
+            if indice is None:
+                continue
+            inicio, fim = int(offsets[indice]), int(offsets[indice + 1])
+            chunks = self._colunas["postings_chunk"][inicio:fim]
+            tf = self._colunas["postings_tf"][inicio:fim].astype(np.float32)
+
+            df = fim - inicio
+            idf = math.log(1 + (self.total - df + 0.5) / (df + 0.5))
+            # Cada termo aparece uma vez por chunk nas postings
+            pontuacoes[chunks] += idf * tf * (self.k1 + 1) / (tf + self._normalizacao[chunks])
+
+        if permitidos is not None:
+            pontuacoes[~permitidos] = 0
+        candidatos = np.flatnonzero(pontuacoes)
+        if len(candidatos) > top_k:
+            candidatos = np.sort(candidatos[np.argpartition(-pontuacoes[candidatos], top_k - 1)[:top_k]])
+        # Empates ficam na ordem do documento
+        ordem = candidatos[np.argsort(-pontuacoes[candidatos], kind='stable')]
+        return ordem, pontuacoes[ordem]
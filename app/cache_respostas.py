@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import numpy as np
+
+from indice_artigos import normalizar_texto
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_RESPOSTAS_DIR = os.path.join(project_root, '.cache', 'respostas')
+
+# Similaridade de cosseno mínima entre os vetores das perguntas para que uma
+# resposta seja reaproveitada (além do mesmo conjunto de chunks recuperados)
+LIMIAR_SIMILARIDADE = 0.95
+
+# Validade de cada resposta e tamanho máximo do cache em disco; ao passar do
+# tamanho, as respostas usadas há mais tempo são descartadas
+TTL_RESPOSTAS = 7 * 24 * 3600
+TAMANHO_MAX_BYTES = 256 * 2**20
+
+_CHAVE_VERSAO = ("versao",)
+
+
+def normalizar_pergunta(pergunta):
+    """Minúsculas, sem acentos, pontuação e espaços repetidos."""
+    return re.sub(r'[\W_]+', ' ', normalizar_texto(pergunta)).strip()
+
+
+def resumo_historico(turnos):
+    """Digest dos turnos (role, conteúdo) da conversa que vão para o prompt;
+    None sem histórico."""
+    if not turnos:
+        return None
+    texto = json.dumps([[role, conteudo] for role, conteudo in turnos], ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def chave_pergunta(pergunta, escopo=None, historico=None):
+    """Chave da pergunta no cache; com `escopo` (por exemplo, a área
+    escolhida na interface), a mesma pergunta em escopos diferentes não se
+    confunde. `historico` (resumo_historico) separa as perguntas feitas no
+    meio de conversas diferentes, como "e a pena?"."""
+    chave = normalizar_pergunta(pergunta)
+    if historico is not None:
+        return (escopo, chave, historico)
+    return chave if escopo is None else (escopo, chave)
+
+
+class CacheRespostas:
+    """Cache persistente de respostas do chatbot, em disco (diskcache).
+
+    Uma resposta é reaproveitada quando a pergunta normalizada é idêntica, ou
+    quando o vetor da pergunta é semelhante o bastante e a recuperação trouxe
+    exatamente os mesmos chunks; nos dois casos, o histórico da conversa
+    (resumo_historico) também tem de ser o mesmo. Cada entrada guarda a
+    versão do índice em que foi gerada; quando o índice FAISS ou os metadados
+    são reconstruídos, a versão muda e o cache inteiro é descartado.
+
+    Os vetores da busca por similaridade ficam em memória, por processo, e
+    são lidos do disco só quando a versão do índice muda: com
+    `servidor.py --workers N`, a busca exata vê as respostas de todos os
+    processos, mas a por similaridade só as guardadas pelo próprio processo
+    desde então.
+    """
+
+    def __init__(self, diretorio=CACHE_RESPOSTAS_DIR, limiar=LIMIAR_SIMILARIDADE,
+                 ttl=TTL_RESPOSTAS, tamanho_max_bytes=TAMANHO_MAX_BYTES):
+        import diskcache
+
+        self._cache = diskcache.Cache(
+            diretorio,
+            size_limit=tamanho_max_bytes,
+            eviction_policy='least-recently-used',
+        )
+        self.limiar = limiar
+        self.ttl = ttl
+
+        # Vetores das perguntas em memória, para a busca por similaridade; as
+        # respostas em si ficam só no disco
+        self._lock = threading.Lock()
+        self._versao = None
+        self._chaves = []
+        self._ids = []
+        self._historicos = []
+        self._vetores = None
+
+    def _sincronizar(self, versao):
+        """Descarta o cache se a versão do índice mudou; carrega os vetores."""
+        if versao == self._versao:
+            return
+
+        if self._cache.get(_CHAVE_VERSAO) != versao:
+            self._cache.clear()
+            self._cache.set(_CHAVE_VERSAO, versao)
+
+        self._chaves, self._ids, self._historicos, vetores = [], [], [], []
+        for chave in self._cache.iterkeys():
+            if chave == _CHAVE_VERSAO:
+                continue
+            entrada = self._cache.get(chave)
+            if entrada is None or entrada["versao"] != versao:
+                continue
+            self._chaves.append(chave)
+            self._ids.append(entrada["ids"])
+            self._historicos.append(entrada.get("historico"))
+            vetores.append(entrada["vetor"])
+
+        self._vetores = np.array(vetores, dtype=np.float32) if vetores else None
+        self._versao = versao
+
+    def _esquecer(self, posicao):
+        del self._chaves[posicao]
+        del self._ids[posicao]
+        del self._historicos[posicao]
+        self._vetores = np.delete(self._vetores, posicao, axis=0)
+        if not self._chaves:
+            self._vetores = None
+
+    def buscar_exata(self, pergunta, versao, escopo=None, historico=None):
+        """Resposta guardada para a mesma pergunta normalizada, ou None."""
+        with self._lock:
+            self._sincronizar(versao)
+            entrada = self._cache.get(chave_pergunta(pergunta, escopo, historico))
+        if entrada is None or entrada["versao"] != versao:
+            return None
+        return entrada["resposta"]
+
+    def buscar_semelhante(self, vetor, ids, versao, historico=None):
+        """Resposta de uma pergunta semelhante que recuperou os mesmos chunks,
+        com o mesmo histórico."""
+        vetor = np.asarray(vetor, dtype=np.float32).reshape(-1)
+        vetor = vetor / (np.linalg.norm(vetor) or 1.0)
+        ids = tuple(ids)
+
+        with self._lock:
+            self._sincronizar(versao)
+            if self._vetores is None:
+                return None
+
+            similaridades = self._vetores @ vetor
+            for posicao in np.argsort(-similaridades):
+                if similaridades[posicao] < self.limiar:
+                    break
+                if self._ids[posicao] != ids or self._historicos[posicao] != historico:
+                    continue
+
+                chave = self._chaves[posicao]
+                entrada = self._cache.get(chave)
+                if entrada is None or entrada["versao"] != versao:
+                    # Expirada ou descartada pelo LRU desde o carregamento
+                    self._esquecer(posicao)
+                    return None
+                return entrada["resposta"]
+
+        return None
+
+    def guardar(self, pergunta, vetor, ids, resposta, versao, escopo=None, historico=None):
+        vetor = np.asarray(vetor, dtype=np.float32).reshape(-1)
+        vetor = vetor / (np.linalg.norm(vetor) or 1.0)
+        chave = chave_pergunta(pergunta, escopo, historico)
+        entrada = {"vetor": vetor, "ids": tuple(ids), "resposta": resposta, "versao": versao,
+                   "historico": historico}
+
+        with self._lock:
+            self._sincronizar(versao)
+            self._cache.set(chave, entrada, expire=self.ttl)
+
+            if chave in self._chaves:
+                self._esquecer(self._chaves.index(chave))
+            self._chaves.append(chave)
+            self._ids.append(entrada["ids"])
+            self._historicos.append(historico)
+            if self._vetores is None:
+                self._vetores = vetor[None, :]
+            else:
+                self._vetores = np.vstack([self._vetores, vetor])
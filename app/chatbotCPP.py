@@ -1,184 +1,120 @@
-import re
 import streamlit as st
-import faiss
-import os, json
-import numpy as np
+import json
+import httpx
 
 from langchain_core.messages import AIMessage, HumanMessage
-from llama_cpp import Llama
-from sentence_transformers import SentenceTransformer
-    
 
-# Carregando índice FAISS, juntamente com toda a 
-# legislação processada e salva em arquivo json
-# além de pegar os caminhos de todos os arquivos utilizados
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-index_path = os.path.join(project_root, 'data', 'legislacao_embeddings', 'faiss_embeddings.bin')
-artigos_path = os.path.join(project_root, 'data', 'legislacao_embeddings', 'artigos_chunks.jsonl')
-model_path = os.path.join(project_root, 'Llama-3.2-3B', 'Llama3.2-maIN.gguf')
 
-index = faiss.read_index(index_path)
+# A recuperação e a geração ficam na API do chatbot (servidor.py); esta
+# interface é apenas um cliente dela
+API_URL = "http://127.0.0.1:8080"
 
-with open(artigos_path, 'r', encoding='utf-8') as f:
-    artigos = [json.loads(linha) for linha in f if linha.strip()]
-    f.close()
-
-model_embeddings = SentenceTransformer('all-MiniLM-L6-v2')
-
-# Caminho para o modelo GGUF baixado
-# MODEL_PATH = "../Llama-3.2-3B/Llama3.2-maIN.gguf"  # Altere conforme necessário
+# Prazo da resposta completa (a API limita cada pedido a TIMEOUT_PEDIDO)
+TIMEOUT_API = 200
 
 # Configurações do Streamlit
 st.set_page_config(page_title="Seu assistente virtual 🤖", page_icon="🤖")
 st.title("Seu assistente virtual 🤖")
 
-# Inicializa o modelo Llama-CPP
-@st.cache_resource
-def load_model():
-    return Llama(
-        model_path=model_path,
-        n_gpu_layers=-1,     # Usa GPU se disponível
-        n_ctx=2048,          # Janela de contexto
-        temperature=0.1,     # Mais precisão e menos criatividade
-    )
-
-llm = load_model()
-
-# Busca o contexto da pergunta, baseado no FAISS
-def extrair_numero_artigo(pergunta):
-    """Extrai o número do artigo da pergunta, se existir."""
-    match = re.search(r"artigo\s*(\d+)", pergunta, re.IGNORECASE)
-    if match:
-        return int(match.group(1))
-    return None
-
-def recupera_contexto(pergunta, top_k=3, max_chars=1600):
-    numero_artigo = extrair_numero_artigo(pergunta)
-
-    grupos = {}
-    contexto = ""
-    total = 0
-
-    if numero_artigo is not None:
-        # Estratégia 1: Buscar manualmente chunks que contenham o artigo específico
-        artigos_filtrados = [
-            artigo for artigo in artigos
-            if str(numero_artigo) in artigo.get('artigo', '')
-        ]
-
-        if artigos_filtrados:
-            # Agrupar os chunks por ID base
-            for artigo in artigos_filtrados:
-                id_completo = artigo.get('id', '')
-                id_base = id_completo.rsplit("_chunk_", 1)[0]
-
-                if id_base not in grupos:
-                    grupos[id_base] = {
-                        "tipo": artigo.get('tipo', 'Tipo desconhecido'),
-                        "artigo": artigo.get('artigo', 'Artigo desconhecido'),
-                        "fonte": artigo.get('fonte', 'Fonte desconhecida'),
-                        "partes": []
-                    }
-
-                grupos[id_base]["partes"].append({
-                    "parte": artigo.get("parte", 1),
-                    "conteudo": artigo.get("conteudo", "").strip()
-                })
-
-    if not grupos:
-        # Estratégia 2: Busca normal via embeddings se não achou pelo número de artigo
-        vetor_pergunta = model_embeddings.encode([pergunta])
-        D, I = index.search(np.array(vetor_pergunta, dtype=np.float32), top_k)
-
-        for idx in I[0]:
-            if idx < 0 or idx >= len(artigos):
-                continue
-
-            artigo = artigos[idx]
-            id_completo = artigo.get('id', '')
-            id_base = id_completo.rsplit("_chunk_", 1)[0]
-
-            if id_base not in grupos:
-                grupos[id_base] = {
-                    "tipo": artigo.get('tipo', 'Tipo desconhecido'),
-                    "artigo": artigo.get('artigo', 'Artigo desconhecido'),
-                    "fonte": artigo.get('fonte', 'Fonte desconhecida'),
-                    "partes": []
-                }
-
-            grupos[id_base]["partes"].append({
-                "parte": artigo.get("parte", 1),
-                "conteudo": artigo.get("conteudo", "").strip()
-            })
-
-    # Montar o contexto final
-    for id_base, dados in grupos.items():
-        tipo = dados["tipo"]
-        artigo = dados["artigo"]
-        fonte = dados["fonte"]
-
-        # Ordenar as partes pelo número da 'parte'
-        partes_ordenadas = sorted(dados["partes"], key=lambda x: x["parte"])
-        texto_completo = "\n".join(p["conteudo"] for p in partes_ordenadas)
-
-        bloco_formatado = f"[{tipo}] {artigo} - {fonte}\n{texto_completo}\n\n"
-
-        if total + len(bloco_formatado) > max_chars:
-            break
-
-        contexto += bloco_formatado
-        total += len(bloco_formatado)
-
-    return contexto
-
-
-def model_response(user_query, chat_history):
-    """Gera resposta usando o modelo Llama-CPP, com contexto jurídico passado
-    , no modo chat."""
 
-    # Recuperação do contexto a ser utilizado
-    contexto = recupera_contexto(user_query)
-    print("Chunks recuperados")
-    print("="*40)
-    print(f"Contexto: \n{contexto}")
-    print("="*40)
-
-    # Lista de mensagens no formato esperado
-    messages = []
-
-    # Mensagem de sistema (comportamento do assistente)
-    system_prompt = (
-        "Você é um assistente jurídico especializado em leis brasileiras. "
-        "Todas as respostas devem ser baseadas apenas nas informações fornecidas no contexto a seguir. "
-        "Se a informação não estiver presente, diga que não pode responder com base nos dados fornecidos.\n\n"
-        # "=== CONTEXTO INÍCIO ===\n"
-        f"{contexto}\n"
-        # "=== CONTEXTO FIM ===\n"
-        "Utilize o contexto como base, porém, melhore a resposta para uma maneira mais formal."
-    )
-    messages.append({"role": "system", "content": system_prompt})
-
-    # Adiciona o histórico de conversa no formato correto
+def historico_json(chat_history):
+    """Histórico no formato da API: [{"role": "user" | "assistant", "content": ...}]."""
+    mensagens = []
     for msg in chat_history:
         if isinstance(msg, HumanMessage):
-            messages.append({"role": "user", "content": msg.content})
+            mensagens.append({"role": "user", "content": msg.content})
         elif isinstance(msg, AIMessage):
-            messages.append({"role": "assistant", "content": msg.content})
+            mensagens.append({"role": "assistant", "content": msg.content})
+    return mensagens
+
+
+def eventos_sse(linhas):
+    """Agrupa as linhas de um stream server-sent events em (evento, dados)."""
+    evento, dados = "message", []
+    for linha in linhas:
+        if not linha:
+            if dados:
+                yield evento, json.loads("\n".join(dados))
+            evento, dados = "message", []
+        elif linha.startswith("event:"):
+            evento = linha[len("event:"):].strip()
+        elif linha.startswith("data:"):
+            dados.append(linha[len("data:"):].strip())
+
+
+def status_api():
+    """Status da inicialização da API ("carregando", "ok" ou "erro"), ou None
+    se ela não responder."""
+    try:
+        resposta = httpx.get(f"{API_URL}/saude", timeout=2)
+        resposta.raise_for_status()
+        return resposta.json().get("status")
+    except httpx.HTTPError:
+        return None
 
-    # Adiciona a nova mensagem do usuário
-    messages.append({"role": "user", "content": user_query})
 
+@st.cache_data(ttl=300)
+def carregar_areas():
+    """Tipos de legislação disponíveis na API; vazio se ela não responder."""
     try:
-        # Geração de resposta com create_chat_completion
-        response = llm.create_chat_completion(
-            messages=messages,
-            max_tokens=1024,
-            stream=False
+        resposta = httpx.get(f"{API_URL}/areas", timeout=10)
+        resposta.raise_for_status()
+        return resposta.json()["areas"]
+    except httpx.HTTPError:
+        return []
+
+
+def model_response(user_query, chat_history, area=None):
+    """Gera resposta usando o modelo Llama-CPP, com contexto jurídico passado
+    , no modo chat."""
+    try:
+        resposta = httpx.post(
+            f"{API_URL}/chat",
+            json={"pergunta": user_query, "historico": historico_json(chat_history), "area": area},
+            timeout=TIMEOUT_API,
         )
-        return response["choices"][0]["message"]["content"].strip()
+        resposta.raise_for_status()
+        return resposta.json()["resposta"]
+    except httpx.HTTPError as e:
+        return f"❌ Erro ao consultar a API do chatbot: {str(e)}"
 
-    except Exception as e:
-        return f"❌ Erro ao gerar resposta: {str(e)}"
+
+def model_response_stream(user_query, chat_history, ao_aguardar=None, area=None):
+    """Mesmo que model_response, mas devolve a resposta token a token.
+
+    Enquanto o pedido aguarda o modelo, `ao_aguardar(posição, segundos)` é
+    chamado a cada atualização da fila e, quando a resposta começa, uma
+    última vez com posição 0. Fechar o gerador encerra a conexão, o que
+    cancela o pedido na API.
+    """
+    iniciada = False
+    try:
+        with httpx.stream(
+            "POST", f"{API_URL}/chat/stream",
+            json={"pergunta": user_query, "historico": historico_json(chat_history), "area": area},
+            timeout=httpx.Timeout(TIMEOUT_API, connect=10),
+        ) as resposta:
+            resposta.raise_for_status()
+            for evento, dados in eventos_sse(resposta.iter_lines()):
+                if evento == "fila":
+                    if ao_aguardar is not None:
+                        ao_aguardar(dados["posicao"], dados["espera"])
+                elif evento == "trecho":
+                    if not iniciada and ao_aguardar is not None:
+                        ao_aguardar(0, 0)
+                    iniciada = True
+                    yield dados["texto"]
+                elif evento == "fim":
+                    break
+    except httpx.HTTPError as e:
+        yield f"❌ Erro ao consultar a API do chatbot: {str(e)}"
+
+
+def acumular(trechos, partes):
+    """Repassa os trechos do stream, guardando-os em `partes`."""
+    for trecho in trechos:
+        partes.append(trecho)
+        yield trecho
 
 # Inicialização do histórico de mensagens
 if "chat_history" not in st.session_state:
@@ -186,6 +122,22 @@ if "chat_history" not in st.session_state:
         AIMessage(content="Olá, sou o seu assistente virtual! Como posso ajudar você?"),
     ]
 
+# A página não espera os modelos: a API os carrega em segundo plano
+status = status_api()
+if status == "carregando":
+    st.sidebar.info("⏳ Os modelos ainda estão carregando; a primeira resposta pode demorar.")
+elif status == "erro":
+    st.sidebar.error("❌ A API não conseguiu carregar os modelos; veja o log do servidor.")
+elif status is None:
+    st.sidebar.warning(f"API do chatbot fora do ar ({API_URL}); inicie o `python servidor.py`.")
+
+# Área da legislação em que a busca é feita; "Todas" deixa a escolha dos
+# índices para a própria pergunta. As áreas só são pedidas (e guardadas em
+# cache) com o índice carregado
+area = st.sidebar.selectbox("Área da legislação", ["Todas"] + (carregar_areas() if status == "ok" else []))
+if area == "Todas":
+    area = None
+
 # Exibe o histórico de mensagens
 for message in st.session_state.chat_history:
     role = "AI" if isinstance(message, AIMessage) else "Human"
@@ -200,10 +152,27 @@ if user_query:
     with st.chat_message("Human"):
         st.markdown(user_query)
 
-    # Gera resposta da IA
+    # Gera resposta da IA, exibindo os tokens conforme são gerados. Se o
+    # usuário enviar outra mensagem, o Streamlit interrompe este script e a
+    # conexão é fechada, o que cancela o pedido na API
     with st.chat_message("AI"):
-        resp = model_response(user_query, st.session_state.chat_history)
-        st.markdown(resp)
-
-    # Adiciona resposta ao histórico
-    st.session_state.chat_history.append(AIMessage(content=resp))
+        # Posição na fila e tempo de espera, enquanto outro pedido usa o modelo
+        aviso_fila = st.empty()
+
+        def mostrar_fila(posicao, espera):
+            if posicao:
+                aviso_fila.caption(f"⏳ Aguardando o modelo: posição {posicao} na fila ({espera:.0f} s)")
+            else:
+                aviso_fila.empty()
+
+        partes = []
+        trechos = model_response_stream(user_query, st.session_state.chat_history, mostrar_fila, area)
+        try:
+            st.write_stream(acumular(trechos, partes))
+        finally:
+            trechos.close()
+
+            # Adiciona resposta ao histórico, mesmo que parcial
+            resp = "".join(partes).strip()
+            if resp:
+                st.session_state.chat_history.append(AIMessage(content=resp))
@@ -0,0 +1,226 @@
+"""Remove os artigos repetidos antes do build dos embeddings.
+
+Etapa entre convert_jsonl.py e prepare_embeddings_chunks.py. Lê os
+rag_*.jsonl de data/legislacao_pronta e grava os mesmos arquivos em
+data/legislacao_deduplicada, com um único artigo (o canônico, o primeiro na
+ordem dos documentos) por grupo de repetidos:
+
+- cópias exatas: mesmo conteúdo normalizado (minúsculas, sem acentos,
+  pontuação e espaços repetidos);
+- quase cópias: similaridade de Jaccard de pelo menos LIMIAR_JACCARD entre
+  as sequências de SHINGLE palavras, como no texto do ADCT e das emendas que
+  repete o da parte permanente da Constituição. Os candidatos vêm de MinHash
+  com LSH e a similaridade é conferida nos conjuntos de shingles.
+
+Os artigos mantêm o formato de convert_jsonl.py. O id, a fonte, o tipo e o
+artigo de cada repetido ficam em aliases.json, por id do canônico, com
+"exato" falso para as quase cópias: o build os grava com os chunks, o
+índice de artigos do chatbot continua encontrando o texto por qualquer um
+deles e o cabeçalho do contexto distingue o mesmo texto do texto quase
+idêntico. Uso, a partir de app/:
+
+    python deduplicacao.py
+"""
+import os
+import re
+import glob
+import json
+import hashlib
+import argparse
+import numpy as np
+
+from indice_artigos import normalizar_texto
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+input_path = os.path.join(project_root, 'data', 'legislacao_pronta')
+output_path = os.path.join(project_root, 'data', 'legislacao_deduplicada')
+aliases_path = os.path.join(output_path, 'aliases.json')
+
+# Quase cópias: shingles de SHINGLE palavras e Jaccard mínimo entre eles.
+# Com 5 palavras, uma única palavra diferente em um artigo de 100 palavras
+# já leva a similaridade para ~0.9
+SHINGLE = 5
+LIMIAR_JACCARD = 0.9
+
+# Assinatura MinHash de BANDAS * LINHAS valores. Dois artigos são candidatos
+# se coincidem em todas as linhas de alguma banda; com 16 x 8, pares com
+# Jaccard 0.9 são candidatos com probabilidade > 0.99, e pares com 0.5, < 0.07
+BANDAS = 16
+LINHAS = 8
+
+_padrao_palavras = re.compile(r'\w+')
+
+
+def normalizar_conteudo(texto):
+    return ' '.join(_padrao_palavras.findall(normalizar_texto(texto)))
+
+
+def id_unico(artigo_id, ocorrencias):
+    """Id do artigo com sufixo a partir da segunda ocorrência na fonte.
+
+    O mesmo número de artigo aparece mais de uma vez em uma fonte (emendas,
+    ADCT); `ocorrencias` conta as vistas até aqui, na ordem do documento.
+    """
+    ocorrencias[artigo_id] = ocorrencias.get(artigo_id, 0) + 1
+    if ocorrencias[artigo_id] > 1:
+        return f"{artigo_id}_ocorrencia_{ocorrencias[artigo_id]}"
+    return artigo_id
+
+
+def _hash64(texto):
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def shingles(texto_normalizado):
+    """Hashes (uint64) das sequências de SHINGLE palavras do texto."""
+    palavras = texto_normalizado.split()
+    if len(palavras) <= SHINGLE:
+        return np.array([_hash64(' '.join(palavras))], dtype=np.uint64)
+    return np.unique(np.array(
+        [_hash64(' '.join(palavras[i:i + SHINGLE])) for i in range(len(palavras) - SHINGLE + 1)],
+        dtype=np.uint64,
+    ))
+
+
+class MinHash:
+    """Assinaturas MinHash por hashing multiply-shift, com permutações fixas."""
+
+    def __init__(self, permutacoes=BANDAS * LINHAS, semente=1):
+        aleatorio = np.random.default_rng(semente)
+        self.a = aleatorio.integers(1, 2**63, size=(permutacoes, 1), dtype=np.uint64) | np.uint64(1)
+        self.b = aleatorio.integers(0, 2**63, size=(permutacoes, 1), dtype=np.uint64)
+
+    def assinatura(self, hashes):
+        # (a * x + b) mod 2^64, pelos 32 bits altos; o estouro do uint64 é o módulo
+        with np.errstate(over='ignore'):
+            valores = (self.a * (hashes[None, :] & np.uint64(0xFFFFFFFF)) + self.b) >> np.uint64(32)
+        return valores.min(axis=1)
+
+
+def jaccard(a, b):
+    return len(np.intersect1d(a, b, assume_unique=True)) / len(np.union1d(a, b))
+
+
+def agrupar(conteudos, limiar=LIMIAR_JACCARD):
+    """Índice do canônico de cada conteúdo: ele mesmo, ou o primeiro do
+    grupo de cópias exatas e quase cópias em que ele está."""
+    pai = list(range(len(conteudos)))
+
+    def raiz(i):
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    def unir(i, j):
+        i, j = raiz(i), raiz(j)
+        if i != j:
+            # O canônico é sempre o que aparece primeiro
+            pai[max(i, j)] = min(i, j)
+
+    # Cópias exatas
+    normalizados = [normalizar_conteudo(c) for c in conteudos]
+    primeiro = {}
+    for i, texto in enumerate(normalizados):
+        unir(primeiro.setdefault(texto, i), i)
+
+    # Quase cópias, entre os textos distintos
+    distintos = sorted(set(primeiro.values()))
+    minhash = MinHash()
+    conjuntos = {i: shingles(normalizados[i]) for i in distintos}
+    baldes = {}
+    for i in distintos:
+        assinatura = minhash.assinatura(conjuntos[i])
+        for banda in range(BANDAS):
+            chave = (banda, assinatura[banda * LINHAS:(banda + 1) * LINHAS].tobytes())
+            baldes.setdefault(chave, []).append(i)
+
+    verificados = set()
+    for membros in baldes.values():
+        for posicao, i in enumerate(membros):
+            for j in membros[posicao + 1:]:
+                if (i, j) in verificados or raiz(i) == raiz(j):
+                    continue
+                verificados.add((i, j))
+                if jaccard(conjuntos[i], conjuntos[j]) >= limiar:
+                    unir(i, j)
+
+    return [raiz(i) for i in range(len(conteudos))]
+
+
+def deduplicar(artigos, limiar=LIMIAR_JACCARD):
+    """Retorna (artigos canônicos na ordem original, {id do canônico: aliases}).
+
+    Os ids precisam ser únicos (id_unico).
+    """
+    canonicos = agrupar([artigo['conteudo'] for artigo in artigos], limiar)
+    aliases = {}
+    for i, canonico in enumerate(canonicos):
+        if canonico != i:
+            alias = {campo: artigos[i].get(campo, '') for campo in ("id", "fonte", "tipo", "artigo")}
+            # Cópia exata do canônico ou quase cópia, com texto diferente
+            alias["exato"] = (normalizar_conteudo(artigos[i]['conteudo'])
+                              == normalizar_conteudo(artigos[canonico]['conteudo']))
+            aliases.setdefault(artigos[canonico]['id'], []).append(alias)
+    return [artigo for i, artigo in enumerate(artigos) if canonicos[i] == i], aliases
+
+
+def carregar_aliases(caminho=aliases_path):
+    """{id do artigo canônico: aliases}; vazio sem a etapa de deduplicação."""
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove artigos repetidos antes do build dos embeddings.")
+    parser.add_argument('--limiar', type=float, default=LIMIAR_JACCARD,
+                        help="similaridade de Jaccard mínima para considerar dois artigos quase cópias")
+    args = parser.parse_args()
+
+    # Todas as fontes juntas: um texto repetido em duas leis também é agrupado
+    arquivos = sorted(glob.glob(os.path.join(input_path, 'rag_*.jsonl')))
+    artigos = []
+    origem = {}
+    ocorrencias = {}
+    for arquivo in arquivos:
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if linha.strip():
+                    artigo = json.loads(linha)
+                    artigo['id'] = id_unico(artigo['id'], ocorrencias)
+                    artigos.append(artigo)
+                    # O canônico é gravado no arquivo da sua fonte
+                    origem[artigo['id']] = os.path.basename(arquivo)
+
+    canonicos, aliases = deduplicar(artigos, args.limiar)
+    repetidos = len(artigos) - len(canonicos)
+    exatos = len(artigos) - len({normalizar_conteudo(artigo['conteudo']) for artigo in artigos})
+
+    os.makedirs(output_path, exist_ok=True)
+    saidas = {os.path.basename(arquivo): [] for arquivo in arquivos}
+    for artigo in canonicos:
+        saidas[origem[artigo['id']]].append(artigo)
+    for nome, artigos_arquivo in saidas.items():
+        caminho = os.path.join(output_path, nome)
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+            for artigo in artigos_arquivo:
+                f.write(json.dumps(artigo, ensure_ascii=False) + '\n')
+        os.replace(caminho + '.tmp', caminho)
+    with open(aliases_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(aliases, f, ensure_ascii=False)
+    os.replace(aliases_path + '.tmp', aliases_path)
+
+    # Fontes que saíram de legislacao_pronta
+    for caminho in glob.glob(os.path.join(output_path, 'rag_*.jsonl')):
+        if os.path.basename(caminho) not in saidas:
+            os.remove(caminho)
+
+    print(f"{len(artigos)} artigos lidos: {exatos} cópias exatas e {repetidos - exatos} quase cópias "
+          f"(Jaccard >= {args.limiar})")
+    print(f"{len(canonicos)} artigos salvos em: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Encoder das perguntas em ONNX Runtime, com quantização int8 dinâmica.
+
+Exporta o mesmo modelo do SentenceTransformer para ONNX, gera a versão
+quantizada e verifica a paridade com o PyTorch sobre o índice real. Uso,
+a partir de app/:
+
+    python encoder_onnx.py --amostras 200
+
+Em tempo de consulta só são importados onnxruntime e tokenizers, sem torch.
+"""
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+encoder_onnx_path = os.path.join(project_root, 'data', 'encoder_onnx')
+
+# Threads do ONNX Runtime por consulta; os demais núcleos ficam com o llama.cpp
+THREADS_ENCODER = 2
+
+# Concordância mínima do top-k (ONNX int8 x PyTorch) para o encoder ser usado
+MIN_CONCORDANCIA = 0.9
+
+
+def exportar_onnx(nome_modelo, diretorio=encoder_onnx_path, opset=17):
+    """Exporta o transformer para ONNX (fp32) e gera a versão int8."""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    model = SentenceTransformer(nome_modelo, device='cpu')
+    transformer = model[0]
+    pooling = next((m for m in model if isinstance(m, models.Pooling)), None)
+    if pooling is None or pooling.get_pooling_mode_str() not in ('mean', 'cls'):
+        raise ValueError("Só modelos com pooling mean ou cls podem ser exportados")
+
+    os.makedirs(diretorio, exist_ok=True)
+    tokenizer = model.tokenizer
+    tokenizer.save_pretrained(diretorio)
+
+    entradas = [nome for nome in ('input_ids', 'attention_mask', 'token_type_ids')
+                if nome in tokenizer.model_input_names]
+    exemplo = tokenizer(["Qual é a pena para homicídio simples?"], return_tensors='pt')
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.auto_model = transformer.auto_model.eval()
+
+        def forward(self, *tensores):
+            return self.auto_model(**dict(zip(entradas, tensores))).last_hidden_state
+
+    eixos = {nome: {0: 'lote', 1: 'sequencia'} for nome in entradas + ['token_embeddings']}
+    caminho_fp32 = os.path.join(diretorio, 'modelo.onnx')
+    torch.onnx.export(
+        TokenEmbeddings(),
+        tuple(exemplo[nome] for nome in entradas),
+        caminho_fp32,
+        input_names=entradas,
+        output_names=['token_embeddings'],
+        dynamic_axes=eixos,
+        opset_version=opset,
+        dynamo=False,
+    )
+
+    # Pesos em int8, ativações quantizadas em tempo de execução
+    quantize_dynamic(caminho_fp32, os.path.join(diretorio, 'modelo_int8.onnx'), weight_type=QuantType.QInt8)
+
+    config = {
+        "modelo": nome_modelo,
+        "max_seq_length": model.max_seq_length,
+        "minusculas": bool(getattr(transformer, 'do_lower_case', False)),
+        "pooling": pooling.get_pooling_mode_str(),
+        "normalizar": any(isinstance(m, models.Normalize) for m in model),
+        "entradas": entradas,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    salvar_config(diretorio, config)
+    return config
+
+
+def carregar_config(diretorio=encoder_onnx_path):
+    caminho = os.path.join(diretorio, 'config_encoder.json')
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def salvar_config(diretorio, config):
+    with open(os.path.join(diretorio, 'config_encoder.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+def encoder_disponivel(nome_modelo, diretorio=encoder_onnx_path):
+    """True se o modelo foi exportado e a versão int8 passou na paridade."""
+    config = carregar_config(diretorio)
+    return (
+        config is not None
+        and config.get("modelo") == nome_modelo
+        and config.get("paridade", {}).get("aprovado", False)
+    )
+
+
+class EncoderOnnx:
+    """Mesma interface de SentenceTransformer.encode para uma lista de textos."""
+
+    def __init__(self, diretorio=encoder_onnx_path, quantizado=True, threads=THREADS_ENCODER):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.config = carregar_config(diretorio)
+        if self.config is None:
+            raise FileNotFoundError(f"Encoder ONNX não exportado em {diretorio}")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(diretorio, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.intra_op_num_threads = threads
+        opcoes.inter_op_num_threads = 1
+        arquivo = 'modelo_int8.onnx' if quantizado else 'modelo.onnx'
+        self.sessao = onnxruntime.InferenceSession(
+            os.path.join(diretorio, arquivo), opcoes, providers=['CPUExecutionProvider']
+        )
+
+    def encode(self, textos):
+        if self.config["minusculas"]:
+            textos = [texto.lower() for texto in textos]
+        codificados = self.tokenizer.encode_batch(list(textos))
+
+        mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+        valores = {
+            "input_ids": np.array([c.ids for c in codificados], dtype=np.int64),
+            "attention_mask": mascara,
+            "token_type_ids": np.array([c.type_ids for c in codificados], dtype=np.int64),
+        }
+        tokens = self.sessao.run(None, {nome: valores[nome] for nome in self.config["entradas"]})[0]
+
+        if self.config["pooling"] == 'cls':
+            vetores = tokens[:, 0]
+        else:
+            pesos = mascara[:, :, None].astype(np.float32)
+            vetores = (tokens * pesos).sum(axis=1) / np.clip(pesos.sum(axis=1), 1e-9, None)
+
+        if self.config["normalizar"]:
+            vetores = vetores / np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+        return np.asarray(vetores, dtype=np.float32)
+
+
+def latencia_ms(encoder, consultas):
+    """Latência mediana (ms) de uma consulta por vez, como no chatbot."""
+    tempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        encoder.encode([consulta])
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.percentile(tempos, 50))
+
+
+def verificar_paridade(nome_modelo, diretorio=encoder_onnx_path, k=3, amostras=200, seed=42):
+    """Concordância do top-k no índice real entre os vetores ONNX e os do PyTorch.
+
+    As consultas são as perguntas fixas dos benchmarks e o início de uma
+    amostra de chunks do corpus.
+    """
+    from sentence_transformers import SentenceTransformer
+    from recuperacao import MotorRecuperacao
+    from benchmarks.perguntas import PERGUNTAS
+
+    motor = MotorRecuperacao(nome_modelo=nome_modelo)
+    estado = motor.estado()
+    rng = np.random.default_rng(seed)
+    posicoes = rng.choice(len(estado.artigos), size=min(amostras, len(estado.artigos)), replace=False)
+    consultas = list(PERGUNTAS) + [estado.artigos[int(p)]['conteudo'][:300] for p in posicoes]
+
+    modelo_torch = SentenceTransformer(nome_modelo, device='cpu')
+    referencia = np.asarray(modelo_torch.encode(consultas), dtype=np.float32)
+    _, I_ref, _ = motor.buscar(referencia, k, estado)
+
+    resultado = {"k": k, "consultas": len(consultas), "latencia_torch_ms": latencia_ms(modelo_torch, PERGUNTAS)}
+    for nome, quantizado in (("fp32", False), ("int8", True)):
+        encoder = EncoderOnnx(diretorio, quantizado=quantizado)
+        vetores = encoder.encode(consultas)
+        _, I, _ = motor.buscar(vetores, k, estado)
+        resultado[nome] = {
+            f"concordancia@{k}": float(np.mean([
+                len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(I, I_ref)
+            ])),
+            "cosseno_min": float(np.min(np.sum(vetores * referencia, axis=1))),
+            "latencia_ms": latencia_ms(encoder, PERGUNTAS),
+        }
+    resultado["aprovado"] = resultado["int8"][f"concordancia@{k}"] >= MIN_CONCORDANCIA
+    return resultado
+
+
+def main():
+    from recuperacao import NOME_MODELO_EMBEDDINGS
+
+    parser = argparse.ArgumentParser(description="Exporta o encoder das perguntas para ONNX int8.")
+    parser.add_argument('--modelo', default=NOME_MODELO_EMBEDDINGS, help="modelo do SentenceTransformer")
+    parser.add_argument('--k', type=int, default=3, help="top-k comparado na paridade (o chatbot usa 3)")
+    parser.add_argument('--amostras', type=int, default=200, help="chunks do corpus usados como consulta")
+    args = parser.parse_args()
+
+    exportar_onnx(args.modelo)
+    print(f"Encoder exportado em: {encoder_onnx_path}")
+
+    paridade = verificar_paridade(args.modelo, k=args.k, amostras=args.amostras)
+    config = carregar_config()
+    config["paridade"] = paridade
+    salvar_config(encoder_onnx_path, config)
+
+    print(json.dumps(paridade, ensure_ascii=False, indent=2))
+    if not paridade["aprovado"]:
+        print(f"Concordância abaixo de {MIN_CONCORDANCIA}; o chatbot continuará usando o PyTorch")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import time
+import queue
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from geracao import gerar_resposta_stream
+from telemetria import Rastro
+
+# Pedidos aguardando o modelo, além do que está em geração; acima disso os
+# novos pedidos são recusados em vez de esperar indefinidamente
+MAX_FILA = 8
+
+# Prazo de cada pedido, da chegada ao fim da resposta (espera + geração)
+TIMEOUT_PEDIDO = 180
+
+# Threads de recuperação (embedding, FAISS, BM25), que preparam os pedidos
+# da fila enquanto o modelo gera a resposta de outro
+WORKERS_RECUPERACAO = 4
+
+# Resultado da preparação de um pedido: mensagens para o modelo ou, se a
+# resposta já está pronta (cache), a própria resposta; `dados` fica com quem
+# preparou (por exemplo, a recuperação usada, para guardar no cache depois)
+Preparo = namedtuple('Preparo', ['mensagens', 'resposta', 'dados'])
+
+_FIM = object()
+
+
+class FilaCheia(Exception):
+    pass
+
+
+class Pedido:
+    def __init__(self, fila, cancelar, rastro=None):
+        self.fila = fila
+        self.cancelar = cancelar or threading.Event()
+        # Tempos de espera, prefill e decodificação (telemetria)
+        self.rastro = rastro or Rastro()
+        self.chegada = time.monotonic()
+        self.prazo = self.chegada + fila.timeout
+        self.futuro = None
+        self.preparo = None
+        # True quando o modelo terminou a resposta, sem erro, cancelamento nem prazo esgotado
+        self.completo = False
+        # Exceção que interrompeu a geração, se houve
+        self.erro = None
+        self.saida = queue.Queue()
+
+    def espera(self):
+        return time.monotonic() - self.chegada
+
+    def eventos(self, intervalo=0.5):
+        """Eventos do pedido, para quem o enviou.
+
+        Enquanto aguarda o modelo, gera ("fila", posição, segundos de espera)
+        a cada `intervalo`; depois, ("trecho", texto) para cada trecho da
+        resposta. Fechar o gerador antes do fim cancela o pedido.
+        """
+        concluido = False
+        try:
+            while True:
+                try:
+                    item = self.saida.get(timeout=intervalo)
+                except queue.Empty:
+                    posicao = self.fila.posicao(self)
+                    if posicao and time.monotonic() > self.prazo and self.fila.remover(self):
+                        yield ("trecho", "❌ Tempo de espera esgotado; tente novamente em instantes.")
+                        concluido = True
+                        return
+                    if posicao:
+                        yield ("fila", posicao, self.espera())
+                    continue
+
+                if item is _FIM:
+                    concluido = True
+                    return
+                yield ("trecho", item)
+        finally:
+            if not concluido:
+                self.cancelar.set()
+                self.fila.remover(self)
+
+
+class FilaGeracao:
+    """Serializa o acesso ao único Llama do processo.
+
+    Os pedidos de todas as sessões entram em uma fila FIFO de tamanho
+    limitado e são gerados, um por vez, por uma thread dedicada. A
+    recuperação de cada pedido é enviada ao pool assim que ele chega, de
+    modo que embedding e busca correm enquanto o modelo atende outro
+    pedido; quando a vez chega, as mensagens já estão prontas. Pedidos cuja
+    resposta veio do cache saem da fila sem passar pelo modelo.
+    """
+
+    def __init__(self, llm, max_fila=MAX_FILA, timeout=TIMEOUT_PEDIDO, workers_recuperacao=WORKERS_RECUPERACAO):
+        self.llm = llm
+        self.max_fila = max_fila
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._pendentes = deque()
+        self._recuperacao = ThreadPoolExecutor(max_workers=workers_recuperacao, thread_name_prefix='recuperacao')
+        threading.Thread(target=self._executar, name='geracao', daemon=True).start()
+
+    def enviar(self, preparar, cancelar=None, rastro=None):
+        """Enfileira um pedido; `preparar()` roda no pool e devolve um Preparo."""
+        pedido = Pedido(self, cancelar, rastro)
+        with self._cond:
+            if len(self._pendentes) >= self.max_fila:
+                raise FilaCheia(f"{len(self._pendentes)} pedidos aguardando o modelo")
+            pedido.futuro = self._recuperacao.submit(preparar)
+            self._pendentes.append(pedido)
+            self._cond.notify_all()
+
+        pedido.futuro.add_done_callback(lambda _: self._preparado(pedido))
+        return pedido
+
+    def posicao(self, pedido):
+        """Posição do pedido na fila (1 = próximo); 0 se já saiu dela."""
+        with self._cond:
+            try:
+                return self._pendentes.index(pedido) + 1
+            except ValueError:
+                return 0
+
+    def remover(self, pedido):
+        """Tira o pedido da fila; False se ele já foi para o modelo."""
+        with self._cond:
+            try:
+                self._pendentes.remove(pedido)
+            except ValueError:
+                return False
+            self._cond.notify_all()
+            return True
+
+    @staticmethod
+    def _dispensa_modelo(pedido):
+        futuro = pedido.futuro
+        return futuro.exception() is not None or futuro.result().resposta is not None
+
+    @staticmethod
+    def _responder_sem_modelo(pedido):
+        erro = pedido.futuro.exception()
+        if erro is not None:
+            pedido.erro = erro
+            pedido.saida.put(f"❌ Erro ao recuperar o contexto: {erro}")
+        else:
+            pedido.preparo = pedido.futuro.result()
+            pedido.saida.put(pedido.preparo.resposta)
+
+    def _preparado(self, pedido):
+        # Resposta em cache ou erro na recuperação: o pedido é concluído aqui,
+        # se ainda estiver na fila; senão, a thread de geração cuida dele
+        if self._dispensa_modelo(pedido) and self.remover(pedido):
+            self._responder_sem_modelo(pedido)
+            pedido.saida.put(_FIM)
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._pendentes:
+                    self._cond.wait()
+                pedido = self._pendentes.popleft()
+                self._cond.notify_all()
+            pedido.rastro.registrar_etapa('fila', pedido.espera())
+
+            try:
+                self._gerar(pedido)
+            except Exception as e:
+                pedido.erro = e
+                pedido.saida.put(f"❌ Erro ao gerar resposta: {str(e)}")
+            finally:
+                pedido.saida.put(_FIM)
+
+    def _gerar(self, pedido):
+        if pedido.cancelar.is_set():
+            return
+
+        restante = pedido.prazo - time.monotonic()
+        if restante <= 0:
+            pedido.saida.put("❌ Tempo de espera esgotado; tente novamente em instantes.")
+            return
+
+        # Normalmente a recuperação já terminou enquanto o pedido aguardava.
+        # wait() não propaga as exceções da recuperação: um TimeoutError dela
+        # (rede, socket) é um erro da recuperação, não o prazo do pedido
+        if not wait([pedido.futuro], timeout=restante).done:
+            pedido.saida.put("❌ Tempo esgotado ao recuperar o contexto; tente novamente.")
+            return
+
+        if self._dispensa_modelo(pedido):
+            self._responder_sem_modelo(pedido)
+            return
+
+        pedido.preparo = pedido.futuro.result()
+
+        # Prefill: até o primeiro trecho. Depois, cada trecho do stream do
+        # llama.cpp corresponde a um token
+        inicio = time.perf_counter()
+        primeiro = None
+        tokens = 0
+        trechos = gerar_resposta_stream(self.llm, pedido.preparo.mensagens, cancelar=pedido.cancelar)
+        try:
+            for trecho in trechos:
+                if primeiro is None:
+                    primeiro = time.perf_counter()
+                    pedido.rastro.registrar_etapa('prefill', primeiro - inicio)
+                tokens += 1
+                pedido.saida.put(trecho)
+                if time.monotonic() > pedido.prazo:
+                    pedido.saida.put("\n\n❌ Tempo limite da resposta atingido.")
+                    return
+        finally:
+            trechos.close()
+            if primeiro is not None:
+                decodificacao = time.perf_counter() - primeiro
+                pedido.rastro.registrar_etapa('decodificacao', decodificacao)
+                pedido.rastro.registrar('tokens_resposta', tokens)
+                if tokens > 1 and decodificacao > 0:
+                    pedido.rastro.registrar('tokens_por_s', round((tokens - 1) / decodificacao, 2))
+        pedido.completo = not pedido.cancelar.is_set()
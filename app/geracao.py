@@ -0,0 +1,239 @@
+import os
+from langchain_core.messages import AIMessage, HumanMessage
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Janela de contexto do modelo e orçamento reservado para a resposta
+N_CTX = 2048
+MAX_TOKENS_RESPOSTA = 1024
+
+# Tokens do template de chat por mensagem (cabeçalho de papel e fim de turno)
+# e tokens fixos do prompt (BOS e cabeçalho da resposta do assistente)
+TOKENS_POR_MENSAGEM = 6
+TOKENS_FIXOS = 8
+
+# Teto do contexto jurídico, equivalente ao antigo limite de 1600 caracteres,
+# para que o histórico recente não seja sempre descartado
+MAX_TOKENS_CONTEXTO = 512
+
+# Mensagens do histórico maiores que isto são sempre cortadas neste tamanho,
+# em qualquer turno: a forma de cada mensagem não depende do espaço livre
+MAX_TOKENS_MENSAGEM_HISTORICO = 96
+
+# O orçamento do histórico é a janela menos a resposta, as instruções, o
+# contexto (MAX_TOKENS_CONTEXTO) e uma pergunta deste tamanho. É o mesmo em
+# todos os turnos; perguntas maiores ocupam o espaço do contexto
+TOKENS_RESERVADOS_PERGUNTA = 64
+
+# Quando o histórico não cabe, as mensagens mais antigas saem em grupos de
+# DESCARTE_HISTORICO (turnos inteiros), contados do início da conversa: o
+# começo do histórico enviado só muda a cada DESCARTE_HISTORICO mensagens
+DESCARTE_HISTORICO = 4
+
+# Cache do estado (KV) do llama.cpp indexado por prefixo de tokens: "ram",
+# "disco" ou None para desativar. Cada sessão deixa no cache o estado da sua
+# conversa; o LRU descarta os mais antigos ao passar da capacidade
+CACHE_KV = "ram"
+CACHE_KV_BYTES = 1 << 30
+CACHE_KV_DIR = os.path.join(project_root, '.cache', 'llama_kv')
+
+# Temperatura da amostragem. No llama-cpp-python ela vale por geração: o
+# parâmetro no construtor do Llama é ignorado
+TEMPERATURA = 0.1
+
+# Decodificação especulativa por busca no prompt (prompt lookup): os tokens
+# de rascunho são copiados do trecho do prompt que continua o n-grama final
+# da resposta e verificados pelo modelo em um único lote. Compensa porque as
+# respostas citam os artigos do contexto. Desativada por padrão; ver
+# benchmarks/especulativa.py
+DECODIFICACAO_ESPECULATIVA = False
+TOKENS_RASCUNHO = 10
+MAX_NGRAM_RASCUNHO = 2
+
+INSTRUCOES_SISTEMA = (
+    "Você é um assistente jurídico especializado em leis brasileiras. "
+    "Todas as respostas devem ser baseadas apenas nas informações fornecidas no contexto enviado junto com cada pergunta. "
+    "Se a informação não estiver presente, diga que não pode responder com base nos dados fornecidos.\n\n"
+)
+INSTRUCOES_FINAIS = "Utilize o contexto como base, porém, melhore a resposta para uma maneira mais formal."
+
+
+def configurar_cache_kv(llm, tipo=CACHE_KV, capacidade_bytes=CACHE_KV_BYTES):
+    """Anexa ao Llama um cache de estado por prefixo de prompt.
+
+    A cada geração o llama.cpp guarda o estado após prompt + resposta; na
+    próxima chamada, o estado com o maior prefixo em comum é restaurado e só
+    os tokens novos passam pelo prefill.
+    """
+    if not tipo:
+        return llm
+
+    from llama_cpp import LlamaRAMCache, LlamaDiskCache
+
+    if tipo == "ram":
+        cache = LlamaRAMCache(capacity_bytes=capacidade_bytes)
+    elif tipo == "disco":
+        cache = LlamaDiskCache(cache_dir=CACHE_KV_DIR, capacity_bytes=capacidade_bytes)
+    else:
+        raise ValueError(f"Tipo de cache KV desconhecido: {tipo}")
+
+    llm.set_cache(cache)
+    return llm
+
+
+def criar_rascunho(tokens=TOKENS_RASCUNHO, max_ngram=MAX_NGRAM_RASCUNHO):
+    """Modelo de rascunho do prompt lookup, passado ao Llama como draft_model.
+
+    Com ele o llama-cpp-python calcula os logits de todas as posições, o que
+    precisa ser decidido na criação do Llama.
+    """
+    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+    return LlamaPromptLookupDecoding(max_ngram_size=max_ngram, num_pred_tokens=tokens)
+
+
+def contar_tokens(llm, texto):
+    return len(llm.tokenize(texto.encode('utf-8'), add_bos=False, special=True))
+
+
+def truncar_tokens(llm, texto, max_tokens):
+    """Corta o texto nos primeiros max_tokens tokens do tokenizador do modelo."""
+    tokens = llm.tokenize(texto.encode('utf-8'), add_bos=False, special=True)
+    if len(tokens) <= max_tokens:
+        return texto
+    if max_tokens <= 0:
+        return ""
+    return llm.detokenize(tokens[:max_tokens]).decode('utf-8', errors='ignore')
+
+
+def turnos_historico(chat_history, user_query):
+    """Pares (role, conteúdo) do histórico que vão para o prompt.
+
+    A pergunta atual já foi adicionada ao histórico pela interface e não
+    deve ser repetida.
+    """
+    historico = list(chat_history)
+    if historico and isinstance(historico[-1], HumanMessage) and historico[-1].content == user_query:
+        historico.pop()
+
+    turnos = []
+    for msg in historico:
+        if isinstance(msg, HumanMessage):
+            turnos.append(("user", msg.content))
+        elif isinstance(msg, AIMessage):
+            turnos.append(("assistant", msg.content))
+    return turnos
+
+
+def montar_mensagens(llm, blocos_contexto, chat_history, user_query, max_tokens_resposta=MAX_TOKENS_RESPOSTA):
+    """Monta a lista de mensagens no formato esperado pelo create_chat_completion.
+
+    O tamanho é medido em tokens reais do modelo. Da janela de contexto é
+    reservado o orçamento da resposta; o histórico tem um orçamento fixo, e
+    o restante vai para a pergunta atual e para o contexto jurídico
+    recuperado (na ordem de relevância).
+
+    As mensagens são montadas para o cache KV, que restaura o estado com o
+    maior prefixo de tokens em comum com o prompt. O prefixo reaproveitado
+    esperado é o das instruções do sistema mais o histórico até a pergunta
+    anterior, exclusive: cada mensagem do histórico vai sempre na mesma
+    forma (a pergunta sem contexto e a resposta dada, cortadas em
+    MAX_TOKENS_MENSAGEM_HISTORICO) e o início do histórico só avança de
+    DESCARTE_HISTORICO em DESCARTE_HISTORICO mensagens. O contexto, que
+    muda a cada pergunta, vai depois desse prefixo, junto da pergunta na
+    última mensagem; a pergunta anterior (enviada no seu turno com o
+    contexto) e a resposta a ela passam de novo pelo prefill.
+    """
+    disponivel = llm.n_ctx() - max_tokens_resposta - TOKENS_FIXOS
+
+    # Instruções do sistema e pergunta atual sempre entram
+    system_prompt = INSTRUCOES_SISTEMA + INSTRUCOES_FINAIS
+    disponivel -= contar_tokens(llm, system_prompt + "Contexto:\n\nPergunta: ") + 2 * TOKENS_POR_MENSAGEM
+
+    # Histórico, com cada mensagem limitada a MAX_TOKENS_MENSAGEM_HISTORICO
+    mensagens_historico = []
+    for role, conteudo in turnos_historico(chat_history, user_query):
+        if contar_tokens(llm, conteudo) > MAX_TOKENS_MENSAGEM_HISTORICO:
+            conteudo = truncar_tokens(llm, conteudo, MAX_TOKENS_MENSAGEM_HISTORICO) + "…"
+        mensagens_historico.append({"role": role, "content": conteudo})
+
+    # Menor início em que o histórico cabe no orçamento, arredondado para
+    # cima até um múltiplo de DESCARTE_HISTORICO
+    custos = [contar_tokens(llm, m["content"]) + TOKENS_POR_MENSAGEM for m in mensagens_historico]
+    orcamento_historico = disponivel - MAX_TOKENS_CONTEXTO - TOKENS_RESERVADOS_PERGUNTA
+    inicio, restante = 0, sum(custos)
+    while inicio < len(custos) and restante > orcamento_historico:
+        restante -= custos[inicio]
+        inicio += 1
+    inicio = min(-(-inicio // DESCARTE_HISTORICO) * DESCARTE_HISTORICO, len(custos))
+    mensagens_historico = mensagens_historico[inicio:]
+    disponivel -= sum(custos[inicio:])
+
+    pergunta = truncar_tokens(llm, user_query, disponivel)
+    disponivel -= contar_tokens(llm, pergunta)
+
+    # Contexto jurídico, bloco a bloco; o primeiro bloco é cortado se for
+    # maior que todo o orçamento, para que a pergunta nunca fique sem contexto
+    contexto = ""
+    orcamento_contexto = min(disponivel, MAX_TOKENS_CONTEXTO)
+    for bloco in blocos_contexto:
+        tokens_bloco = contar_tokens(llm, bloco)
+        if tokens_bloco > orcamento_contexto:
+            if not contexto:
+                contexto = truncar_tokens(llm, bloco, orcamento_contexto)
+            break
+        contexto += bloco
+        orcamento_contexto -= tokens_bloco
+
+    # Mensagem de sistema (comportamento do assistente) e histórico: prefixo estável
+    messages = [{"role": "system", "content": system_prompt}]
+    messages.extend(mensagens_historico)
+
+    # Adiciona a nova mensagem do usuário, com o contexto desta pergunta
+    messages.append({"role": "user", "content": f"Contexto:\n{contexto}\nPergunta: {pergunta}"})
+
+    return messages
+
+
+def gerar_resposta(llm, messages, max_tokens=MAX_TOKENS_RESPOSTA, temperatura=TEMPERATURA):
+    """Gera a resposta completa de uma vez."""
+    try:
+        # Geração de resposta com create_chat_completion
+        response = llm.create_chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperatura,
+            stream=False
+        )
+        return response["choices"][0]["message"]["content"].strip()
+
+    except Exception as e:
+        return f"❌ Erro ao gerar resposta: {str(e)}"
+
+
+def gerar_resposta_stream(llm, messages, max_tokens=MAX_TOKENS_RESPOSTA, cancelar=None, temperatura=TEMPERATURA):
+    """Gera a resposta token a token, devolvendo os trechos de texto.
+
+    `cancelar` é um threading.Event opcional: quando sinalizado, a geração
+    para no próximo token. Fechar o gerador também encerra a geração no
+    llama.cpp, já que o stream subjacente é fechado junto. Erros do modelo
+    são propagados a quem consome o gerador, para que uma resposta
+    interrompida não seja tomada como completa.
+    """
+    stream = None
+    try:
+        stream = llm.create_chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperatura,
+            stream=True
+        )
+        for parte in stream:
+            if cancelar is not None and cancelar.is_set():
+                break
+            trecho = parte["choices"][0]["delta"].get("content")
+            if trecho:
+                yield trecho
+
+    finally:
+        if stream is not None:
+            stream.close()
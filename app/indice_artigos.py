@@ -0,0 +1,135 @@
+import re
+import json
+import unicodedata
+
+# Número do artigo com sufixo opcional: "5", "5º", "5-A", "5A", "121 - B"
+padrao_numero_artigo = re.compile(r"(\d+)(?:\s*[ºª°])?(?:\s*-\s*([A-Za-z])\b|([A-Z])\b)?")
+
+# Menção a um ou mais artigos na pergunta: "artigo 5", "art. 121",
+# "arts. 5, 6 e 7", "artigos 5º-A e 7"
+padrao_mencao_artigos = re.compile(
+    r"\b(?i:art(?:igo)?s?)\b\.?\s*"
+    r"(\d+(?:\s*[ºª°])?(?:\s*-\s*[A-Za-z]\b|[A-Z]\b)?"
+    r"(?:\s*(?:,|\b(?i:e|ou)\b)\s*\d+(?:\s*[ºª°])?(?:\s*-\s*[A-Za-z]\b|[A-Z]\b)?)*)"
+)
+
+# Formas usuais de citar cada fonte, já normalizadas (minúsculas, sem acentos)
+ALIASES_FONTES = {
+    "codigo penal": ["codigo penal", "cp"],
+    "constituicao federal": ["constituicao federal", "constituicao", "cf", "cf/88", "carta magna"],
+    "declaracao universal dos direitos humanos": [
+        "declaracao universal dos direitos humanos", "declaracao universal", "dudh"
+    ],
+}
+
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos, para comparar nomes de fontes."""
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower().strip()
+
+
+def normalizar_artigo(artigo):
+    """Converte "Artigo 5-A" em ("5", "A"); retorna None se não houver número."""
+    match = padrao_numero_artigo.search(artigo)
+    if not match:
+        return None
+    numero = str(int(match.group(1)))
+    sufixo = (match.group(2) or match.group(3) or "").upper()
+    return numero, sufixo
+
+
+def chave_artigo(fonte, numero, sufixo=""):
+    return f"{normalizar_texto(fonte)}|{numero}|{sufixo}"
+
+
+def construir_indice_artigos(chunks):
+    """Mapeia (fonte, número, sufixo) para as ocorrências do artigo.
+
+    Um mesmo número pode aparecer várias vezes na mesma fonte (emendas, ADCT),
+    então cada chave aponta para uma lista de ocorrências, na ordem do
+    documento, e cada ocorrência para as posições dos seus chunks, na ordem
+    das partes. Os artigos repetidos removidos na deduplicação ("aliases" do
+    chunk) apontam para os chunks do artigo que ficou.
+    """
+    indice = {}
+    fontes = set()
+    chaves_anteriores = []
+    for posicao, chunk in enumerate(chunks):
+        chaves = []
+        for artigo in [chunk] + chunk.get('aliases', []):
+            fontes.add(normalizar_texto(artigo.get('fonte', '')))
+            numero = normalizar_artigo(artigo.get('artigo', ''))
+            if numero is None:
+                continue
+            chave = chave_artigo(artigo.get('fonte', ''), *numero)
+            if chave not in chaves:
+                chaves.append(chave)
+
+        for chave in chaves:
+            ocorrencias = indice.setdefault(chave, [])
+            if chave not in chaves_anteriores or chunk.get('parte', 1) == 1:
+                ocorrencias.append([])
+            ocorrencias[-1].append(posicao)
+        chaves_anteriores = chaves
+
+    return {"total_chunks": len(chunks), "fontes": sorted(fontes), "artigos": indice}
+
+
+def salvar_indice_artigos(indice, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False)
+
+
+def carregar_indice_artigos(caminho):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def extrair_artigos(pergunta):
+    """Lista, sem repetição e na ordem citada, os artigos mencionados."""
+    artigos = []
+    for mencao in padrao_mencao_artigos.finditer(pergunta):
+        for match in padrao_numero_artigo.finditer(mencao.group(1)):
+            artigo = (str(int(match.group(1))), (match.group(2) or match.group(3) or "").upper())
+            if artigo not in artigos:
+                artigos.append(artigo)
+    return artigos
+
+
+def detectar_fontes(pergunta, fontes):
+    """Fontes (normalizadas) citadas na pergunta, dentre as existentes no índice."""
+    pergunta = normalizar_texto(pergunta)
+    encontradas = []
+    for fonte in fontes:
+        for alias in ALIASES_FONTES.get(fonte, [fonte]):
+            if re.search(rf"(?<!\w){re.escape(alias)}(?!\w)", pergunta):
+                encontradas.append(fonte)
+                break
+    return encontradas
+
+
+def buscar_artigos(indice, pergunta):
+    """Ocorrências (listas de posições de chunks) dos artigos citados.
+
+    Se a pergunta cita uma fonte, a busca fica restrita a ela; caso contrário
+    o artigo é procurado em todas as fontes. As primeiras ocorrências de cada
+    artigo citado vêm antes das demais, para que o orçamento de contexto
+    privilegie o texto do próprio artigo e não menções posteriores a ele.
+    """
+    artigos = extrair_artigos(pergunta)
+    if not artigos:
+        return []
+
+    fontes = detectar_fontes(pergunta, indice["fontes"]) or indice["fontes"]
+
+    encontradas = []
+    for ordem, (numero, sufixo) in enumerate(artigos):
+        for fonte in fontes:
+            ocorrencias = indice["artigos"].get(chave_artigo(fonte, numero, sufixo), [])
+            for rank, posicoes in enumerate(ocorrencias):
+                encontradas.append((rank, ordem, posicoes))
+
+    encontradas.sort(key=lambda item: (item[0], item[1]))
+    return [posicoes for _, _, posicoes in encontradas]
@@ -0,0 +1,220 @@
+import re
+import faiss
+import numpy as np
+
+from indice_artigos import normalizar_texto
+
+# Tipos de índice suportados no build. Os parâmetros de busca (ef_search,
+# nprobe) ficam registrados no manifesto e são aplicados pelo chatbot
+TIPOS_INDICE = ['flat', 'hnsw', 'ivf', 'ivfpq']
+
+CONFIG_PADRAO = {
+    "tipo": "flat",
+    "hnsw_m": 32,
+    "ef_construction": 40,
+    "ef_search": 64,
+    "nlist": 256,
+    "nprobe": 16,
+    "pq_m": 16,
+    "pq_bits": 8,
+}
+
+
+# Precisão com que os vetores são guardados: float32 (original), float16 ou
+# int8 por dimensão (quantização escalar, treinada no corpus). Não se aplica
+# ao IVF-PQ, que já comprime os vetores
+ARMAZENAMENTOS = {"float32": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}
+
+# A PCA é treinada no corpus (de cada shard); shards com menos de
+# AMOSTRAS_POR_DIMENSAO vetores por dimensão de saída mantêm a dimensão
+# original. A PCA centraliza os vetores, o que muda a ordem do produto
+# interno mas preserva as distâncias: esses índices usam a distância L2, que
+# em vetores normalizados ordena como o cosseno (ver similaridade())
+AMOSTRAS_POR_DIMENSAO = 10
+
+# Um índice (shard) por fonte. O treino de um IVF pede ao menos ~39 vetores
+# por lista; shards menores que isso usam a busca exata, que para eles já é
+# rápida
+VETORES_POR_LISTA = 39
+
+
+def nome_shard(fonte):
+    """Nome do shard de uma fonte: "Código Penal" -> "codigo_penal"."""
+    return re.sub(r'\W+', '_', normalizar_texto(fonte)).strip('_') or 'sem_fonte'
+
+
+def config_do_shard(config, total):
+    """Configuração do índice de um shard com `total` chunks."""
+    if config["tipo"] in ('ivf', 'ivfpq') and total < config["nlist"] * VETORES_POR_LISTA:
+        config = {"tipo": "flat", **{k: v for k, v in config.items() if k in ('armazenamento', 'pca')}}
+    if "pca" in config and total < config["pca"] * AMOSTRAS_POR_DIMENSAO:
+        config = {k: v for k, v in config.items() if k != 'pca'}
+    return config
+
+
+def adicionar_argumentos(parser):
+    """Opções de linha de comando para escolher o tipo de índice."""
+    parser.add_argument('--tipo-indice', choices=TIPOS_INDICE, default=CONFIG_PADRAO['tipo'],
+                        help="flat (exato), hnsw, ivf (IVF-Flat) ou ivfpq (IVF-PQ)")
+    parser.add_argument('--hnsw-m', type=int, default=CONFIG_PADRAO['hnsw_m'],
+                        help="HNSW: vizinhos por nó do grafo")
+    parser.add_argument('--ef-construction', type=int, default=CONFIG_PADRAO['ef_construction'],
+                        help="HNSW: largura da busca durante a construção")
+    parser.add_argument('--ef-search', type=int, default=CONFIG_PADRAO['ef_search'],
+                        help="HNSW: largura da busca nas consultas")
+    parser.add_argument('--nlist', type=int, default=CONFIG_PADRAO['nlist'],
+                        help="IVF: número de listas (centróides)")
+    parser.add_argument('--nprobe', type=int, default=CONFIG_PADRAO['nprobe'],
+                        help="IVF: listas visitadas por consulta")
+    parser.add_argument('--pq-m', type=int, default=CONFIG_PADRAO['pq_m'],
+                        help="IVF-PQ: subquantizadores (bytes por vetor com 8 bits)")
+    parser.add_argument('--pq-bits', type=int, default=CONFIG_PADRAO['pq_bits'],
+                        help="IVF-PQ: bits por subquantizador")
+    parser.add_argument('--armazenamento', choices=list(ARMAZENAMENTOS), default='float32',
+                        help="precisão dos vetores guardados: float32, fp16 ou sq8 (int8); não se aplica ao ivfpq")
+    parser.add_argument('--pca', type=int,
+                        help="reduz os vetores a esta dimensão por PCA, treinada no corpus")
+
+
+def config_de_args(args):
+    """Monta a configuração do índice com apenas os parâmetros do tipo escolhido."""
+    config = {"tipo": args.tipo_indice}
+    if args.tipo_indice == 'hnsw':
+        config.update(hnsw_m=args.hnsw_m, ef_construction=args.ef_construction, ef_search=args.ef_search)
+    elif args.tipo_indice in ('ivf', 'ivfpq'):
+        config.update(nlist=args.nlist, nprobe=args.nprobe)
+        if args.tipo_indice == 'ivfpq':
+            config.update(pq_m=args.pq_m, pq_bits=args.pq_bits)
+    if args.armazenamento != 'float32' and args.tipo_indice != 'ivfpq':
+        config["armazenamento"] = args.armazenamento
+    if args.pca:
+        config["pca"] = args.pca
+    return config
+
+
+def descricao_factory(config):
+    """String do faiss.index_factory correspondente à configuração.
+
+    A PCA, quando configurada, vira uma transformação (IndexPreTransform)
+    dentro do próprio índice: as consultas são reduzidas automaticamente.
+    """
+    tipo = config["tipo"]
+    armazenamento = config.get("armazenamento", "float32")
+    codificacao = ARMAZENAMENTOS[armazenamento]
+    pca = f"PCA{config['pca']}," if "pca" in config else ""
+
+    if tipo == 'flat':
+        return pca + codificacao
+    if tipo == 'hnsw':
+        if armazenamento == 'float32':
+            return pca + f"HNSW{config['hnsw_m']}"
+        return pca + f"HNSW{config['hnsw_m']}_{codificacao}"
+    if tipo == 'ivf':
+        return pca + f"IVF{config['nlist']},{codificacao}"
+    if tipo == 'ivfpq':
+        return pca + f"IVF{config['nlist']},PQ{config['pq_m']}x{config['pq_bits']}"
+    raise ValueError(f"Tipo de índice desconhecido: {tipo}")
+
+
+def metrica(config):
+    return faiss.METRIC_L2 if "pca" in config else faiss.METRIC_INNER_PRODUCT
+
+
+def similaridade(index, D):
+    """Converte os resultados de index.search em similaridade de cosseno.
+
+    Com vetores normalizados, ||q - x||² = 2 - 2 q·x; assim índices L2 (com
+    PCA) e de produto interno podem ter os resultados combinados.
+    """
+    if index.metric_type == faiss.METRIC_L2:
+        return 1 - D / 2
+    return D
+
+
+def indice_base(index):
+    """Índice que guarda os vetores, sem o IndexIDMap e a transformação (PCA)."""
+    index = faiss.downcast_index(index)
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexPreTransform)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def usa_idmap(config):
+    """Se o índice guarda os ids em um IndexIDMap2.
+
+    Os IVF guardam os ids nas próprias listas invertidas e recebem os do
+    chunk direto em add_with_ids. Envolvê-los no IndexIDMap2 quebra a
+    remoção: o mapa assume que os vetores seguintes são renumerados, como no
+    Flat, mas o IVF não renumera nada, e os ids passam a apontar para outros
+    chunks. Flat e HNSW não aceitam ids próprios e precisam do mapa.
+    """
+    return config["tipo"] not in ('ivf', 'ivfpq')
+
+
+def ids_do_indice(index):
+    """Ids guardados no índice, na ordem interna dos vetores."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map)
+    listas = faiss.extract_index_ivf(index).invlists
+    ids = [faiss.rev_swig_ptr(listas.get_ids(lista), listas.list_size(lista)).copy()
+           for lista in range(listas.nlist) if listas.list_size(lista)]
+    return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+
+def criar_index(config, vector_dim, vetores_treino=None):
+    """Cria o índice e o treina, se necessário. Ver usa_idmap()."""
+    descricao = descricao_factory(config)
+    if usa_idmap(config):
+        descricao = "IDMap2," + descricao
+    index = faiss.index_factory(vector_dim, descricao, metrica(config))
+
+    if config["tipo"] == 'hnsw':
+        indice_base(index).hnsw.efConstruction = config['ef_construction']
+
+    if not index.is_trained:
+        if vetores_treino is None or len(vetores_treino) == 0:
+            raise ValueError(f"O índice {config['tipo']} precisa de vetores para treinamento")
+        index.train(np.asarray(vetores_treino, dtype=np.float32))
+
+    aplicar_parametros_busca(index, config)
+    return index
+
+
+def aplicar_parametros_busca(index, config):
+    """Aplica os parâmetros de busca registrados (efSearch, nprobe)."""
+    if not config:
+        return
+    parametros = faiss.ParameterSpace()
+    if "ef_search" in config:
+        parametros.set_index_parameter(index, "efSearch", config["ef_search"])
+    if "nprobe" in config:
+        parametros.set_index_parameter(index, "nprobe", config["nprobe"])
+
+
+def remover_ids(index, ids, config):
+    """Remove ids do índice; para o HNSW, que não suporta remoção, reconstrói.
+
+    No Flat (IndexIDMap2) e no IVF (ids nas listas) a remoção preserva a
+    correspondência entre os ids que ficam e os seus vetores.
+
+    Retorna o índice resultante, que pode ser um novo objeto, ou None se o
+    HNSW ficou vazio (e precisa ser criado de novo com os vetores novos).
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if config["tipo"] != 'hnsw':
+        index.remove_ids(ids)
+        return index
+
+    # No IndexIDMap2 os vetores internos seguem a ordem de id_map. Com
+    # vetores comprimidos (fp16, sq8, PCA) a reconstrução é aproximada, e
+    # serve também para treinar o novo índice
+    ids_atuais = faiss.vector_to_array(index.id_map)
+    manter = ~np.isin(ids_atuais, ids)
+    if not manter.any():
+        return None
+    vetores = index.index.reconstruct_n(0, index.ntotal)[manter]
+
+    novo_index = criar_index(config, index.d, vetores)
+    novo_index.add_with_ids(vetores, ids_atuais[manter])
+    return novo_index
@@ -0,0 +1,173 @@
+"""Perguntas em lote: lê um JSONL de perguntas e grava as respostas em outro.
+
+Para conjuntos de regressão, pré-geração de perguntas frequentes e cargas
+offline. Uso, a partir de app/:
+
+    python lote.py perguntas.jsonl --saida respostas.jsonl --workers 2
+
+Cada linha da entrada é um objeto com a pergunta (campo --campo-pergunta,
+"pergunta" por padrão), um id opcional (--campo-id; sem ele, o número da
+linha) e, opcionalmente, a "area". As perguntas são codificadas em uma
+única chamada ao encoder e buscadas em lote no FAISS; as respostas são
+geradas por --workers processos, cada um com o seu Llama (os pesos do GGUF,
+mapeados em memória, são compartilhados entre eles), e gravadas na saída
+assim que ficam prontas, com os ids dos chunks recuperados (os candidatos,
+dos quais o prompt usa os primeiros que cabem) e os tempos.
+
+Uma execução interrompida continua de onde parou: as perguntas cujo id já
+está na saída são puladas. Respostas com erro do modelo não são gravadas
+nem guardadas no cache, e a pergunta é refeita na execução seguinte.
+"""
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from recuperacao import MotorRecuperacao
+from geracao import montar_mensagens, gerar_resposta
+from pipeline import PipelineRAG, carregar_llm, model_path
+from recursos import modo_offline
+
+# Llama de cada worker (ou do próprio processo, com um só)
+_llm = None
+
+
+def _iniciar_worker(caminho, threads):
+    global _llm
+    _llm = carregar_llm(caminho, threads=threads)
+
+
+def _responder(indice, pergunta, blocos):
+    inicio = time.perf_counter()
+    mensagens = montar_mensagens(_llm, blocos, [], pergunta)
+    resposta = gerar_resposta(_llm, mensagens)
+    return indice, resposta, time.perf_counter() - inicio
+
+
+def ler_perguntas(caminho, campo_pergunta='pergunta', campo_id='id'):
+    perguntas = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            dados = json.loads(linha)
+            pergunta = dados.get(campo_pergunta)
+            if not isinstance(pergunta, str) or not pergunta.strip():
+                print(f"Linha {numero} sem o campo '{campo_pergunta}'; ignorada")
+                continue
+            perguntas.append({"id": dados.get(campo_id, numero), "pergunta": pergunta, "area": dados.get("area")})
+    return perguntas
+
+
+def falhou(resposta):
+    return resposta is not None and resposta.startswith("❌")
+
+
+def concluidas(caminho, com_resposta=True):
+    """Ids já gravados na saída, exceto os de respostas com erro.
+
+    Com `com_resposta`, só contam as linhas com resposta: as gravadas por
+    uma execução com --sem-geracao voltam a ser respondidas. Uma última
+    linha incompleta (execução interrompida no meio da escrita) é removida
+    do arquivo, e a pergunta dela volta a ser respondida.
+    """
+    if not os.path.exists(caminho):
+        return set()
+    with open(caminho, 'r+b') as f:
+        dados = f.read()
+        fim = dados.rfind(b'\n') + 1
+        if fim < len(dados):
+            f.truncate(fim)
+    registros = (json.loads(linha) for linha in dados[:fim].splitlines() if linha.strip())
+    return {
+        str(registro["id"]) for registro in registros
+        if not falhou(registro.get("resposta")) and (registro.get("resposta") or not com_resposta)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde um arquivo JSONL de perguntas em lote.")
+    parser.add_argument('entrada', help="JSONL com uma pergunta por linha")
+    parser.add_argument('--saida', required=True, help="JSONL de respostas; retomado se já existir")
+    parser.add_argument('--campo-pergunta', default='pergunta')
+    parser.add_argument('--campo-id', default='id')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processos de geração, cada um com o seu Llama")
+    parser.add_argument('--threads', type=int,
+                        help="threads de CPU de cada Llama (padrão: núcleos divididos entre os workers)")
+    parser.add_argument('--modelo', default=model_path, help="arquivo GGUF")
+    parser.add_argument('--sem-geracao', action='store_true',
+                        help="grava só a recuperação (ids dos chunks), sem chamar o modelo")
+    parser.add_argument('--guardar-cache', action='store_true',
+                        help="guarda as respostas no cache do chatbot (pré-geração de perguntas frequentes)")
+    args = parser.parse_args()
+
+    modo_offline()
+
+    perguntas = ler_perguntas(args.entrada, args.campo_pergunta, args.campo_id)
+    feitas = concluidas(args.saida, com_resposta=not args.sem_geracao)
+    pendentes = [p for p in perguntas if str(p["id"]) not in feitas]
+    print(f"{len(perguntas)} perguntas; {len(perguntas) - len(pendentes)} já estão em {args.saida}")
+    if not pendentes:
+        return
+
+    motor = MotorRecuperacao()
+    inicio = time.perf_counter()
+    recuperacoes = motor.recuperar_lote([p["pergunta"] for p in pendentes], args.top_k,
+                                        [p["area"] for p in pendentes])
+    tempo_recuperacao = time.perf_counter() - inicio
+    print(f"Recuperação de {len(pendentes)} perguntas em {tempo_recuperacao:.2f}s")
+
+    pipeline = PipelineRAG(motor=motor) if args.guardar_cache else None
+
+    with open(args.saida, 'a', encoding='utf-8') as saida:
+        falhas = 0
+
+        def gravar(indice, resposta=None, segundos=None):
+            nonlocal falhas
+            pergunta, recuperacao = pendentes[indice], recuperacoes[indice]
+            if falhou(resposta):
+                falhas += 1
+                print(f"Pergunta {pergunta['id']}: {resposta}")
+                return
+            registro = {**pergunta, "ids": list(recuperacao.ids)}
+            # A recuperação em lote é dividida igualmente entre as perguntas
+            tempos = {"recuperacao": round(tempo_recuperacao / len(pendentes) * 1000, 3)}
+            if segundos is not None:
+                registro["resposta"] = resposta
+                tempos["geracao"] = round(segundos * 1000, 3)
+            registro["tempos_ms"] = tempos
+            saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            saida.flush()
+            if pipeline is not None and resposta is not None:
+                pipeline.guarda_no_cache(pergunta["pergunta"], recuperacao, resposta, pergunta["area"])
+
+        if args.sem_geracao:
+            for indice in range(len(pendentes)):
+                gravar(indice)
+            return
+
+        tarefas = [(indice, p["pergunta"], r.blocos) for indice, (p, r) in enumerate(zip(pendentes, recuperacoes))]
+        inicio = time.perf_counter()
+        if args.workers <= 1:
+            _iniciar_worker(args.modelo, args.threads)
+            for tarefa in tarefas:
+                gravar(*_responder(*tarefa))
+        else:
+            # spawn: os workers não herdam o encoder nem as threads deste processo
+            threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_iniciar_worker, initargs=(args.modelo, threads)) as executor:
+                futuros = [executor.submit(_responder, *tarefa) for tarefa in tarefas]
+                for futuro in as_completed(futuros):
+                    gravar(*futuro.result())
+        print(f"{len(tarefas) - falhas} respostas em {time.perf_counter() - inicio:.2f}s, salvas em: {args.saida}")
+        if falhas:
+            print(f"{falhas} perguntas com erro; serão refeitas na próxima execução")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import re
+
+from utils import mapeamento_romanos_ordinais, padrao_romanos
+
+# Motor de normalização dos textos da legislação (convert_jsonl.py).
+#
+# As regras de limpar_sumario_e_imagens, substituir_caracteres_com_re,
+# substituir_numeros_romanos e as substituições avulsas do convert_jsonl.py
+# são agrupadas em poucas expressões com alternância: cada passada percorre o
+# texto uma única vez e o trecho que casou indica a substituição na tabela. As
+# passadas seguem a ordem original sempre que uma regra depende do resultado
+# da anterior, de modo que a saída é idêntica à das funções de utils.py
+# (ver tests/test_normalizacao.py e benchmarks/normalizacao.py).
+
+# Sumário: após colapsar os espaços o texto tem uma linha só, e a regra
+# original (^.*\.{3,}\s*\d+\s*$ em modo multilinha) apaga o texto inteiro
+# quando ele termina como uma linha de sumário. O teste é feito no texto
+# invertido, ancorado no início, para não percorrer o documento todo
+_padrao_sumario_invertido = re.compile(r'\s*\d+\s*\.{3,}')
+
+# Caracteres que o re.IGNORECASE considera equivalentes, procurados entre
+# o Latin-1/Latin Extended e os símbolos com dobra especial (K, Å, ẞ)
+_CANDIDATOS_CAIXA = [chr(i) for i in range(0x250)] + ['\u212a', '\u212b', '\u1e9e']
+
+
+def _sem_caixa(literal):
+    """Padrão equivalente ao literal com re.IGNORECASE, sem usar a flag.
+
+    Com a flag o re perde a busca rápida pelo primeiro caractere e testa
+    todas as alternativas em cada posição; com classes [xX] ela é mantida.
+    """
+    partes = []
+    for c in literal:
+        variantes = sorted({c} | {x for x in _CANDIDATOS_CAIXA if re.fullmatch(re.escape(c), x, re.IGNORECASE)})
+        if len(variantes) > 1:
+            partes.append('[' + ''.join(re.escape(x) for x in variantes) + ']')
+        else:
+            partes.append(re.escape(c))
+    return ''.join(partes)
+
+
+# Passada 1: imagens, tags de imagem e cabeçalhos, removidos. Cada remoção
+# pode juntar trechos e formar um novo casamento para a regra seguinte, por
+# isso ficam em passadas próprias; as duas primeiras só param em '!' e '<'
+_padrao_imagens = re.compile(r'!\[.*?\]\(.*?\)')
+_padrao_tags_imagem = re.compile(r'<\s*!?\s*' + _sem_caixa('image') + r'\s*.*?>')
+_padrao_cabecalhos = re.compile('|'.join([
+    _sem_caixa('Presidência da República'),
+    _sem_caixa('Secretaria-Geral'),
+    _sem_caixa('Subchefia para Assuntos Jurídicos'),
+]))
+# Vem depois dos demais cabeçalhos: o número final pode continuar em dígitos
+# que só encostam nele depois daquelas remoções
+_padrao_paginas = re.compile(_sem_caixa('Página ') + r'\d+' + _sem_caixa(' de ') + r'\d+')
+
+# Passada 2: caracteres especiais e abreviações, trocados conforme a tabela
+_SUBSTITUICOES = {
+    '§': 'Parágrafo ',
+    'º': '(o) ',
+    'ª': '(a) ',
+    '“': ' " ', '”': ' " ',  # Substitui aspas duplas
+    '‘': " ' ", '’': " ' ",  # Substitui aspas simples
+    '—': ' - ', '–': ' - ',  # Substitui diferentes tipos de hífen
+    'Art.': ' Artigo ',
+    'Inc.': ' Inciso ',
+    'C.C.': ' Código Civil ',
+    'C.P.': ' Código Penal ',
+    'C.F.': ' Constituição Federal ',
+    'R$': ' reais ',
+    '/': ' de ',
+}
+_padrao_substituicoes = re.compile('|'.join(re.escape(chave) for chave in sorted(_SUBSTITUICOES, key=len, reverse=True)))
+
+# Passada 3: sequências de ---, ..., ___ e os símbolos -, * e # restantes
+_padrao_simbolos = re.compile(r'[-_.]{3,}|[-*#]')
+
+# Passada 4: 'o' e 'a' isolados (resquícios de º e ª) são removidos e
+# art./artigo, em qualquer caixa, vira Artigo
+_padrao_artigos = re.compile(r'\s[oa](?=\s)|\b' + _sem_caixa('art') + '(?:' + _sem_caixa('igo') + r')?\.?\b')
+
+# Passada 5: algarismos romanos como palavra inteira. Só são convertidos os
+# que o padrao_romanos reconhece (XIV, por exemplo, não é)
+_padrao_romanos = re.compile(r'\b[IVXLCM]+\b')
+_ROMANOS = {
+    romano: ordinal for romano, ordinal in mapeamento_romanos_ordinais.items()
+    if re.fullmatch(padrao_romanos, romano)
+}
+
+
+def _substituicao(match):
+    return _SUBSTITUICOES[match.group()]
+
+
+def _artigo(match):
+    return '' if match.group()[0].isspace() else 'Artigo'
+
+
+def _romano(match):
+    romano = match.group()
+    return _ROMANOS.get(romano, romano)
+
+
+def normalizar_documento(texto):
+    """Normaliza o Markdown de uma lei, como no convert_jsonl.py original.
+
+    Cada passada cobre um grupo de regras (remoções, substituições,
+    símbolos, artigos e romanos), em vez de uma passada por regra.
+    """
+    # Equivale a re.sub(r'\s+', ' ', texto).strip(): os dois usam str.isspace
+    texto = ' '.join(texto.split())
+    if _padrao_sumario_invertido.match(texto[::-1]):
+        texto = ''
+
+    texto = _padrao_imagens.sub('', texto)
+    texto = _padrao_tags_imagem.sub('', texto)
+    texto = _padrao_cabecalhos.sub('', texto)
+    texto = _padrao_paginas.sub('', texto)
+    texto = _padrao_substituicoes.sub(_substituicao, texto)
+    texto = _padrao_simbolos.sub('', texto)
+    texto = _padrao_artigos.sub(_artigo, texto)
+    return _padrao_romanos.sub(_romano, texto)
+
+
+padrao_segmentacao = re.compile(r'(?i)\b(art(?:igo|\.?)\.?)\s*(\d+[\dºª\-\.A-Za-z]*)')
+
+
+def segmentar(texto):
+    """Mesmo resultado de re.split(padrao_segmentacao, texto), sob demanda.
+
+    Os pedaços são gerados um a um, sem montar a lista do documento inteiro.
+    """
+    inicio = 0
+    for match in padrao_segmentacao.finditer(texto):
+        yield texto[inicio:match.start()]
+        yield from match.groups()
+        inicio = match.end()
+    yield texto[inicio:]
+
+
+def pares_titulo_conteudo(texto):
+    """Pares (título, conteúdo) na mesma ordem do laço original do convert_jsonl.py.
+
+    O laço percorria a lista do re.split de dois em dois a partir do índice 1,
+    tomando cada pedaço como título e o seguinte como conteúdo.
+    """
+    pedacos = segmentar(texto)
+    next(pedacos)
+    anterior = next(pedacos, None)
+    while anterior is not None:
+        seguinte = next(pedacos, None)
+        yield anterior, seguinte if seguinte is not None else ""
+        if seguinte is None:
+            break
+        anterior = next(pedacos, None)
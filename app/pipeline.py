@@ -0,0 +1,235 @@
+import os
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+from recuperacao import MotorRecuperacao
+from cache_respostas import CacheRespostas, resumo_historico
+from geracao import (N_CTX, DECODIFICACAO_ESPECULATIVA, TOKENS_RASCUNHO, configurar_cache_kv,
+                     criar_rascunho, montar_mensagens, contar_tokens, turnos_historico)
+from fila_geracao import FilaGeracao, FilaCheia, Preparo
+from telemetria import Rastro, etapa
+
+# Caminhos dos arquivos utilizados. O índice FAISS, a legislação processada
+# e o modelo de embeddings ficam no MotorRecuperacao, carregados uma única vez
+# por processo e recarregados apenas quando os arquivos mudam
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+model_path = os.path.join(project_root, 'Llama-3.2-3B', 'Llama3.2-maIN.gguf')
+
+MENSAGEM_FILA_CHEIA = "❌ Muitas perguntas em andamento no momento; tente novamente em instantes."
+
+
+def carregar_llm(caminho=model_path, especulativa=DECODIFICACAO_ESPECULATIVA, tokens_rascunho=TOKENS_RASCUNHO,
+                 threads=None):
+    """Inicializa o modelo Llama-CPP.
+
+    Os pesos são mapeados em memória (mmap): vários processos do servidor
+    que abrem o mesmo GGUF compartilham as páginas do arquivo no cache do
+    sistema operacional, em vez de cada um ter sua cópia. Com `especulativa`,
+    a geração usa rascunhos de `tokens_rascunho` tokens copiados do prompt.
+    `threads` limita as threads de CPU (padrão do llama.cpp: todos os
+    núcleos), para vários modelos na mesma máquina. A temperatura
+    (TEMPERATURA em geracao.py) é passada a cada geração.
+    """
+    from llama_cpp import Llama
+
+    llm = Llama(
+        model_path=caminho,
+        n_gpu_layers=-1,     # Usa GPU se disponível
+        n_ctx=N_CTX,         # Janela de contexto
+        use_mmap=True,
+        n_threads=threads,
+        draft_model=criar_rascunho(tokens_rascunho) if especulativa else None,
+    )
+    # Reaproveita o prefill do prefixo comum (instruções e histórico) entre turnos
+    return configurar_cache_kv(llm)
+
+
+def historico_de_mensagens(mensagens):
+    """Converte [{"role": "user" | "assistant", "content": ...}] em mensagens do LangChain."""
+    historico = []
+    for mensagem in mensagens or []:
+        if mensagem.get("role") == "user":
+            historico.append(HumanMessage(content=mensagem.get("content", "")))
+        elif mensagem.get("role") == "assistant":
+            historico.append(AIMessage(content=mensagem.get("content", "")))
+    return historico
+
+
+class PipelineRAG:
+    """Recuperação e geração do chatbot, independente da interface.
+
+    Um por processo: o Llama, o motor de recuperação, o cache de respostas e
+    a fila de geração são compartilhados por todas as conversas atendidas
+    pelo processo. O Llama é carregado no primeiro uso, ou por carregar().
+    Cada resposta gera um rastro (telemetria.py) com o tempo das etapas;
+    `amostragem` é a fração deles que inclui os chunks e as pontuações.
+    """
+
+    def __init__(self, llm=None, motor=None, cache_respostas=None, amostragem=None):
+        self._llm = llm
+        self._fila = None
+        self._lock = threading.Lock()
+        self.motor = motor or MotorRecuperacao()
+        self.cache_respostas = cache_respostas or CacheRespostas()
+        self.amostragem = amostragem
+
+    def carregar(self):
+        """Carrega o Llama e inicia a fila de geração, se ainda não foram."""
+        with self._lock:
+            if self._llm is None:
+                self._llm = carregar_llm()
+            if self._fila is None:
+                self._fila = FilaGeracao(self._llm)
+        return self
+
+    def aquecer(self, inicializacao=None):
+        """Carrega o índice, o encoder das perguntas e o Llama, nessa ordem,
+        sem esperar a primeira pergunta. `inicializacao` (telemetria.py)
+        registra o tempo de cada carga."""
+        with etapa(inicializacao, 'indice'):
+            self.motor.estado()
+        with etapa(inicializacao, 'encoder'):
+            self.motor.modelo()
+        with etapa(inicializacao, 'llm'):
+            self.carregar()
+        return self
+
+    @property
+    def llm(self):
+        return self.carregar()._llm
+
+    @property
+    def fila(self):
+        return self.carregar()._fila
+
+    # Busca o contexto da pergunta, baseado no FAISS
+    def recupera_blocos(self, pergunta, top_k=3, area=None):
+        """Blocos de contexto formatados, em ordem de relevância."""
+        return self.motor.recuperar(pergunta, top_k, area=area).blocos
+
+    def recupera_contexto(self, pergunta, top_k=3, max_chars=1600, area=None):
+        contexto = ""
+        total = 0
+
+        for bloco_formatado in self.recupera_blocos(pergunta, top_k, area):
+            if total + len(bloco_formatado) > max_chars:
+                # Artigo maior que o orçamento: usa o início dele em vez de nada
+                if not contexto:
+                    contexto = bloco_formatado[:max_chars]
+                break
+
+            contexto += bloco_formatado
+            total += len(bloco_formatado)
+
+        return contexto
+
+    def consulta_cache(self, user_query, top_k=3, area=None, rastro=None, historico=None):
+        """Procura a resposta no cache; retorna (resposta ou None, recuperação).
+
+        A pergunta idêntica (normalizada, na mesma área) dispensa até a
+        recuperação. Senão, a recuperação é feita com o vetor da pergunta, que
+        serve também para procurar uma pergunta semelhante que tenha
+        recuperado os mesmos chunks. `historico` é o resumo_historico da
+        conversa: só respostas dadas depois do mesmo histórico são reaproveitadas.
+        """
+        with etapa(rastro, 'cache_exata'):
+            resposta = self.cache_respostas.buscar_exata(user_query, self.motor.estado().versao, area, historico)
+        if resposta is not None:
+            if rastro is not None:
+                rastro.registrar('cache', 'exata')
+            return resposta, None
+
+        with etapa(rastro, 'embedding'):
+            vetor = self.motor.encode([user_query])
+        recuperacao = self.motor.recuperar(user_query, top_k, vetor=vetor, area=area, rastro=rastro)
+        with etapa(rastro, 'cache_semelhante'):
+            resposta = self.cache_respostas.buscar_semelhante(vetor, recuperacao.ids, recuperacao.versao, historico)
+        if rastro is not None:
+            rastro.registrar('cache', 'falha' if resposta is None else 'semelhante')
+        return resposta, recuperacao
+
+    def guarda_no_cache(self, user_query, recuperacao, resposta, area=None, historico=None):
+        # Respostas com erro não são reaproveitadas
+        if resposta and not resposta.startswith("❌"):
+            self.cache_respostas.guardar(user_query, recuperacao.vetor, recuperacao.ids, resposta,
+                                         recuperacao.versao, area, historico)
+
+    def preparar_pedido(self, user_query, chat_history, area=None, rastro=None):
+        """Recuperação e montagem das mensagens de um pedido; roda no pool da fila."""
+
+        historico = resumo_historico(turnos_historico(chat_history, user_query))
+        resposta, recuperacao = self.consulta_cache(user_query, area=area, rastro=rastro, historico=historico)
+        if resposta is not None:
+            return Preparo(None, resposta, None)
+
+        # Recuperação do contexto a ser utilizado; o corte é feito em tokens
+        # pelo montar_mensagens, conforme o espaço livre na janela do modelo
+        with etapa(rastro, 'montagem_prompt'):
+            mensagens = montar_mensagens(self.llm, recuperacao.blocos, chat_history, user_query)
+        if rastro is not None:
+            with rastro.etapa('contagem_tokens'):
+                rastro.registrar('tokens_prompt', sum(contar_tokens(self.llm, m["content"]) for m in mensagens))
+
+        return Preparo(mensagens, None, recuperacao)
+
+    def enviar_pergunta(self, user_query, chat_history, cancelar=None, area=None):
+        """Enfileira a pergunta e devolve o gerador de eventos da resposta
+        (ver eventos_resposta); FilaCheia se a fila de geração está cheia."""
+        # O histórico de quem chama pode mudar enquanto o pedido aguarda
+        historico = list(chat_history)
+        rastro = Rastro(self.amostragem)
+        try:
+            pedido = self.fila.enviar(lambda: self.preparar_pedido(user_query, historico, area, rastro), cancelar, rastro)
+        except FilaCheia:
+            rastro.finalizar('chat', resultado='fila_cheia')
+            raise
+        return self._eventos_pedido(pedido, rastro, user_query, area,
+                                    resumo_historico(turnos_historico(historico, user_query)))
+
+    def eventos_resposta(self, user_query, chat_history, cancelar=None, area=None):
+        """Eventos de uma resposta: ("fila", posição, segundos) enquanto o
+        pedido aguarda o modelo e ("trecho", texto) para cada trecho gerado.
+
+        `area` restringe a recuperação a um tipo de legislação (motor.areas()).
+        Fechar o gerador antes do fim cancela o pedido.
+        """
+        try:
+            eventos = self.enviar_pergunta(user_query, chat_history, cancelar, area)
+        except FilaCheia:
+            yield ("trecho", MENSAGEM_FILA_CHEIA)
+            return
+        yield from eventos
+
+    def _eventos_pedido(self, pedido, rastro, user_query, area, resumo):
+        partes = []
+        eventos = pedido.eventos()
+        try:
+            for evento in eventos:
+                if evento[0] == "trecho":
+                    partes.append(evento[1])
+                yield evento
+        finally:
+            eventos.close()
+            rastro.finalizar('chat', resultado='completo' if pedido.completo else
+                             'erro' if pedido.erro is not None else
+                             'cancelado' if pedido.cancelar.is_set() else 'sem_modelo')
+
+        # Só respostas completas do modelo vão para o cache (não canceladas,
+        # interrompidas por erro ou prazo nem vindas do próprio cache)
+        if pedido.completo:
+            self.guarda_no_cache(user_query, pedido.preparo.dados, "".join(partes).strip(), area, resumo)
+
+    def model_response_stream(self, user_query, chat_history, cancelar=None, area=None):
+        """Mesmo que model_response, mas devolve a resposta token a token."""
+        eventos = self.eventos_resposta(user_query, chat_history, cancelar, area)
+        try:
+            for evento in eventos:
+                if evento[0] == "trecho":
+                    yield evento[1]
+        finally:
+            eventos.close()
+
+    def model_response(self, user_query, chat_history, area=None):
+        """Gera resposta usando o modelo Llama-CPP, com contexto jurídico passado
+        , no modo chat."""
+        return "".join(self.model_response_stream(user_query, chat_history, area=area)).strip()
@@ -1,49 +1,17 @@
-import os
-import faiss
+"""Obsoleto: use prepare_embeddings_chunks.py.
 
+Este script gerava um único índice IndexFlatIP sobre os artigos inteiros,
+com um modelo de embeddings diferente do usado pelo chatbot, e não chegava a
+adicionar os vetores ao índice. O build atual (prepare_embeddings_chunks.py)
+divide os artigos em blocos, usa o mesmo encoder das perguntas e escolhe o
+tipo de índice com --tipo-indice (indices_ann.py). Por compatibilidade, este
+arquivo apenas repassa os argumentos para ele:
 
-from sentence_transformers import SentenceTransformer
-from datasets import load_dataset
+    python prepare_embeddings.py --tipo-indice hnsw
+"""
+import prepare_embeddings_chunks
 
-# Caminhos para diretórios de entrada e saída
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-input_path = os.path.join(project_root, 'data', 'legislacao_pronta', 'rag_*.jsonl')
-output_path = os.path.join(project_root, 'data', 'legislacao_embeddings')
 
-if not os.path.exists(output_path):
-    os.makedirs(output_path)
-
-# Parâmetro para aplicar document chunking
-max_size_chunk = 500
-
-# Carregar o dataset a ser utilizado para a geração dos embeddings
-# utilizando HuggingFace Datasets
-embeddings_dataset = load_dataset('json', data_files=input_path, split='train')
-print(f"Total de {len(embeddings_dataset)} artigos encontrados")
-
-# Carregar o modelo de embeddings
-model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-
-# Extrair os textos dos artigos gerados
-textos = [artigo['conteudo'] for artigo in embeddings_dataset]
-print(f"Total de {len(textos)} textos, dos artigos encontrados")
-
-# Gerar os embeddings
-embeddings = model.encode(textos, batch_size=32, show_progress_bar=True)
-print(f"Total de {len(embeddings)} embeddings gerados")
-
-# Criar um índice FAISS com os embeddings gerados
-vector_dim = embeddings.shape[1]
-index = faiss.IndexFlatIP(vector_dim)
-
-# Salvar o índice FAISS em um arquivo
-faiss.write_index(index, os.path.join(output_path, 'faiss_embeddings.bin'))
-
-# Salvando todos os artigos do modelo rag, para consulta posterior
-json_embeddings = embeddings_dataset.to_json(
-    os.path.join(output_path, 'artigos_absolutos.jsonl'),
-    orient='records',
-    lines=True,
-    force_ascii=False
-)
-print(f"Arquivo {os.path.join(output_path, 'artigos_absolutos.jsonl')} salvo com sucesso")
\ No newline at end of file
+if __name__ == '__main__':
+    print("prepare_embeddings.py está obsoleto; executando prepare_embeddings_chunks.py")
+    prepare_embeddings_chunks.main()
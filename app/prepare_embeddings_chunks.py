@@ -1,76 +1,510 @@
 import os
+import glob
 import faiss
 import json
+import hashlib
+import argparse
 import numpy as np
 
-from sentence_transformers import SentenceTransformer
-from datasets import load_dataset
 from tqdm import tqdm
-from utils import chunk_por_sentencas
+from utils import chunk_por_tokens
+from deduplicacao import id_unico, carregar_aliases
+from indice_artigos import construir_indice_artigos, salvar_indice_artigos
+from recuperacao import id_faiss
+from armazem import salvar_armazem_chunks, ArmazemChunks
+from bm25 import postings_textos, postings_armazenadas, salvar_bm25
+from indices_ann import (adicionar_argumentos, config_de_args, criar_index, aplicar_parametros_busca, remover_ids,
+                         nome_shard, config_do_shard, usa_idmap, ids_do_indice)
+from recursos import modo_offline
 
 # Caminhos para diretórios de entrada e saída
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-input_path = os.path.join(project_root, 'data', 'legislacao_pronta', 'rag_*.jsonl')
+# Artigos sem repetições (deduplicacao.py); sem essa etapa, os de convert_jsonl.py
+input_path = os.path.join(project_root, 'data', 'legislacao_deduplicada', 'rag_*.jsonl')
+if not glob.glob(input_path):
+    input_path = os.path.join(project_root, 'data', 'legislacao_pronta', 'rag_*.jsonl')
 output_path = os.path.join(project_root, 'data', 'legislacao_embeddings')
 
-if not os.path.exists(output_path):
-    os.makedirs(output_path)
-
-# Parâmetro de chunking
-tamanho_max_chunk = 600  # número máximo de caracteres por bloco
-
-# Carregar o dataset de arquivos RAG
-embeddings_dataset = load_dataset('json', data_files=input_path, split='train')
-print(f"Total de {len(embeddings_dataset)} artigos encontrados")
-
-# Carregar modelo de embeddings
-model = SentenceTransformer('all-MiniLM-L6-v2')
-vector_dim = model.get_sentence_embedding_dimension()
-index = faiss.IndexFlatIP(vector_dim)
-
-# Preparar armazenamento dos vetores e metadados
-vetores = []
-chunks_info = []
-
-# Processar cada artigo
-print("Gerando embeddings por blocos...")
-for artigo in tqdm(embeddings_dataset):
-    conteudo = artigo['conteudo']
-    
-    # Chunking baseado em sentenças
-    blocos = chunk_por_sentencas(conteudo, tamanho_max_chars=1200)
-
-    # Gera os embeddings e salva em blocos
-    for i, bloco in enumerate(blocos, start=1):
-        texto_formatado = f"[{artigo.get('tipo', '')}] {artigo.get('artigo', '')} - {artigo.get('fonte', '')}\n{bloco.strip()}"
-        vetor = model.encode(texto_formatado, show_progress_bar=True)
-        vetores.append(vetor)
-
-        chunk = {
-            "id": f"{artigo['id']}_chunk_{i}",
-            "fonte": artigo.get("fonte", ""),
-            "tipo": artigo.get("tipo", ""),
-            "artigo": artigo.get("artigo", "").strip(),
-            "parte": i,
-            "conteudo": bloco.strip()
+# Parâmetros de chunking, em tokens do tokenizador do encoder. Sem
+# --max-tokens, o limite é o max_seq_length do modelo (256 no MiniLM), de
+# modo que nenhum bloco é truncado na codificação
+sobreposicao_padrao = 32  # tokens do fim do bloco anterior repetidos no seguinte
+artigos_por_lote = 256    # artigos tokenizados de uma vez
+
+nome_modelo = 'all-MiniLM-L6-v2'
+
+
+def gerar_chunks(embeddings_dataset, tokenizer, max_tokens, sobreposicao=sobreposicao_padrao, aliases=None):
+    """Percorre o dataset em streaming, gerando (metadados, texto a codificar, ids).
+
+    Cada artigo é tokenizado uma vez pelo tokenizador do encoder; os mesmos
+    ids servem para dividir o artigo e, depois, para a codificação. O texto
+    codificado de cada bloco é o cabeçalho do artigo seguido do bloco, e o
+    total de tokens (com os especiais) não passa de max_tokens. `aliases`
+    (deduplicacao.carregar_aliases) acompanha os chunks do artigo canônico.
+    """
+    # Ocorrências de cada id, para o sufixo das repetições do mesmo número de
+    # artigo (ver id_unico); a saída da deduplicacao.py já tem ids únicos
+    ocorrencias = {}
+    especiais = tokenizer.num_special_tokens_to_add()
+
+    lote = []
+    for artigo in embeddings_dataset:
+        lote.append(artigo)
+        if len(lote) == artigos_por_lote:
+            yield from _chunks_do_lote(lote, tokenizer, max_tokens - especiais, sobreposicao, ocorrencias, aliases)
+            lote = []
+    if lote:
+        yield from _chunks_do_lote(lote, tokenizer, max_tokens - especiais, sobreposicao, ocorrencias, aliases)
+
+
+def _chunks_do_lote(artigos, tokenizer, max_tokens, sobreposicao, ocorrencias, aliases=None):
+    cabecalhos = [
+        f"[{artigo.get('tipo', '')}] {artigo.get('artigo', '')} - {artigo.get('fonte', '')}"
+        for artigo in artigos
+    ]
+    # O tokenizador rápido processa o lote inteiro de uma vez
+    tokens_cabecalhos = tokenizer(cabecalhos, add_special_tokens=False, verbose=False)
+    tokens = tokenizer([artigo['conteudo'] for artigo in artigos], add_special_tokens=False,
+                       return_offsets_mapping=True, verbose=False)
+
+    for i, artigo in enumerate(artigos):
+        artigo_id = id_unico(artigo['id'], ocorrencias)
+
+        ids_cabecalho = tokens_cabecalhos['input_ids'][i]
+        orcamento = max_tokens - len(ids_cabecalho)
+        if orcamento < 16:
+            raise ValueError(f"Cabeçalho de {artigo_id} ocupa {len(ids_cabecalho)} de {max_tokens} tokens")
+
+        # Chunking baseado em tokens do encoder
+        blocos = chunk_por_tokens(
+            artigo['conteudo'], tokens['input_ids'][i], tokens['offset_mapping'][i],
+            tokens.word_ids(i), orcamento, sobreposicao,
+        )
+
+        for parte, (bloco, contexto, ids) in enumerate(blocos, start=1):
+            texto_formatado = f"{cabecalhos[i]}\n{contexto}"
+
+            chunk = {
+                "id": f"{artigo_id}_chunk_{parte}",
+                "fonte": artigo.get("fonte", ""),
+                "tipo": artigo.get("tipo", ""),
+                "artigo": artigo.get("artigo", "").strip(),
+                "parte": parte,
+                "conteudo": bloco
+            }
+            # Cópias e quase cópias removidas na deduplicação
+            if aliases and artigo_id in aliases:
+                chunk["aliases"] = aliases[artigo_id]
+
+            # Cabeçalho e bloco são separados por espaço em branco, então a
+            # tokenização do texto inteiro é a concatenação das duas
+            yield chunk, texto_formatado, ids_cabecalho + ids
+
+
+def codificar_ids(model, lote_ids):
+    """Embeddings de sequências já tokenizadas, sem passar pelo tokenizador de novo."""
+    import torch
+
+    tokenizer = model.tokenizer
+    sequencias = [tokenizer.build_inputs_with_special_tokens(ids) for ids in lote_ids]
+    tamanho = max(len(sequencia) for sequencia in sequencias)
+
+    input_ids = torch.full((len(sequencias), tamanho), tokenizer.pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequencias), tamanho), dtype=torch.long)
+    for i, sequencia in enumerate(sequencias):
+        input_ids[i, :len(sequencia)] = torch.tensor(sequencia, dtype=torch.long)
+        attention_mask[i, :len(sequencia)] = 1
+
+    features = {"input_ids": input_ids, "attention_mask": attention_mask}
+    if "token_type_ids" in tokenizer.model_input_names:
+        features["token_type_ids"] = torch.zeros_like(input_ids)
+    features = {nome: tensor.to(model.device) for nome, tensor in features.items()}
+    with torch.no_grad():
+        return model(features)['sentence_embedding'].float().cpu().numpy()
+
+
+def gerar_embeddings(model, textos, vetores, batch_size=256, pool=None, ids=None):
+    """Codifica os textos em lotes grandes, escrevendo direto em `vetores`.
+
+    Os textos são ordenados por tamanho, para que cada lote tenha sequências
+    de comprimento parecido e o padding desperdiçado seja mínimo. Com `ids`
+    (os tokens de cada texto, gerados no chunking) o modelo recebe os tokens
+    diretamente. Com `pool` (ver SentenceTransformer.start_multi_process_pool)
+    cada bloco é dividido entre os processos, que tokenizam os textos.
+    """
+    if ids is not None:
+        ordem = np.argsort([len(i) for i in ids], kind='stable')
+    else:
+        ordem = np.argsort([len(texto) for texto in textos], kind='stable')
+
+    # Com o pool, cada chamada recebe vários lotes para manter todos os
+    # processos ocupados
+    tamanho_bloco = batch_size * (len(pool['processes']) * 4 if pool else 1)
+
+    for inicio in tqdm(range(0, len(textos), tamanho_bloco), desc="Gerando embeddings"):
+        posicoes = ordem[inicio:inicio + tamanho_bloco]
+        lote = [textos[p] for p in posicoes]
+
+        if pool:
+            embeddings = model.encode_multi_process(lote, pool, batch_size=batch_size)
+        elif ids is not None:
+            embeddings = codificar_ids(model, [ids[p] for p in posicoes])
+        else:
+            embeddings = model.encode(lote, batch_size=batch_size, show_progress_bar=False)
+
+        vetores[posicoes] = embeddings
+
+    return vetores
+
+
+def hash_conteudo(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+# Parâmetros que só afetam a busca; mudá-los não exige reconstruir o índice
+PARAMETROS_BUSCA = ('ef_search', 'nprobe')
+
+
+def estrutura_indice(config):
+    return {k: v for k, v in config.items() if k not in PARAMETROS_BUSCA}
+
+
+def carregar_manifesto(manifesto_path):
+    """Manifesto do build anterior, ou {} se não houver um do mesmo modelo."""
+    if not os.path.exists(manifesto_path):
+        return {}
+    with open(manifesto_path, 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+    if manifesto.get('modelo') != nome_modelo:
+        return {}
+    return manifesto
+
+
+def carregar_shard_incremental(info, vector_dim, config):
+    """Carrega o índice anterior de um shard, se for utilizável.
+
+    Retorna (index, hashes por id do chunk); sem shard anterior compatível,
+    retorna None e nenhum hash, o que força a codificação do shard inteiro.
+    """
+    if info is None:
+        return None, {}
+
+    caminho = os.path.join(output_path, info['arquivo'])
+    if os.path.exists(caminho):
+        index = faiss.read_index(caminho)
+        hashes = info.get('chunks', {})
+
+        # O índice precisa ser do mesmo tipo e conter exatamente os ids
+        # registrados no manifesto. IVF gravados dentro de um IndexIDMap2
+        # (builds anteriores) não podem ter ids removidos e são refeitos
+        compativel = (
+            estrutura_indice(info.get('indice', {"tipo": "flat"})) == estrutura_indice(config)
+            and isinstance(index, faiss.IndexIDMap2) == usa_idmap(config)
+            and index.d == vector_dim
+            and set(ids_do_indice(index).tolist()) == {id_faiss(c) for c in hashes}
+        )
+        if compativel:
+            aplicar_parametros_busca(index, config)
+            return index, hashes
+
+    print(f"Shard {info['arquivo']} incompatível com o manifesto; reconstruindo do zero")
+    return None, {}
+
+
+def assinatura_arquivo(caminho):
+    """(tamanho, mtime) do arquivo, como na assinatura lida pelo chatbot; None se não existe."""
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def shard_intacto(info, entrada, config, arquivos):
+    """Se o shard do build anterior pode ser mantido sem tokenizar a fonte.
+
+    Exige a mesma entrada (artigos, aliases e parâmetros de chunking), o
+    mesmo tipo de índice e os arquivos (shard, armazém e BM25) exatamente
+    como o manifesto os registrou: um build interrompido depois de trocar
+    algum deles invalida o reaproveitamento.
+    """
+    if info is None or info.get('entrada') != entrada or 'linhas' not in info:
+        return False
+    if estrutura_indice(info.get('indice', {"tipo": "flat"})) != estrutura_indice(config):
+        return False
+    return all(
+        arquivos.get(nome) is not None and arquivos.get(nome) == assinatura_arquivo(os.path.join(output_path, nome))
+        for nome in (info['arquivo'], 'artigos_chunks.bin', 'bm25.bin')
+    )
+
+
+def salvar_manifesto(manifesto_path, config, shards, arquivos):
+    """Grava modelo, configuração do índice, a assinatura dos arquivos e, por
+    shard, a fonte, os tipos, o arquivo, a configuração efetiva, o hash de
+    cada chunk, o hash da entrada e as linhas ocupadas nos metadados.
+
+    É também a tabela de roteamento lida pelo chatbot.
+    """
+    manifesto = {
+        "modelo": nome_modelo,
+        "indice": config,
+        "arquivos": arquivos,
+        "shards": {
+            nome: {chave: shard[chave] for chave in ("fonte", "tipos", "arquivo", "indice", "chunks", "entrada", "linhas")}
+            for nome, shard in shards.items()
+        },
+    }
+    with open(manifesto_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+    os.replace(manifesto_path + '.tmp', manifesto_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o índice FAISS dos chunks da legislação.")
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help="chunks por lote de codificação")
+    parser.add_argument('--multi-processo', action='store_true',
+                        help="usa um pool de processos do sentence-transformers")
+    parser.add_argument('--processos', type=int, default=os.cpu_count(),
+                        help="número de processos do pool (padrão: todos os núcleos)")
+    parser.add_argument('--memmap', action='store_true',
+                        help="grava os vetores em um arquivo mapeado em memória, em vez da RAM")
+    parser.add_argument('--completo', action='store_true',
+                        help="ignora o manifesto e recodifica todos os chunks")
+    parser.add_argument('--max-tokens', type=int,
+                        help="tokens por bloco, com cabeçalho e tokens especiais (padrão: max_seq_length do modelo)")
+    parser.add_argument('--sobreposicao', type=int, default=sobreposicao_padrao,
+                        help="tokens do fim de um bloco repetidos no início do seguinte")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+    config = config_de_args(args)
+
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    # Importados só aqui (torch vem junto), para que --help e erros de
+    # argumentos não esperem por eles; com o modelo em cache, sem rede
+    modo_offline(nome_modelo)
+    from datasets import load_dataset
+    from sentence_transformers import SentenceTransformer
+
+    # Carregar o dataset de arquivos RAG
+    embeddings_dataset = load_dataset('json', data_files=input_path, split='train')
+    print(f"Total de {len(embeddings_dataset)} artigos encontrados")
+
+    manifesto_path = os.path.join(output_path, 'manifesto.json')
+    json_path = os.path.join(output_path, 'artigos_chunks.jsonl')
+    armazem_path = os.path.join(output_path, 'artigos_chunks.bin')
+    indice_artigos_path = os.path.join(output_path, 'artigos_indice.json')
+    bm25_path = os.path.join(output_path, 'bm25.bin')
+
+    manifesto_anterior = {} if args.completo else carregar_manifesto(manifesto_path)
+    shards_anteriores = manifesto_anterior.get('shards', {})
+    arquivos_anteriores = manifesto_anterior.get('arquivos', {})
+
+    # Um índice FAISS por fonte. Cada fonte tem o hash da sua entrada: os
+    # artigos, os aliases deles e os parâmetros de chunking. Uma fonte com o
+    # mesmo hash do build anterior não é tokenizada nem codificada: os
+    # metadados dos chunks e as postings do BM25 são copiados dos arquivos
+    # gravados, e o shard fica como está
+    aliases = carregar_aliases()
+    parametros = json.dumps({"max_tokens": args.max_tokens, "sobreposicao": args.sobreposicao})
+    ocorrencias = {}
+    artigos_por_shard = {}
+    entradas = {}
+    for posicao, artigo in enumerate(embeddings_dataset):
+        artigo_id = id_unico(artigo['id'], ocorrencias)
+        nome = nome_shard(artigo.get('fonte', ''))
+        if nome not in entradas:
+            entradas[nome] = hashlib.sha256(parametros.encode('utf-8'))
+        entradas[nome].update(json.dumps([artigo, aliases.get(artigo_id)], ensure_ascii=False,
+                                         sort_keys=True).encode('utf-8'))
+        artigos_por_shard.setdefault(nome, []).append(posicao)
+    entradas = {nome: h.hexdigest() for nome, h in entradas.items()}
+
+    intactos = {
+        nome for nome in artigos_por_shard
+        if nome in shards_anteriores and shard_intacto(
+            shards_anteriores[nome], entradas[nome],
+            config_do_shard(config, len(shards_anteriores[nome]['chunks'])), arquivos_anteriores,
+        )
+    }
+    # Fontes que saíram do corpus: o shard inteiro é descartado
+    shards_removidos = [nome for nome in shards_anteriores if nome not in artigos_por_shard]
+
+    if len(intactos) == len(artigos_por_shard) and not shards_removidos:
+        # Só os parâmetros de busca podem ter mudado: atualiza o manifesto
+        shards = {nome: {**shards_anteriores[nome], "indice": config_do_shard(config, len(shards_anteriores[nome]['chunks']))}
+                  for nome in artigos_por_shard}
+        salvar_manifesto(manifesto_path, config, shards, arquivos_anteriores)
+        print("Nenhuma alteração na legislação; índices mantidos.")
+        return
+
+    # Carregar modelo de embeddings; o tokenizador dele define os blocos
+    model = None
+    if len(intactos) < len(artigos_por_shard):
+        model = SentenceTransformer(nome_modelo)
+        vector_dim = model.get_sentence_embedding_dimension()
+        max_tokens = args.max_tokens or model.max_seq_length
+        if max_tokens > model.max_seq_length:
+            parser.error(f"--max-tokens maior que o limite do modelo ({model.max_seq_length})")
+
+    # Metadados do build anterior, de onde vêm os chunks das fontes intactas
+    anterior = ArmazemChunks(armazem_path) if intactos else None
+
+    # Chunks de todas as fontes, na ordem do dataset; apenas os textos e os
+    # tokens das fontes alteradas ficam em memória até a codificação
+    chunks_info = []
+    textos = {}
+    tokens = {}
+    shards = {}
+    partes_bm25 = []
+    pendentes = []
+    for nome, artigos in artigos_por_shard.items():
+        inicio = len(chunks_info)
+        if nome in intactos:
+            info = shards_anteriores[nome]
+            linha_inicial, linha_final = info['linhas']
+            chunks_info.extend(anterior[linha] for linha in range(linha_inicial, linha_final))
+            partes_bm25.append(postings_armazenadas(bm25_path, linha_inicial, linha_final))
+            shards[nome] = {**info, "indice": config_do_shard(config, len(info['chunks'])),
+                            "linhas": [inicio, len(chunks_info)], "alterado": False}
+            print(f"Shard {nome}: sem alterações")
+            continue
+
+        for chunk, texto_formatado, ids in gerar_chunks((embeddings_dataset[p] for p in artigos), model.tokenizer,
+                                                        max_tokens, args.sobreposicao, aliases):
+            textos[len(chunks_info)] = texto_formatado
+            tokens[len(chunks_info)] = ids
+            chunks_info.append(chunk)
+        posicoes = range(inicio, len(chunks_info))
+        # Índice invertido BM25 sobre o mesmo texto codificado, para a busca
+        # por termos exatos que o encoder não distingue bem
+        partes_bm25.append(postings_textos([textos[p] for p in posicoes]))
+
+        # Só os chunks novos ou alterados são codificados, e os que sumiram
+        # saem do índice
+        config_shard = config_do_shard(config, len(posicoes))
+        index, hashes_anteriores = carregar_shard_incremental(shards_anteriores.get(nome), vector_dim, config_shard)
+
+        hashes_shard = {chunks_info[p]['id']: hash_conteudo(textos[p]) for p in posicoes}
+        novos = [p for p in posicoes if hashes_anteriores.get(chunks_info[p]['id']) != hashes_shard[chunks_info[p]['id']]]
+        removidos = [c for c, h in hashes_anteriores.items() if hashes_shard.get(c) != h]
+        if removidos:
+            index = remover_ids(index, [id_faiss(c) for c in removidos], config_shard)
+
+        shards[nome] = {
+            "fonte": chunks_info[inicio]['fonte'],
+            "tipos": sorted({chunks_info[p]['tipo'] or '' for p in posicoes}),
+            "arquivo": os.path.join('shards', f'{nome}.faiss'),
+            "indice": config_shard,
+            "chunks": hashes_shard,
+            "entrada": entradas[nome],
+            "linhas": [inicio, len(chunks_info)],
+            "index": index,
+            "novos": novos,
+            "alterado": bool(novos or removidos),
         }
+        pendentes.extend(novos)
+        print(f"Shard {nome}: {len(novos)} blocos novos ou alterados, {len(removidos)} removidos ou alterados")
+    print(f"Total de {len(chunks_info)} blocos, {len(textos)} gerados nesta execução")
+
+    if pendentes:
+        # Matriz pré-alocada em float32, no formato esperado pelo FAISS
+        vetores_path = os.path.join(output_path, 'vetores.npy.tmp')
+        if args.memmap:
+            vetores = np.lib.format.open_memmap(
+                vetores_path, mode='w+', dtype=np.float32, shape=(len(pendentes), vector_dim)
+            )
+        else:
+            vetores = np.empty((len(pendentes), vector_dim), dtype=np.float32)
+
+        pool = None
+        if args.multi_processo:
+            pool = model.start_multi_process_pool(['cpu'] * args.processos)
+
+        try:
+            gerar_embeddings(model, [textos[p] for p in pendentes], vetores,
+                             batch_size=args.batch_size, pool=pool,
+                             ids=[tokens[p] for p in pendentes])
+        finally:
+            if pool:
+                model.stop_multi_process_pool(pool)
+
+        # Cada shard recebe as suas linhas; índices IVF são treinados com os
+        # vetores do próprio shard
+        linha = {posicao: i for i, posicao in enumerate(pendentes)}
+        for shard in shards.values():
+            if not shard.get("novos"):
+                continue
+            vetores_shard = vetores[[linha[p] for p in shard["novos"]]]
+            if shard["index"] is None:
+                shard["index"] = criar_index(shard["indice"], vector_dim, vetores_shard)
+            ids = np.array([id_faiss(chunks_info[p]['id']) for p in shard["novos"]], dtype=np.int64)
+            shard["index"].add_with_ids(vetores_shard, ids)
+
+        if args.memmap:
+            del vetores
+            os.remove(vetores_path)
+
+    # Os arquivos são gravados em temporários e trocados com os.replace,
+    # para que o chatbot em execução nunca leia um arquivo pela metade. As
+    # posições dos chunks mudam quando uma fonte muda de tamanho, então os
+    # metadados, o índice de artigos e o BM25 são sempre regravados inteiros
+    # (sem tokenizar as fontes intactas); os shards, só os alterados
+    os.makedirs(os.path.join(output_path, 'shards'), exist_ok=True)
+
+    for shard in shards.values():
+        if shard["alterado"]:
+            faiss.write_index(shard["index"], os.path.join(output_path, shard["arquivo"]) + '.tmp')
+    with open(json_path + '.tmp', 'w', encoding='utf-8') as f:
+        for chunk in chunks_info:
+            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+
+    # Mesmos metadados em formato colunar, mapeado em memória pelo chatbot
+    salvar_armazem_chunks(chunks_info, armazem_path + '.tmp', [id_faiss(c['id']) for c in chunks_info])
+
+    # Índice exato (fonte, número, sufixo) -> posições dos chunks, usado quando
+    # a pergunta cita artigos pelo número
+    salvar_indice_artigos(construir_indice_artigos(chunks_info), indice_artigos_path + '.tmp')
+
+    salvar_bm25(partes_bm25, bm25_path + '.tmp')
+    del anterior
+
+    # Salvar metadados dos chunks, índice de artigos e índice FAISS
+    os.replace(json_path + '.tmp', json_path)
+    os.replace(armazem_path + '.tmp', armazem_path)
+    os.replace(indice_artigos_path + '.tmp', indice_artigos_path)
+    os.replace(bm25_path + '.tmp', bm25_path)
+    for shard in shards.values():
+        if shard["alterado"]:
+            caminho = os.path.join(output_path, shard["arquivo"])
+            os.replace(caminho + '.tmp', caminho)
 
-        chunks_info.append(chunk)
+    # O manifesto é gravado por último, com a assinatura dos arquivos: se o
+    # build for interrompido antes, o próximo detecta a divergência e refaz
+    # as fontes afetadas
+    arquivos = {
+        nome: assinatura_arquivo(os.path.join(output_path, nome))
+        for nome in ['artigos_chunks.bin', 'bm25.bin'] + [shard["arquivo"] for shard in shards.values()]
+    }
+    salvar_manifesto(manifesto_path, config, shards, arquivos)
 
-# Converter para matriz FAISS
-matriz = np.vstack(vetores)
-index.add(matriz)
+    # Shards de fontes removidas e o índice único de builds anteriores
+    for nome in shards_removidos:
+        caminho = os.path.join(output_path, shards_anteriores[nome]['arquivo'])
+        if os.path.exists(caminho):
+            os.remove(caminho)
+    if os.path.exists(os.path.join(output_path, 'faiss_embeddings.bin')):
+        os.remove(os.path.join(output_path, 'faiss_embeddings.bin'))
 
-# Salvar índice FAISS
-faiss_path = os.path.join(output_path, 'faiss_embeddings.bin')
-faiss.write_index(index, faiss_path)
-print(f"Índice FAISS salvo em: {faiss_path}")
+    print(f"Índices FAISS (um por fonte) salvos em: {os.path.join(output_path, 'shards')}")
+    print(f"Arquivo com chunks salvos em: {json_path}")
+    print(f"Índice de artigos salvo em: {indice_artigos_path}")
+    print(f"Índice BM25 salvo em: {bm25_path}")
+    print(f"Total de {len(chunks_info)} blocos indexados.")
 
-# Salvar metadados dos chunks
-json_path = os.path.join(output_path, 'artigos_chunks.jsonl')
-with open(json_path, 'w', encoding='utf-8') as f:
-    for chunk in chunks_info:
-        f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
 
-print(f"Arquivo com chunks salvos em: {json_path}")
-print(f"Total de {len(chunks_info)} blocos indexados.")
+if __name__ == '__main__':
+    main()
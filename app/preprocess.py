@@ -1,6 +1,9 @@
 import os
 import glob
-from docling.document_converter import DocumentConverter
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # 1. Buscar o arquivo e definir paths
 # Paths are being passed like this to avoid some path finding errors
@@ -8,28 +11,283 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 input_path = os.path.join(project_root, 'data', 'legislacao_bruta')
 output_path = os.path.join(project_root, 'data', 'legislacao_processada')
 
-files = glob.glob(os.path.join(input_path, '*.pdf'))
+# Hash de cada PDF convertido com sucesso; permite pular os PDFs inalterados
+# e retomar uma execução interrompida sem refazer os arquivos já concluídos.
+# Em "partes" ficam as partes já convertidas dos PDFs divididos por páginas
+# (--paginas-por-parte), cujo Markdown é guardado em partes_path até que o
+# PDF inteiro termine, e em "falhas" o erro dos PDFs que o Docling não
+# conseguiu converter, refeitos na execução seguinte
+estado_path = os.path.join(output_path, 'estado_conversao.json')
+partes_path = os.path.join(output_path, 'partes')
 
-# 2. Processar com Docling
-converter = DocumentConverter()
+# Conversor do Docling, criado uma vez por processo
+converter = None
 
-if not os.path.exists(output_path):
-    os.makedirs(output_path)
 
-for file in files:
-    print(f'Converting file: {file}')
+def iniciar_converter():
+    global converter
+    from docling.document_converter import DocumentConverter
+    converter = DocumentConverter()
 
-    result = converter.convert(file)
-    
+
+def converter_parte(file, paginas=None):
+    """Converte o PDF (ou só o intervalo de páginas, 1-based e inclusivo) para Markdown."""
+    if converter is None:
+        iniciar_converter()
+    if paginas is None:
+        result = converter.convert(file)
+    else:
+        result = converter.convert(file, page_range=paginas)
+    return result.document.export_to_markdown()
+
+
+def hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def contar_paginas(caminho):
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(caminho)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def dividir_paginas(total_paginas, paginas_por_parte):
+    """Intervalos (início, fim) de até paginas_por_parte páginas cada."""
+    return [
+        (inicio, min(inicio + paginas_por_parte - 1, total_paginas))
+        for inicio in range(1, total_paginas + 1, paginas_por_parte)
+    ]
+
+
+def gravar_arquivo(caminho, texto):
+    """Grava em um temporário, sincronizado com o disco, e troca de uma vez:
+    uma interrupção (ou queda de energia) nunca deixa o arquivo pela metade."""
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(caminho + '.tmp', caminho)
+
+
+def carregar_estado():
+    if os.path.exists(estado_path):
+        with open(estado_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def salvar_estado(estado):
+    gravar_arquivo(estado_path, json.dumps(estado, ensure_ascii=False, indent=2))
+
+
+def nome_intervalo(paginas):
+    return f"{paginas[0]}-{paginas[1]}"
+
+
+def caminho_parte(file, paginas):
+    nome = os.path.basename(file).replace('.pdf', '')
+    return os.path.join(partes_path, f"{nome}_{nome_intervalo(paginas)}.md")
+
+
+def partes_concluidas(file, hash_pdf, estado):
+    """Markdown das partes do PDF convertidas em uma execução anterior, por
+    intervalo de páginas; só valem se o PDF não mudou desde então."""
+    registro = estado.get("partes", {}).get(os.path.basename(file))
+    if not registro or registro["hash"] != hash_pdf:
+        return {}
+    concluidas = {}
+    for intervalo in registro["concluidas"]:
+        paginas = tuple(int(p) for p in intervalo.split('-'))
+        caminho = caminho_parte(file, paginas)
+        if os.path.exists(caminho):
+            with open(caminho, 'r', encoding='utf-8') as f:
+                concluidas[paginas] = f.read()
+    return concluidas
+
+
+def salvar_markdown(file, markdown):
     base_name = os.path.basename(file).replace('.pdf', '.md')
 
     # 3. Salvar com nome padronizado em legislacao_processada
     output_file = os.path.join(output_path, base_name)
+    gravar_arquivo(output_file, markdown)
+
+    print(f'Arquivo {base_name} salvo com sucesso em: {output_file}')
+    return output_file
+
+
+def registrar(file, paginas, markdown, conversao):
+    """Guarda uma parte convertida; com todas as partes do PDF, salva o .md.
+
+    Cada parte de um PDF dividido é gravada em disco e registrada no estado,
+    para que uma execução interrompida não a converta de novo. O hash do
+    PDF só entra no estado depois que o Markdown completo foi gravado.
+    """
+    nome = os.path.basename(file)
+    estado = conversao["estado"]
+    partes = conversao["partes"][file]
+    partes[paginas] = markdown
+    if len(partes) < conversao["total_partes"][file]:
+        os.makedirs(partes_path, exist_ok=True)
+        gravar_arquivo(caminho_parte(file, paginas), markdown)
+        registro = estado.setdefault("partes", {}).get(nome)
+        if registro is None or registro["hash"] != conversao["hashes"][file]:
+            registro = estado["partes"][nome] = {"hash": conversao["hashes"][file], "concluidas": []}
+        registro["concluidas"].append(nome_intervalo(paginas))
+        salvar_estado(estado)
+        return
+    concluir(file, conversao)
+
+
+def concluir(file, conversao):
+    """Costura as partes do PDF, salva o .md e registra o hash do PDF."""
+    nome = os.path.basename(file)
+    estado = conversao["estado"]
+    partes = conversao["partes"][file]
+    if len(partes) == 1:
+        markdown_completo = next(iter(partes.values()))
+    else:
+        # Partes costuradas na ordem das páginas
+        ordem = sorted(partes, key=lambda p: p[0])
+        markdown_completo = "\n\n".join(partes[p].strip() for p in ordem) + "\n"
+    salvar_markdown(file, markdown_completo)
+    del conversao["partes"][file]
+
+    estado[nome] = conversao["hashes"][file]
+    registro = estado.get("partes", {}).pop(nome, None)
+    estado.get("falhas", {}).pop(nome, None)
+    salvar_estado(estado)
+
+    # As partes já estão no .md
+    for intervalo in (registro or {}).get("concluidas", []):
+        caminho = caminho_parte(file, tuple(int(p) for p in intervalo.split('-')))
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def registrar_falha(file, paginas, erro, conversao):
+    """Registra no estado o PDF (ou a parte) que não pôde ser convertido.
+
+    As demais conversões continuam; o PDF não recebe o hash no estado e é
+    convertido de novo na próxima execução.
+    """
+    nome = os.path.basename(file)
+    intervalo = f' (páginas {nome_intervalo(paginas)})' if paginas else ''
+    print(f'❌ Falha ao converter {nome}{intervalo}: {erro}')
+    conversao["falhas"].add(file)
+    estado = conversao["estado"]
+    estado.setdefault("falhas", {})[nome] = {
+        "hash": conversao["hashes"][file],
+        "paginas": nome_intervalo(paginas) if paginas else None,
+        "erro": str(erro),
+    }
+    salvar_estado(estado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte os PDFs da legislação para Markdown com o Docling.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processos de conversão em paralelo (cada um carrega os modelos do Docling)")
+    parser.add_argument('--paginas-por-parte', type=int, default=0,
+                        help="divide PDFs maiores em partes com este número de páginas, convertidas em paralelo (0 desativa)")
+    parser.add_argument('--forcar', action='store_true',
+                        help="converte todos os PDFs, mesmo os que não mudaram")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(input_path, '*.pdf')))
+
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    estado = {} if args.forcar else carregar_estado()
+
+    # Só entram os PDFs alterados desde a última conversão bem-sucedida
+    hashes = {}
+    pendentes = []
+    for file in files:
+        nome = os.path.basename(file)
+        hashes[file] = hash_arquivo(file)
+        md = os.path.join(output_path, nome.replace('.pdf', '.md'))
+        if estado.get(nome) == hashes[file] and os.path.exists(md):
+            print(f'Arquivo {nome} inalterado; conversão ignorada')
+            continue
+        pendentes.append(file)
+
+    # Cada tarefa é um PDF inteiro ou um intervalo de páginas dele; as
+    # partes concluídas em uma execução interrompida não são refeitas
+    tarefas = []
+    partes = {file: {} for file in pendentes}
+    total_partes = {}
+    for file in pendentes:
+        if args.paginas_por_parte > 0:
+            total_paginas = contar_paginas(file)
+            if total_paginas > args.paginas_por_parte:
+                intervalos = dividir_paginas(total_paginas, args.paginas_por_parte)
+                concluidas = partes_concluidas(file, hashes[file], estado)
+                partes[file] = {paginas: concluidas[paginas] for paginas in intervalos if paginas in concluidas}
+                if partes[file]:
+                    print(f'Arquivo {os.path.basename(file)}: {len(partes[file])} de {len(intervalos)} partes '
+                          f'já convertidas')
+                tarefas.extend((file, paginas) for paginas in intervalos if paginas not in partes[file])
+                total_partes[file] = len(intervalos)
+                continue
+        tarefas.append((file, None))
+        total_partes[file] = 1
+
+    conversao = {
+        "estado": estado,
+        "hashes": hashes,
+        "partes": partes,
+        "total_partes": total_partes,
+        "falhas": set(),
+    }
+
+    # PDFs com todas as partes já convertidas, só falta costurar
+    for file in pendentes:
+        if total_partes[file] > 1 and len(partes[file]) == total_partes[file]:
+            concluir(file, conversao)
+
+    # 2. Processar com Docling
+    if args.workers <= 1:
+        for file, paginas in tarefas:
+            print(f'Converting file: {file}' + (f' (páginas {paginas[0]}-{paginas[1]})' if paginas else ''))
+            try:
+                markdown = converter_parte(file, paginas)
+            except Exception as e:
+                registrar_falha(file, paginas, e, conversao)
+                continue
+            registrar(file, paginas, markdown, conversao)
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=iniciar_converter) as executor:
+            futuros = {}
+            for file, paginas in tarefas:
+                print(f'Converting file: {file}' + (f' (páginas {paginas[0]}-{paginas[1]})' if paginas else ''))
+                futuros[executor.submit(converter_parte, file, paginas)] = (file, paginas)
+
+            # Uma falha não interrompe a coleta: as conversões que terminam
+            # depois dela continuam sendo gravadas no estado
+            for futuro in as_completed(futuros):
+                file, paginas = futuros[futuro]
+                try:
+                    markdown = futuro.result()
+                except Exception as e:
+                    registrar_falha(file, paginas, e, conversao)
+                    continue
+                registrar(file, paginas, markdown, conversao)
+
+    falhas = conversao["falhas"]
+    print(f'{len(pendentes) - len(falhas)} arquivos convertidos, {len(files) - len(pendentes)} inalterados')
+    if falhas:
+        print(f'{len(falhas)} arquivos com falha, convertidos de novo na próxima execução: '
+              + ', '.join(sorted(os.path.basename(f) for f in falhas)))
 
-    makdown_converted = result.document.export_to_markdown()
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(makdown_converted)
-        f.flush()
-        os.fsync(f.fileno())
 
-    print(f'Arquivo {base_name} salvo com sucesso em: {output_file}')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,542 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from indice_artigos import (construir_indice_artigos, carregar_indice_artigos, buscar_artigos, detectar_fontes,
+                            normalizar_texto)
+from armazem import ArmazemChunks
+from bm25 import IndiceBM25
+from telemetria import etapa
+
+logger = logging.getLogger(__name__)
+
+# Caminhos padrão dos artefatos gerados por prepare_embeddings_chunks.py
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+embeddings_path = os.path.join(project_root, 'data', 'legislacao_embeddings')
+
+NOME_MODELO_EMBEDDINGS = 'all-MiniLM-L6-v2'
+
+# Encoder das perguntas: "onnx" usa a versão int8 exportada por
+# encoder_onnx.py quando ela existe e passou na paridade; caso contrário, ou
+# com "torch", usa o SentenceTransformer
+ENCODER_CONSULTA = "onnx"
+
+# Busca híbrida: BM25 (termos exatos) e FAISS (semântica) rodam em paralelo
+# e as listas são combinadas por reciprocal rank fusion. Cada busca traz
+# CANDIDATOS_HIBRIDA candidatos; K_RRF amortece o peso das primeiras posições
+BUSCA_HIBRIDA = True
+CANDIDATOS_HIBRIDA = 20
+K_RRF = 60
+
+# Artigos de mesmo texto ou quase idênticos (removidos na deduplicação ou
+# recuperados juntos) citados no cabeçalho do bloco, por rótulo; os demais
+# são só contados
+MAX_ALIASES_CABECALHO = 3
+
+# Resultado de uma recuperação: blocos de contexto formatados, ids dos chunks
+# desses blocos, vetor da pergunta (None se não foi preciso codificá-la) e
+# versão do índice consultado. Blocos e ids são os candidatos, em ordem de
+# relevância: montar_mensagens (geracao.py) põe no prompt só os primeiros
+# blocos que cabem em MAX_TOKENS_CONTEXTO. Um artigo citado pelo número traz
+# todas as suas ocorrências (na CF, "artigo 5" passa de cem chunks)
+Recuperacao = namedtuple('Recuperacao', ['blocos', 'ids', 'vetor', 'versao'])
+
+# Índice FAISS de uma fonte: fonte normalizada e tipos de legislação (para
+# o roteamento), o índice e as posições dos seus chunks nos metadados. Builds anteriores aos
+# shards têm um único, sem fonte
+Shard = namedtuple('Shard', ['nome', 'fonte', 'tipos', 'index', 'posicoes'])
+
+
+def fusao_rrf(listas, k=K_RRF):
+    """Reciprocal rank fusion: soma 1 / (k + posição) em cada lista.
+
+    Devolve as posições em ordem decrescente de pontuação; empates ficam na
+    ordem em que a posição apareceu primeiro.
+    """
+    pontuacoes = {}
+    for lista in listas:
+        for rank, posicao in enumerate(lista, start=1):
+            pontuacoes[posicao] = pontuacoes.get(posicao, 0.0) + 1.0 / (k + rank)
+    return sorted(pontuacoes, key=lambda posicao: -pontuacoes[posicao])
+
+
+def cabecalho_bloco(dados):
+    """Cabeçalho do bloco de contexto: "[tipo] artigo - fonte", seguido dos
+    artigos de mesmo texto e dos de texto quase idêntico, se houver.
+
+    Só os aliases marcados como "exato" são citados como mesmo texto: os
+    demais (quase cópias da deduplicação, ou aliases.json anterior à
+    marcação) diferem em algum trecho.
+    """
+    cabecalho = f"[{dados['tipo']}] {dados['artigo']} - {dados['fonte']}"
+    proprio = f"{dados['artigo']} - {dados['fonte']}"
+    grupos = {True: [], False: []}
+    for a in dados.get("aliases", []):
+        citado = f"{a.get('artigo', '')} - {a.get('fonte', '')}"
+        if citado != proprio:
+            grupos[bool(a.get("exato"))].append(citado)
+    # Um artigo citado como cópia exata não se repete entre as quase cópias
+    exatos = list(dict.fromkeys(grupos[True]))
+    quase = [a for a in dict.fromkeys(grupos[False]) if a not in exatos]
+
+    partes = []
+    for rotulo, aliases in (("mesmo texto", exatos), ("texto quase idêntico", quase)):
+        if not aliases:
+            continue
+        citados = "; ".join(aliases[:MAX_ALIASES_CABECALHO])
+        if len(aliases) > MAX_ALIASES_CABECALHO:
+            citados += f" e mais {len(aliases) - MAX_ALIASES_CABECALHO}"
+        partes.append(f"{rotulo}: {citados}")
+    if not partes:
+        return cabecalho
+    return f"{cabecalho} ({'; '.join(partes)})"
+
+
+def id_faiss(chunk_id):
+    """Id estável de 63 bits, derivado do id textual do chunk, guardado nos índices FAISS."""
+    digest = hashlib.blake2b(chunk_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & 0x7FFF_FFFF_FFFF_FFFF
+
+
+class EstadoIndice:
+    """Fotografia imutável dos índices FAISS e dos metadados dos chunks.
+
+    Uma troca de estado substitui o objeto inteiro, de modo que uma busca
+    nunca mistura o índice de uma versão com os metadados de outra.
+    """
+
+    def __init__(self, shards, artigos, indice_artigos, assinatura, posicao_por_id=None, bm25=None):
+        self.shards = shards
+        self.artigos = artigos
+        self.indice_artigos = indice_artigos
+        # Índice BM25; None em builds anteriores a ele
+        self.bm25 = bm25
+        self.assinatura = assinatura
+        # Índices com ids estáveis devolvem esses ids, e não posições
+        self.posicao_por_id = posicao_por_id
+        # Identificador curto da versão dos arquivos carregados
+        self.versao = hashlib.blake2b(repr(assinatura).encode('utf-8'), digest_size=8).hexdigest()
+
+    def posicoes(self, ids):
+        """Converte os ids devolvidos pelo FAISS em posições nos metadados."""
+        if self.posicao_por_id is None:
+            return ids
+        return np.array(
+            [[self.posicao_por_id.get(int(i), -1) for i in linha] for linha in ids],
+            dtype=np.int64,
+        )
+
+    def areas(self):
+        """Tipos de legislação (áreas) presentes nos shards, para a interface."""
+        return sorted({tipo for shard in self.shards for tipo in shard.tipos if tipo})
+
+    def rotear(self, pergunta, area=None):
+        """Shards a consultar para a pergunta.
+
+        Com `area`, ficam os shards desse tipo de legislação; dentre eles, se
+        a pergunta cita uma fonte pelo nome ("Código Penal", "CF"), só os
+        dessa fonte. Se nenhum shard atende, a busca é feita em todos.
+        """
+        shards = self.shards
+        if area:
+            area = normalizar_texto(area)
+            shards = [s for s in shards if area in map(normalizar_texto, s.tipos)] or self.shards
+
+        fontes = detectar_fontes(pergunta, sorted({s.fonte for s in shards if s.fonte}))
+        if fontes:
+            shards = [s for s in shards if s.fonte in fontes]
+        return shards
+
+    def mascara(self, shards):
+        """Máscara booleana dos chunks dos shards; None se são todos."""
+        if len(shards) == len(self.shards):
+            return None
+        mascara = np.zeros(len(self.artigos), dtype=bool)
+        for shard in shards:
+            mascara[shard.posicoes] = True
+        return mascara
+
+
+class MotorRecuperacao:
+    """Mantém índice, metadados e encoder residentes no processo.
+
+    Tudo é carregado sob demanda, no primeiro uso, e compartilhado por todas
+    as sessões. A cada consulta é comparada a assinatura (mtime e tamanho)
+    dos arquivos em data/legislacao_embeddings; se mudou, um novo estado é
+    carregado e trocado atomicamente.
+    """
+
+    def __init__(self, diretorio=embeddings_path, nome_modelo=NOME_MODELO_EMBEDDINGS, encoder=ENCODER_CONSULTA,
+                 hibrida=BUSCA_HIBRIDA):
+        self.diretorio = diretorio
+        self.nome_modelo = nome_modelo
+        self.encoder = encoder
+        self.hibrida = hibrida
+        self.shards_path = os.path.join(diretorio, 'shards')
+        # Índice único de builds anteriores aos shards
+        self.index_path = os.path.join(diretorio, 'faiss_embeddings.bin')
+        self.artigos_path = os.path.join(diretorio, 'artigos_chunks.jsonl')
+        self.armazem_path = os.path.join(diretorio, 'artigos_chunks.bin')
+        self.indice_artigos_path = os.path.join(diretorio, 'artigos_indice.json')
+        self.manifesto_path = os.path.join(diretorio, 'manifesto.json')
+        self.bm25_path = os.path.join(diretorio, 'bm25.bin')
+
+        self._lock = threading.Lock()
+        self._estado = None
+        self._assinatura_falha = None
+        self._modelo = None
+        # A busca BM25 e as buscas nos shards rodam aqui em paralelo
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='recuperacao')
+
+    def _metadados_path(self):
+        # O armazém binário é preferido; o jsonl atende builds antigos
+        if os.path.exists(self.armazem_path):
+            return self.armazem_path
+        return self.artigos_path
+
+    def _indices_paths(self):
+        # Um arquivo por shard; o índice único atende builds antigos
+        try:
+            shards = sorted(e.path for e in os.scandir(self.shards_path) if e.name.endswith('.faiss'))
+        except FileNotFoundError:
+            shards = []
+        return tuple(shards) or (self.index_path,)
+
+    def _assinatura(self):
+        assinatura = []
+        opcionais = (self.indice_artigos_path, self.manifesto_path, self.bm25_path)
+        for caminho in self._indices_paths() + (self._metadados_path(),) + opcionais:
+            try:
+                st = os.stat(caminho)
+            except FileNotFoundError:
+                # Índice de artigos, manifesto e BM25 são opcionais (builds antigos)
+                if caminho in opcionais:
+                    continue
+                return None
+            assinatura.append((caminho, st.st_mtime_ns, st.st_size))
+        return tuple(assinatura)
+
+    def _carregar_estado(self, assinatura):
+        import faiss
+        from indices_ann import aplicar_parametros_busca, ids_do_indice
+
+        manifesto = {}
+        if os.path.exists(self.manifesto_path):
+            with open(self.manifesto_path, 'r', encoding='utf-8') as f:
+                manifesto = json.load(f)
+
+        # Um índice por fonte, com os parâmetros de busca (efSearch, nprobe)
+        # do tipo de índice que cada shard usou no build
+        indices = []
+        if manifesto.get('shards'):
+            for nome, info in manifesto['shards'].items():
+                index = faiss.read_index(os.path.join(self.diretorio, info['arquivo']))
+                aplicar_parametros_busca(index, info.get('indice'))
+                indices.append((nome, normalizar_texto(info['fonte']), tuple(info.get('tipos', [])), index))
+        else:
+            index = faiss.read_index(self.index_path)
+            aplicar_parametros_busca(index, manifesto.get('indice'))
+            indices.append((None, None, (), index))
+
+        # Com o armazém binário, os metadados são só um mmap: nada é
+        # decodificado até que uma busca devolva a linha
+        if self._metadados_path() == self.armazem_path:
+            artigos = ArmazemChunks(self.armazem_path)
+        else:
+            with open(self.artigos_path, 'r', encoding='utf-8') as f:
+                artigos = [json.loads(linha) for linha in f if linha.strip()]
+
+        # Índice e metadados de versões diferentes (build em andamento)
+        total = sum(index.ntotal for *_, index in indices)
+        if total != len(artigos):
+            raise RuntimeError(
+                f"Índices com {total} vetores e metadados com {len(artigos)} chunks"
+            )
+
+        indice_artigos = None
+        if os.path.exists(self.indice_artigos_path):
+            indice_artigos = carregar_indice_artigos(self.indice_artigos_path)
+        if indice_artigos is None or indice_artigos.get("total_chunks") != len(artigos):
+            if isinstance(artigos, ArmazemChunks):
+                indice_artigos = construir_indice_artigos(list(artigos.artigos()))
+            else:
+                indice_artigos = construir_indice_artigos(artigos)
+
+        bm25 = None
+        if os.path.exists(self.bm25_path):
+            bm25 = IndiceBM25(self.bm25_path)
+            if len(bm25) != len(artigos):
+                raise RuntimeError(f"Índice BM25 com {len(bm25)} chunks e metadados com {len(artigos)}")
+
+        # Os shards guardam o id estável de cada chunk (no IndexIDMap2 ou,
+        # nos IVF, nas listas invertidas); o índice único antigo sem
+        # IndexIDMap devolve posições
+        posicao_por_id = None
+        if manifesto.get('shards') or isinstance(indices[0][3], faiss.IndexIDMap):
+            if isinstance(artigos, ArmazemChunks):
+                ids = artigos.ids_faiss().tolist()
+            else:
+                ids = [id_faiss(artigo['id']) for artigo in artigos]
+            posicao_por_id = {i: posicao for posicao, i in enumerate(ids)}
+
+        shards = []
+        for nome, fonte, tipos, index in indices:
+            if posicao_por_id is None:
+                posicoes = np.arange(index.ntotal)
+            else:
+                posicoes = np.array([posicao_por_id.get(i, -1) for i in ids_do_indice(index).tolist()],
+                                    dtype=np.int64)
+                if (posicoes < 0).any():
+                    raise RuntimeError(f"Shard {nome} com chunks ausentes dos metadados")
+            shards.append(Shard(nome, fonte, tipos, index, posicoes))
+
+        if self._assinatura() != assinatura:
+            raise RuntimeError("Arquivos alterados durante a leitura")
+
+        return EstadoIndice(shards, artigos, indice_artigos, assinatura, posicao_por_id, bm25)
+
+    def estado(self):
+        """Retorna o estado atual, recarregando se os arquivos mudaram."""
+        estado = self._estado
+        assinatura = self._assinatura()
+
+        if estado is not None and assinatura in (None, estado.assinatura, self._assinatura_falha):
+            return estado
+
+        with self._lock:
+            estado = self._estado
+            if estado is not None and assinatura == estado.assinatura:
+                return estado
+
+            try:
+                novo_estado = self._carregar_estado(assinatura)
+            except Exception as e:
+                # Mantém a versão anterior enquanto os arquivos estão inconsistentes
+                if estado is None:
+                    raise
+                self._assinatura_falha = assinatura
+                logger.warning(json.dumps({"aviso": "recarga do índice adiada", "erro": str(e)}, ensure_ascii=False))
+                return estado
+
+            self._estado = novo_estado
+            return novo_estado
+
+    def modelo(self):
+        """Retorna o modelo de embeddings, carregando-o no primeiro uso."""
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    self._modelo = self._carregar_modelo()
+        return self._modelo
+
+    def _carregar_modelo(self):
+        if self.encoder == "onnx":
+            from encoder_onnx import EncoderOnnx, encoder_disponivel
+            if encoder_disponivel(self.nome_modelo):
+                return EncoderOnnx()
+            logger.warning(json.dumps({"aviso": "encoder ONNX não exportado ou reprovado na paridade; usando o PyTorch"},
+                                      ensure_ascii=False))
+
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.nome_modelo)
+
+    def encode(self, textos):
+        vetores = self.modelo().encode(textos)
+        return np.asarray(vetores, dtype=np.float32)
+
+    def buscar_artigos(self, pergunta, estado=None):
+        """Ocorrências dos artigos citados na pergunta, via índice exato."""
+        if estado is None:
+            estado = self.estado()
+        return buscar_artigos(estado.indice_artigos, pergunta)
+
+    def areas(self):
+        return self.estado().areas()
+
+    def buscar(self, vetores, top_k, estado=None, shards=None):
+        """Busca os top_k vizinhos; retorna (D, posições, estado usado na busca).
+
+        Com vários shards (todos, por padrão), cada um é buscado em paralelo
+        e os resultados são combinados pela similaridade (cosseno), qualquer
+        que seja a métrica de cada índice.
+        """
+        if estado is None:
+            estado = self.estado()
+        if shards is None:
+            shards = estado.shards
+        vetores = np.asarray(vetores, dtype=np.float32)
+
+        from indices_ann import similaridade
+
+        if len(shards) == 1:
+            D, I = shards[0].index.search(vetores, top_k)
+            return similaridade(shards[0].index, D), estado.posicoes(I), estado
+
+        futuros = [self._executor.submit(shard.index.search, vetores, top_k) for shard in shards]
+        resultados = [futuro.result() for futuro in futuros]
+        D = np.concatenate([similaridade(shard.index, d) for shard, (d, _) in zip(shards, resultados)], axis=1)
+        I = np.concatenate([i for _, i in resultados], axis=1)
+
+        # Similaridade: maior é mais próximo. Posições vazias (-1) de
+        # shards com menos de top_k vetores vão para o fim
+        D = np.where(I < 0, -np.inf, D)
+        ordem = np.argsort(-D, axis=1, kind='stable')[:, :top_k]
+        return np.take_along_axis(D, ordem, axis=1), estado.posicoes(np.take_along_axis(I, ordem, axis=1)), estado
+
+    def recuperar(self, pergunta, top_k=3, vetor=None, area=None, rastro=None, estado=None, busca=None):
+        """Blocos de contexto da pergunta, em ordem de relevância.
+
+        Primeiro procura no índice exato os artigos citados pelo número; se
+        não houver nenhum, faz a busca semântica no FAISS, combinada com a
+        BM25 quando a busca híbrida está ativa. A busca fica restrita aos
+        shards da fonte citada na pergunta e da `area` (tipo de legislação),
+        quando informada. `vetor` permite reaproveitar o embedding da
+        pergunta já calculado por quem chama, e `estado` e `busca` (D, I de
+        buscar() para esta pergunta), a busca feita em lote (recuperar_lote).
+        Com `rastro` (telemetria.Rastro) são registrados os tempos de cada
+        etapa e, nos pedidos amostrados, os chunks e as pontuações das buscas.
+        """
+        # Mesma versão de índice e metadados durante toda a consulta
+        if estado is None:
+            estado = self.estado()
+        artigos = estado.artigos
+
+        shards = estado.rotear(pergunta, area)
+        mascara = estado.mascara(shards)
+
+        grupos = {}
+
+        # Estratégia 1: Buscar no índice exato os artigos citados na pergunta
+        # (fonte, número e sufixo), em vez de varrer todos os chunks
+        with etapa(rastro, 'busca_artigos'):
+            ocorrencias = self.buscar_artigos(pergunta, estado)
+        for posicoes in ocorrencias:
+            if mascara is not None and not mascara[posicoes[0]]:
+                continue
+            # Cada ocorrência do artigo vira um grupo, com as partes em ordem
+            primeiro = artigos[posicoes[0]]
+            # Um artigo citado também por um alias (deduplicacao.py) aponta
+            # para as mesmas posições e fica em um único grupo
+            grupos[posicoes[0]] = {
+                "tipo": primeiro.get('tipo', 'Tipo desconhecido'),
+                "artigo": primeiro.get('artigo', 'Artigo desconhecido'),
+                "fonte": primeiro.get('fonte', 'Fonte desconhecida'),
+                "aliases": primeiro.get('aliases', []),
+                "partes": [artigos[posicao] for posicao in posicoes]
+            }
+
+        estrategia = 'artigos' if grupos else 'semantica'
+        if not grupos:
+            # Estratégia 2: Busca normal via embeddings se não achou pelo número
+            # de artigo. Com o índice BM25, a busca por termos roda em paralelo
+            # e as duas listas de candidatos são combinadas por RRF
+            hibrida = self.hibrida and estado.bm25 is not None
+            candidatos = self.candidatos(top_k, estado)
+            if hibrida:
+                def buscar_bm25():
+                    with etapa(rastro, 'busca_bm25'):
+                        return estado.bm25.buscar(pergunta, candidatos, mascara)
+                futuro_bm25 = self._executor.submit(buscar_bm25)
+
+            if busca is not None:
+                D, I = busca
+            else:
+                if vetor is None:
+                    with etapa(rastro, 'embedding'):
+                        vetor = self.encode([pergunta])
+                with etapa(rastro, 'busca_faiss'):
+                    D, I, _ = self.buscar(np.reshape(vetor, (1, -1)), candidatos, estado, shards)
+            # Posições e distâncias filtradas juntas: os -1 (vagas sem vizinho)
+            # podem vir antes de resultados válidos
+            resultados = [(int(idx), float(d)) for idx, d in zip(I[0], D[0]) if 0 <= idx < len(artigos)]
+            posicoes = [idx for idx, _ in resultados]
+            if rastro is not None:
+                rastro.amostrar('faiss', [[artigos[idx].get('id', ''), d] for idx, d in resultados])
+
+            if hibrida:
+                posicoes_bm25, pontuacoes_bm25 = futuro_bm25.result()
+                if rastro is not None:
+                    rastro.amostrar('bm25', [[artigos[int(idx)].get('id', ''), float(p)]
+                                             for idx, p in zip(posicoes_bm25, pontuacoes_bm25)])
+                posicoes = fusao_rrf([posicoes, posicoes_bm25.tolist()])
+
+            # Chunks de mesmo texto em artigos diferentes (índices construídos
+            # sem a deduplicação, ou trechos repetidos dentro de artigos
+            # distintos) ocupam uma única vaga; o artigo repetido é citado no
+            # cabeçalho do primeiro
+            por_texto = {}
+            for idx in posicoes:
+                if len(por_texto) == top_k:
+                    break
+                artigo = artigos[idx]
+                texto = normalizar_texto(artigo.get('conteudo', ''))
+                if texto in por_texto:
+                    por_texto[texto]["aliases"].append(
+                        {"artigo": artigo.get('artigo', ''), "fonte": artigo.get('fonte', ''), "exato": True})
+                    continue
+
+                id_completo = artigo.get('id', '')
+                id_base = id_completo.rsplit("_chunk_", 1)[0]
+
+                if id_base not in grupos:
+                    grupos[id_base] = {
+                        "tipo": artigo.get('tipo', 'Tipo desconhecido'),
+                        "artigo": artigo.get('artigo', 'Artigo desconhecido'),
+                        "fonte": artigo.get('fonte', 'Fonte desconhecida'),
+                        "aliases": list(artigo.get('aliases', [])),
+                        "partes": []
+                    }
+
+                grupos[id_base]["partes"].append(artigo)
+                por_texto[texto] = grupos[id_base]
+
+        # Montar os blocos do contexto
+        blocos = []
+        ids = []
+        with etapa(rastro, 'montagem_contexto'):
+            for dados in grupos.values():
+                # Ordenar as partes pelo número da 'parte'
+                partes_ordenadas = sorted(dados["partes"], key=lambda x: x.get("parte", 1))
+                texto_completo = "\n".join(p.get("conteudo", "").strip() for p in partes_ordenadas)
+                ids.extend(p.get('id', '') for p in partes_ordenadas)
+
+                blocos.append(f"{cabecalho_bloco(dados)}\n{texto_completo}\n\n")
+        if rastro is not None:
+            rastro.registrar('estrategia', estrategia)
+            rastro.amostrar('candidatos', list(ids))
+
+        return Recuperacao(blocos, tuple(ids), vetor, estado.versao)
+
+    def candidatos(self, top_k, estado):
+        """Vizinhos pedidos ao FAISS por pergunta: mais que top_k na busca híbrida."""
+        return CANDIDATOS_HIBRIDA if self.hibrida and estado.bm25 is not None else top_k
+
+    def recuperar_lote(self, perguntas, top_k=3, areas=None):
+        """recuperar() de várias perguntas com um único encode e uma busca em
+        lote no FAISS por conjunto de shards consultados (em geral, um só)."""
+        estado = self.estado()
+        areas = areas or [None] * len(perguntas)
+        vetores = self.encode(list(perguntas))
+        candidatos = self.candidatos(top_k, estado)
+
+        # Perguntas roteadas para os mesmos shards são buscadas juntas
+        grupos = {}
+        for i, (pergunta, area) in enumerate(zip(perguntas, areas)):
+            shards = estado.rotear(pergunta, area)
+            grupos.setdefault(tuple(shard.nome for shard in shards), (shards, []))[1].append(i)
+
+        buscas = [None] * len(perguntas)
+        for shards, indices in grupos.values():
+            D, I, _ = self.buscar(vetores[indices], candidatos, estado, shards)
+            for linha, i in enumerate(indices):
+                buscas[i] = (D[linha:linha + 1], I[linha:linha + 1])
+
+        return [
+            self.recuperar(pergunta, top_k, vetor=vetores[i], area=areas[i], estado=estado, busca=buscas[i])
+            for i, pergunta in enumerate(perguntas)
+        ]
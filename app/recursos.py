@@ -0,0 +1,109 @@
+"""Recursos externos do chatbot, verificados localmente e sem acesso à rede.
+
+Uso, a partir de app/:
+
+    python recursos.py            # lista o que falta, sem acessar a rede
+    python recursos.py --baixar   # baixa o que falta (em uma máquina com rede)
+
+São verificados o tokenizador de sentenças do NLTK (em data/nltk_data), o
+modelo de embeddings no cache do Hugging Face e o modelo GGUF do chatbot.
+Para um servidor sem rede, rode o --baixar em outra máquina e copie
+data/nltk_data e o cache do Hugging Face (~/.cache/huggingface/hub).
+"""
+import os
+import sys
+import glob
+import argparse
+
+from utils import NLTK_DATA_PATH
+from recuperacao import NOME_MODELO_EMBEDDINGS
+
+RECURSOS_NLTK = ['punkt_tab']
+
+
+def repositorio_modelo(nome_modelo):
+    # Nomes curtos ("all-MiniLM-L6-v2") são da organização sentence-transformers
+    return nome_modelo if '/' in nome_modelo else f'sentence-transformers/{nome_modelo}'
+
+
+def cache_huggingface():
+    if 'HF_HUB_CACHE' in os.environ:
+        return os.environ['HF_HUB_CACHE']
+    hf_home = os.environ.get('HF_HOME', os.path.join(os.path.expanduser('~'), '.cache', 'huggingface'))
+    return os.path.join(hf_home, 'hub')
+
+
+def modelo_local(nome_modelo=NOME_MODELO_EMBEDDINGS):
+    """Diretório do modelo no cache do Hugging Face (ou o próprio nome, se
+    for um diretório), ou None se ele ainda não foi baixado."""
+    if os.path.isdir(nome_modelo):
+        return nome_modelo
+    pasta = 'models--' + repositorio_modelo(nome_modelo).replace('/', '--')
+    for snapshot in glob.glob(os.path.join(cache_huggingface(), pasta, 'snapshots', '*')):
+        if os.path.exists(os.path.join(snapshot, 'config.json')):
+            return snapshot
+    return None
+
+
+def modo_offline(nome_modelo=NOME_MODELO_EMBEDDINGS):
+    """Desliga o acesso do Hugging Face à rede se o modelo já está no cache.
+
+    Sem isso, cada carga do modelo consulta o Hub em busca de versões novas,
+    o que trava em servidores sem rede. Precisa ser chamada antes de
+    importar o sentence_transformers.
+    """
+    if modelo_local(nome_modelo) is None:
+        return False
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+    return True
+
+
+def verificar(nome_modelo=NOME_MODELO_EMBEDDINGS):
+    """Recursos ausentes, como (recurso, o que fazer); lista vazia se nada falta."""
+    from utils import sent_tokenize
+    from pipeline import model_path
+
+    faltando = []
+    try:
+        sent_tokenize("Verificação. Sem rede.")
+    except (ImportError, LookupError) as e:
+        faltando.append(("NLTK punkt_tab", str(e)))
+    if modelo_local(nome_modelo) is None:
+        faltando.append((f"modelo de embeddings {nome_modelo}",
+                         f"não está em {cache_huggingface()}; rode `python recursos.py --baixar`"))
+    if not os.path.exists(model_path):
+        faltando.append(("modelo GGUF", f"{model_path} não encontrado (ver README)"))
+    return faltando
+
+
+def baixar(nome_modelo=NOME_MODELO_EMBEDDINGS):
+    """Baixa os dados do NLTK para data/nltk_data e o modelo de embeddings
+    para o cache do Hugging Face. O GGUF é baixado à parte."""
+    import nltk
+    from huggingface_hub import snapshot_download
+
+    for recurso in RECURSOS_NLTK:
+        nltk.download(recurso, download_dir=NLTK_DATA_PATH)
+    if modelo_local(nome_modelo) is None:
+        snapshot_download(repositorio_modelo(nome_modelo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica (ou baixa) os recursos externos do chatbot.")
+    parser.add_argument('--baixar', action='store_true', help="baixa o que falta; exige rede")
+    args = parser.parse_args()
+
+    if args.baixar:
+        baixar()
+
+    faltando = verificar()
+    for recurso, detalhe in faltando:
+        print(f"❌ {recurso}: {detalhe}")
+    if faltando:
+        sys.exit(1)
+    print("Todos os recursos estão disponíveis localmente.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""API HTTP/JSON do chatbot (aiohttp), separada da interface Streamlit.
+
+Uso, a partir de app/:
+
+    python servidor.py --porta 8080 --workers 2
+
+Rotas:
+    POST /retrieve     {"pergunta", "top_k", "area"} -> blocos de contexto e ids dos chunks
+                       candidatos; o chat usa os primeiros blocos que cabem no prompt
+    POST /chat         {"pergunta", "historico", "area"} -> {"resposta"}
+    POST /chat/stream  mesmo corpo; resposta em server-sent events: "fila"
+                       (posição e espera), "trecho" (texto) e "fim"
+    GET  /areas        tipos de legislação disponíveis para o campo "area"
+    GET  /metrics      métricas no formato texto do Prometheus (tempo por etapa,
+                       tokens, taxa de acerto do cache)
+    GET  /saude        {"status": "carregando" | "ok" | "erro", "etapas_ms"}: os
+                       modelos carregam em segundo plano, com o servidor já no ar
+
+As duas rotas de chat passam pela fila de geração e respondem 503 quando
+ela está cheia.
+
+O histórico é uma lista de {"role": "user" | "assistant", "content": ...} e
+"top_k", um inteiro positivo; corpos fora desse formato recebem 400.
+"area" é opcional e restringe a busca aos índices daquele tipo de legislação.
+Cada pedido grava uma linha de log em JSON com o tempo de cada etapa.
+"""
+import time
+_INICIO = time.perf_counter()
+
+import json
+import asyncio
+import logging
+import threading
+import functools
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+
+from pipeline import PipelineRAG, historico_de_mensagens, MENSAGEM_FILA_CHEIA
+from fila_geracao import FilaCheia, MAX_FILA
+from telemetria import METRICAS, AMOSTRAGEM, Rastro, Inicializacao
+from recursos import modo_offline
+
+# Importações deste módulo (aiohttp, pipeline), primeira etapa da inicialização
+_IMPORTACOES = time.perf_counter() - _INICIO
+
+HOST = '127.0.0.1'
+PORTA = 8080
+
+# Threads que consomem os eventos dos pedidos de chat (gerador bloqueante
+# da fila): uma por pedido que a fila admite, aguardando ou em geração, e
+# uma para o envio. Separadas do executor padrão, usado por /retrieve e /areas
+THREADS_EVENTOS = MAX_FILA + 2
+
+_FIM = object()
+
+
+def criar_app(pipeline=None):
+    app = web.Application()
+    app['pipeline'] = pipeline or PipelineRAG()
+    app['inicializacao'] = Inicializacao(_INICIO)
+    app['inicializacao'].registrar_etapa('importacoes', _IMPORTACOES)
+    app['eventos'] = ThreadPoolExecutor(max_workers=THREADS_EVENTOS, thread_name_prefix='eventos')
+    app.on_startup.append(_carregar)
+    app.on_cleanup.append(_encerrar)
+    app.add_routes([
+        web.get('/saude', saude),
+        web.get('/areas', areas),
+        web.get('/metrics', metricas),
+        web.post('/retrieve', retrieve),
+        web.post('/chat', chat),
+        web.post('/chat/stream', chat_stream),
+    ])
+    return app
+
+
+async def _carregar(app):
+    # Índice, encoder e modelo carregam em segundo plano, e não na primeira
+    # pergunta: o servidor já aceita conexões e /saude informa o andamento.
+    # Perguntas que chegam antes aguardam a carga do que lhes falta
+    app['aquecimento'] = asyncio.get_running_loop().run_in_executor(
+        None, _aquecer, app['pipeline'], app['inicializacao'])
+
+
+async def _encerrar(app):
+    app['eventos'].shutdown(wait=False, cancel_futures=True)
+
+
+def _aquecer(pipeline, inicializacao):
+    try:
+        pipeline.aquecer(inicializacao)
+    except Exception as e:
+        logging.exception("Falha ao carregar os modelos")
+        inicializacao.concluir(e)
+    else:
+        inicializacao.concluir()
+
+
+async def _ler_pedido(request):
+    try:
+        dados = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Corpo da requisição não é um JSON válido")
+
+    pergunta = dados.get('pergunta') if isinstance(dados, dict) else None
+    if not isinstance(pergunta, str) or not pergunta.strip():
+        raise web.HTTPBadRequest(text="Campo 'pergunta' ausente ou vazio")
+    if not isinstance(dados.get('area'), (str, type(None))):
+        raise web.HTTPBadRequest(text="Campo 'area' deve ser texto")
+    return dados
+
+
+def _ler_top_k(dados, padrao=3):
+    top_k = dados.get('top_k', padrao)
+    # bool é subclasse de int, mas true/false não são um top_k
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k <= 0:
+        raise web.HTTPBadRequest(text="Campo 'top_k' deve ser um inteiro positivo")
+    return top_k
+
+
+def _ler_historico(dados):
+    historico = dados.get('historico')
+    if historico is None:
+        return []
+    if not isinstance(historico, list) or not all(
+            isinstance(m, dict) and isinstance(m.get('role'), str) and isinstance(m.get('content', ''), str)
+            for m in historico):
+        raise web.HTTPBadRequest(text="Campo 'historico' deve ser uma lista de {\"role\", \"content\"} com textos")
+    return historico_de_mensagens(historico)
+
+
+async def saude(request):
+    return web.json_response(request.app['inicializacao'].resumo())
+
+
+async def metricas(request):
+    # Métricas deste processo; com --workers, cada um expõe as suas
+    return web.Response(body=METRICAS.texto_prometheus().encode('utf-8'),
+                        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+async def areas(request):
+    motor = request.app['pipeline'].motor
+    return web.json_response({"areas": await asyncio.get_running_loop().run_in_executor(None, motor.areas)})
+
+
+async def retrieve(request):
+    dados = await _ler_pedido(request)
+    top_k = _ler_top_k(dados)
+
+    pipeline = request.app['pipeline']
+    rastro = Rastro(pipeline.amostragem)
+    recuperacao = await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(pipeline.motor.recuperar, dados['pergunta'], top_k, area=dados.get('area'),
+                                rastro=rastro)
+    )
+    rastro.finalizar('retrieve')
+    return web.json_response({
+        "blocos": list(recuperacao.blocos),
+        "ids": list(recuperacao.ids),
+        "versao": recuperacao.versao,
+    })
+
+
+async def _enviar_pergunta(request):
+    """Enfileira a pergunta do pedido; devolve o gerador de eventos da
+    resposta e o Event que cancela o pedido.
+
+    O envio roda no executor de eventos (no primeiro pedido ele espera a
+    carga do Llama); com a fila cheia, responde 503.
+    """
+    dados = await _ler_pedido(request)
+    historico = _ler_historico(dados)
+    cancelar = threading.Event()
+    try:
+        eventos = await asyncio.get_running_loop().run_in_executor(
+            request.app['eventos'], functools.partial(request.app['pipeline'].enviar_pergunta, dados['pergunta'],
+                                                      historico, cancelar, dados.get('area'))
+        )
+    except FilaCheia:
+        raise web.HTTPServiceUnavailable(text=MENSAGEM_FILA_CHEIA, headers={'Retry-After': '5'})
+    return eventos, cancelar
+
+
+def _fechar(eventos):
+    try:
+        eventos.close()
+    except ValueError:
+        # O pedido ainda está em next() em outra thread (cliente desconectou
+        # no meio da espera); o Event de cancelamento já encerra o pedido
+        pass
+
+
+async def chat(request):
+    eventos, cancelar = await _enviar_pergunta(request)
+
+    loop = asyncio.get_running_loop()
+    executor = request.app['eventos']
+    partes = []
+    try:
+        while True:
+            evento = await loop.run_in_executor(executor, next, eventos, _FIM)
+            if evento is _FIM:
+                break
+            if evento[0] == "trecho":
+                partes.append(evento[1])
+    finally:
+        # Cliente desconectou antes do fim: o pedido é cancelado na fila
+        cancelar.set()
+        await loop.run_in_executor(executor, _fechar, eventos)
+    return web.json_response({"resposta": "".join(partes).strip()})
+
+
+async def _enviar_evento(resposta, evento, dados):
+    await resposta.write(f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+
+async def chat_stream(request):
+    eventos, cancelar = await _enviar_pergunta(request)
+
+    resposta = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+    })
+    # Os eventos vêm de um gerador bloqueante (fila de geração), consumido
+    # em threads do executor de eventos para não travar o loop
+    loop = asyncio.get_running_loop()
+    executor = request.app['eventos']
+    try:
+        await resposta.prepare(request)
+        while True:
+            evento = await loop.run_in_executor(executor, next, eventos, _FIM)
+            if evento is _FIM:
+                break
+            if evento[0] == "fila":
+                await _enviar_evento(resposta, "fila", {"posicao": evento[1], "espera": round(evento[2], 1)})
+            else:
+                await _enviar_evento(resposta, "trecho", {"texto": evento[1]})
+        await _enviar_evento(resposta, "fim", {})
+    except ConnectionResetError:
+        # Cliente desconectou: o pedido é cancelado na fila
+        pass
+    finally:
+        cancelar.set()
+        await loop.run_in_executor(executor, _fechar, eventos)
+    return resposta
+
+
+def servir(host=HOST, porta=PORTA, reuse_port=False, amostragem=AMOSTRAGEM):
+    # Rastros dos pedidos (telemetria) e log de acesso, uma linha cada
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Com o modelo de embeddings já no cache local, nenhuma carga acessa a rede
+    modo_offline()
+    web.run_app(criar_app(PipelineRAG(amostragem=amostragem)), host=host, port=porta, reuse_port=reuse_port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP do chatbot jurídico.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processos servindo a mesma porta (SO_REUSEPORT); "
+                             "os pesos do GGUF são compartilhados via mmap")
+    parser.add_argument('--amostragem', type=float, default=AMOSTRAGEM,
+                        help="fração dos pedidos cujo log inclui os chunks recuperados e suas pontuações")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        servir(args.host, args.porta, amostragem=args.amostragem)
+        return
+
+    # Cada processo tem seu Llama (contexto e cache KV próprios) e sua fila;
+    # o kernel distribui as conexões entre eles
+    processos = [
+        multiprocessing.Process(target=servir, args=(args.host, args.porta, True, args.amostragem), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Fração dos pedidos cujo rastro inclui os ids e as pontuações dos chunks
+# recuperados (FAISS e BM25); 0 desliga a amostragem
+AMOSTRAGEM = 0.0
+
+# Limites dos histogramas: duração das etapas (s), tamanho do prompt
+# (tokens) e velocidade da decodificação (tokens/s)
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LIMITES_TOKENS = (128, 256, 512, 1024, 2048, 4096, 8192)
+LIMITES_TOKENS_POR_S = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{chave}="{valor}"' for chave, valor in sorted(rotulos)) + "}"
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus, por combinação de rótulos."""
+
+    def __init__(self, nome, ajuda, limites):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.limites = limites
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            contagens, soma, total = self._series.get(chave, ([0] * len(self.limites), 0.0, 0))
+            contagens = [c + (valor <= limite) for c, limite in zip(contagens, self.limites)]
+            self._series[chave] = (contagens, soma + valor, total + 1)
+
+    def texto(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for chave, (contagens, soma, total) in series:
+            for limite, contagem in zip(self.limites, contagens):
+                linhas.append(f"{self.nome}_bucket{_rotulos(chave + (('le', limite),))} {contagem}")
+            linhas.append(f"{self.nome}_bucket{_rotulos(chave + (('le', '+Inf'),))} {total}")
+            linhas.append(f"{self.nome}_sum{_rotulos(chave)} {soma}")
+            linhas.append(f"{self.nome}_count{_rotulos(chave)} {total}")
+        return linhas
+
+
+class Contador:
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valores(self):
+        with self._lock:
+            return dict(self._valores)
+
+    def texto(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for chave, valor in sorted(self.valores().items()):
+            linhas.append(f"{self.nome}{_rotulos(chave)} {valor}")
+        return linhas
+
+
+class Medida:
+    """Valor instantâneo (gauge do Prometheus), por combinação de rótulos."""
+
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def definir(self, valor, **rotulos):
+        with self._lock:
+            self._valores[tuple(sorted(rotulos.items()))] = valor
+
+    def texto(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} gauge"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for chave, valor in valores:
+            linhas.append(f"{self.nome}{_rotulos(chave)} {valor}")
+        return linhas
+
+
+class Metricas:
+    """Métricas agregadas do processo, expostas em GET /metrics."""
+
+    def __init__(self):
+        self.etapas = Histograma('chatbot_etapa_segundos', "Duração de cada etapa do pedido", LIMITES_SEGUNDOS)
+        self.duracao = Histograma('chatbot_pedido_segundos', "Duração total do pedido, por rota", LIMITES_SEGUNDOS)
+        self.tokens_prompt = Histograma('chatbot_tokens_prompt', "Tokens do prompt enviado ao modelo", LIMITES_TOKENS)
+        self.tokens_por_s = Histograma('chatbot_decodificacao_tokens_por_segundo',
+                                       "Velocidade da decodificação, depois do primeiro token", LIMITES_TOKENS_POR_S)
+        self.pedidos = Contador('chatbot_pedidos_total', "Pedidos atendidos, por rota")
+        self.cache = Contador('chatbot_cache_respostas_total',
+                              "Consultas ao cache de respostas, por resultado (exata, semelhante, falha)")
+        self.inicializacao = Medida('chatbot_inicializacao_segundos',
+                                    "Duração de cada etapa da inicialização do processo")
+
+    def taxa_acerto_cache(self):
+        valores = {dict(chave).get('resultado'): valor for chave, valor in self.cache.valores().items()}
+        total = sum(valores.values())
+        return (total - valores.get('falha', 0)) / total if total else 0.0
+
+    def texto_prometheus(self):
+        linhas = []
+        for metrica in (self.etapas, self.duracao, self.tokens_prompt, self.tokens_por_s, self.pedidos, self.cache,
+                        self.inicializacao):
+            linhas.extend(metrica.texto())
+        linhas.extend([
+            "# HELP chatbot_cache_respostas_taxa_acerto Fração das consultas respondidas pelo cache",
+            "# TYPE chatbot_cache_respostas_taxa_acerto gauge",
+            f"chatbot_cache_respostas_taxa_acerto {self.taxa_acerto_cache()}",
+        ])
+        return "\n".join(linhas) + "\n"
+
+
+METRICAS = Metricas()
+
+
+class Rastro:
+    """Tempos das etapas de um pedido, do embedding à decodificação.
+
+    Acompanha o pedido pelas threads por onde ele passa (recuperação,
+    fila, geração). Cada etapa alimenta o histograma na hora; finalizar()
+    registra os demais valores nas métricas e grava uma linha de log em JSON.
+    """
+
+    def __init__(self, amostragem=None, metricas=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.amostrado = random.random() < (AMOSTRAGEM if amostragem is None else amostragem)
+        self.metricas = metricas or METRICAS
+        self.etapas = {}
+        self.valores = {}
+        self.amostra = {}
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(nome, time.perf_counter() - inicio)
+
+    def registrar_etapa(self, nome, segundos):
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + segundos
+        self.metricas.etapas.observar(segundos, etapa=nome)
+
+    def registrar(self, nome, valor):
+        self.valores[nome] = valor
+
+    def amostrar(self, nome, valor):
+        """Guarda `valor` (ids, pontuações) só nos pedidos amostrados."""
+        if self.amostrado:
+            self.amostra[nome] = valor
+
+    def finalizar(self, rota, **campos):
+        total = time.perf_counter() - self._inicio
+        self.metricas.duracao.observar(total, rota=rota)
+        self.metricas.pedidos.incrementar(rota=rota)
+        if 'cache' in self.valores:
+            self.metricas.cache.incrementar(resultado=self.valores['cache'])
+        if 'tokens_prompt' in self.valores:
+            self.metricas.tokens_prompt.observar(self.valores['tokens_prompt'])
+        if 'tokens_por_s' in self.valores:
+            self.metricas.tokens_por_s.observar(self.valores['tokens_por_s'])
+
+        registro = {
+            "rastro": self.id,
+            "rota": rota,
+            "total_ms": round(total * 1000, 3),
+            "etapas_ms": {nome: round(segundos * 1000, 3) for nome, segundos in self.etapas.items()},
+            **self.valores,
+            **campos,
+        }
+        if self.amostra:
+            registro["amostra"] = self.amostra
+        logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+class Inicializacao:
+    """Tempos da inicialização do processo: importações e carga de cada modelo.
+
+    A carga roda em segundo plano, com o servidor já aceitando conexões;
+    `status` vai de "carregando" a "ok" (ou "erro"). Cada etapa alimenta o
+    gauge chatbot_inicializacao_segundos e concluir() grava uma linha de log
+    em JSON com todas elas.
+    """
+
+    def __init__(self, inicio=None, metricas=None):
+        self.metricas = metricas or METRICAS
+        self.etapas = {}
+        self.status = "carregando"
+        self.erro = None
+        self._inicio = time.perf_counter() if inicio is None else inicio
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(nome, time.perf_counter() - inicio)
+
+    def registrar_etapa(self, nome, segundos):
+        self.etapas[nome] = segundos
+        self.metricas.inicializacao.definir(segundos, etapa=nome)
+
+    def concluir(self, erro=None):
+        total = time.perf_counter() - self._inicio
+        self.registrar_etapa('total', total)
+        self.status = "erro" if erro is not None else "ok"
+        self.erro = None if erro is None else str(erro)
+        logger.info(json.dumps({"inicializacao": self.resumo()}, ensure_ascii=False))
+
+    def resumo(self):
+        resumo = {
+            "status": self.status,
+            "etapas_ms": {nome: round(segundos * 1000, 3) for nome, segundos in self.etapas.items()},
+        }
+        if self.erro is not None:
+            resumo["erro"] = self.erro
+        return resumo
+
+
+def etapa(rastro, nome):
+    """rastro.etapa(nome), ou nada se o chamador não passou um rastro.
+
+    Serve também para a Inicializacao.
+    """
+    return rastro.etapa(nome) if rastro is not None else nullcontext()
@@ -1,10 +1,12 @@
 # Função para substituir caracteres especiais com expressões regulares
+import os
 import re
-import nltk
-nltk.download('punkt')
-nltk.download('punkt_tab')
 
-from nltk.tokenize import sent_tokenize
+# Dados do NLTK (tokenizador de sentenças punkt_tab) guardados no projeto,
+# para que os scripts rodem sem rede; são baixados uma única vez por
+# `python recursos.py --baixar`
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NLTK_DATA_PATH = os.path.join(project_root, 'data', 'nltk_data')
 
 # Dicionário para mapear números romanos para ordinais
 mapeamento_romanos_ordinais = {
@@ -43,8 +45,9 @@ mapeamento_romanos_ordinais = {
     'C': 'centésimo'
 }
 
-# Expressão regular que cobre todos os romanos de 1 - 100  
-padrao_romanos = r'\b(M{0,3}|C|XC|XL|L|X{0,3}|IX|IV|V?I{0,3})\b'
+# Algarismos romanos como palavra inteira; nenhuma alternativa casa a
+# string vazia, que antes era encontrada em toda fronteira de palavra
+padrao_romanos = r'\b(M{1,3}|C|XC|XL|L|X{1,3}|IX|IV|V?I{1,3}|V)\b'
 
 # Função para substituir números romanos por ordinais usando regex
 def substituir_numeros_romanos(texto):
@@ -103,6 +106,19 @@ def limpar_sumario_e_imagens(texto):
 
     return texto
 
+def sent_tokenize(texto, language='portuguese'):
+    """sent_tokenize do NLTK, importado no primeiro uso e sem acesso à rede."""
+    import nltk
+
+    if NLTK_DATA_PATH not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_PATH)
+    try:
+        nltk.data.find(f'tokenizers/punkt_tab/{language}/')
+    except LookupError:
+        raise LookupError(f"Tokenizador punkt_tab ({language}) do NLTK não encontrado; "
+                          "rode `python recursos.py --baixar`") from None
+    return nltk.tokenize.sent_tokenize(texto, language=language)
+
 # Chunking baseado em sentenças
 def chunk_por_sentencas(texto, tamanho_max_chars=1200):
     sentencas = sent_tokenize(texto, language='portuguese')
@@ -121,3 +137,64 @@ def chunk_por_sentencas(texto, tamanho_max_chars=1200):
         blocos.append(bloco_atual.strip())
 
     return blocos
+
+# Pontuação que encerra uma sentença; blocos preferem terminar nela
+_FIM_DE_SENTENCA = {'.', ';', ':', '!', '?'}
+
+# Chunking baseado em tokens do próprio encoder
+def chunk_por_tokens(texto, ids, offsets, palavras, max_tokens, sobreposicao=0):
+    """Divide um texto já tokenizado em blocos de até max_tokens tokens.
+
+    Recebe a saída do tokenizador rápido do encoder (ids, offsets de
+    caracteres e word_ids, sem tokens especiais), de modo que o texto é
+    tokenizado uma única vez. Os cortes caem sempre no início de uma palavra
+    e, quando possível, logo após o fim de uma sentença.
+
+    Retorna (conteudo, contexto, ids) por bloco: conteudo é o trecho próprio
+    do bloco (os conteúdos, em ordem, reconstituem o texto); contexto e ids
+    incluem também os `sobreposicao` tokens finais do bloco anterior e são o
+    que deve ser codificado.
+    """
+    n = len(ids)
+    sobreposicao = min(sobreposicao, max_tokens // 2)
+    inicio_palavra = [i == 0 or palavras[i] != palavras[i - 1] for i in range(n)]
+
+    blocos = []
+    inicio = 0
+    while inicio < n:
+        contexto = inicio
+        if blocos and sobreposicao:
+            contexto = max(inicio - sobreposicao, 0)
+            # Sem início de palavra antes do bloco (palavra cortada), fica sem sobreposição
+            while contexto < inicio and not inicio_palavra[contexto]:
+                contexto += 1
+
+        limite = contexto + max_tokens
+        if limite >= n:
+            fim = n
+        else:
+            fim = None
+            ultimo_inicio_palavra = None
+            for p in range(limite, inicio, -1):
+                if not inicio_palavra[p]:
+                    continue
+                if ultimo_inicio_palavra is None:
+                    ultimo_inicio_palavra = p
+                # Fim de sentença só vale se o bloco não ficar curto demais
+                if p - inicio < (limite - inicio) // 2:
+                    break
+                if texto[offsets[p - 1][0]:offsets[p - 1][1]] in _FIM_DE_SENTENCA:
+                    fim = p
+                    break
+            if fim is None:
+                # Palavra maior que o orçamento inteiro: corte no meio dela
+                fim = ultimo_inicio_palavra or limite
+
+        blocos.append((
+            texto[offsets[inicio][0]:offsets[fim - 1][1]],
+            texto[offsets[contexto][0]:offsets[fim - 1][1]],
+            ids[contexto:fim],
+        ))
+        inicio = fim
+
+    return blocos
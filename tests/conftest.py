@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do app são importados como nos scripts, rodando a partir de app/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
@@ -0,0 +1,58 @@
+import numpy as np
+
+from bm25 import IndiceBM25, postings_textos, postings_armazenadas, salvar_bm25, tokenizar
+from recuperacao import fusao_rrf
+
+TEXTOS = [
+    "Matar alguém: pena de reclusão, de seis a vinte anos.",
+    "Subtrair, para si ou para outrem, coisa alheia móvel: pena de reclusão.",
+    "Conceder-se-á habeas corpus sempre que alguém sofrer violência ou coação.",
+    "A prática do racismo constitui crime inafiançável e imprescritível.",
+    "Habeas corpus é ação constitucional; o habeas corpus protege a liberdade de locomoção.",
+]
+
+
+def test_tokenizar_sem_acentos_e_palavras_funcionais():
+    assert tokenizar("A prática do Racismo é inafiançável") == ["pratica", "racismo", "inafiancavel"]
+
+
+def test_salvar_e_buscar(tmp_path):
+    caminho = str(tmp_path / "bm25.bin")
+    # Duas partes consecutivas, como no build incremental
+    salvar_bm25([postings_textos(TEXTOS[:2]), postings_textos(TEXTOS[2:])], caminho)
+    indice = IndiceBM25(caminho)
+
+    assert len(indice) == len(TEXTOS)
+    posicoes, pontuacoes = indice.buscar("habeas corpus", 3)
+    # Mais ocorrências do termo, maior pontuação
+    assert posicoes.tolist() == [4, 2]
+    assert pontuacoes[0] > pontuacoes[1] > 0
+
+    posicoes, _ = indice.buscar("crime inafiançável", 3)
+    assert posicoes.tolist() == [3]
+    posicoes, _ = indice.buscar("reclusão", 1)
+    assert posicoes.tolist() == [0]
+    assert indice.buscar("termo ausente", 3)[0].tolist() == []
+
+    permitidos = np.ones(len(TEXTOS), dtype=bool)
+    permitidos[4] = False
+    posicoes, _ = indice.buscar("habeas corpus", 3, permitidos)
+    assert posicoes.tolist() == [2]
+
+
+def test_postings_armazenadas_reconstroem_o_indice(tmp_path):
+    original = str(tmp_path / "original.bin")
+    salvar_bm25([postings_textos(TEXTOS)], original)
+
+    copia = str(tmp_path / "copia.bin")
+    salvar_bm25([postings_armazenadas(original, 0, 2), postings_textos(TEXTOS[2:4]),
+                 postings_armazenadas(original, 4, 5)], copia)
+    with open(original, 'rb') as a, open(copia, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_fusao_rrf():
+    # 7 está nas duas listas; empates na ordem de aparição
+    assert fusao_rrf([[1, 7, 3], [7, 2]]) == [7, 1, 2, 3]
+    assert fusao_rrf([[5, 6], []]) == [5, 6]
+    assert fusao_rrf([]) == []
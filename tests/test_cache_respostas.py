@@ -0,0 +1,35 @@
+import numpy as np
+
+from cache_respostas import CacheRespostas, resumo_historico
+
+VETOR = np.ones(8, dtype=np.float32)
+IDS = ("cp_1", "cp_2")
+
+
+def test_historicos_diferentes_nao_compartilham_resposta(tmp_path):
+    cache = CacheRespostas(diretorio=str(tmp_path))
+    furto = resumo_historico([("user", "O que é furto?"), ("assistant", "Furto é subtrair coisa alheia móvel.")])
+    roubo = resumo_historico([("user", "O que é roubo?"), ("assistant", "Roubo é subtrair com violência.")])
+
+    cache.guardar("E a pena?", VETOR, IDS, "Reclusão, de um a quatro anos.", "v1", historico=furto)
+
+    assert cache.buscar_exata("e a pena", "v1", historico=furto) == "Reclusão, de um a quatro anos."
+    assert cache.buscar_exata("e a pena", "v1", historico=roubo) is None
+    assert cache.buscar_exata("e a pena", "v1") is None
+    assert cache.buscar_semelhante(VETOR, IDS, "v1", historico=furto) == "Reclusão, de um a quatro anos."
+    assert cache.buscar_semelhante(VETOR, IDS, "v1", historico=roubo) is None
+    assert cache.buscar_semelhante(VETOR, IDS, "v1") is None
+
+
+def test_historico_vazio_e_nova_versao(tmp_path):
+    assert resumo_historico([]) is None
+
+    cache = CacheRespostas(diretorio=str(tmp_path))
+    cache.guardar("O que é furto?", VETOR, IDS, "Subtrair coisa alheia móvel.", "v1")
+    assert cache.buscar_exata("o que e furto", "v1") == "Subtrair coisa alheia móvel."
+    assert cache.buscar_semelhante(VETOR, IDS, "v1") == "Subtrair coisa alheia móvel."
+
+    # Outra instância (outro processo) lê o histórico do disco
+    assert CacheRespostas(diretorio=str(tmp_path)).buscar_semelhante(VETOR, IDS, "v1") == "Subtrair coisa alheia móvel."
+    # Índice reconstruído: o cache é descartado
+    assert cache.buscar_exata("o que e furto", "v2") is None
@@ -0,0 +1,37 @@
+from deduplicacao import deduplicar
+from recuperacao import cabecalho_bloco
+
+INCISOS = " ".join(f"inciso {n}: receita número {n} prevista na lei orçamentária anual" for n in range(1, 21))
+
+
+def _artigo(i, fonte, artigo, conteudo):
+    return {"id": f"{fonte}_{i}", "fonte": fonte, "tipo": "Lei", "artigo": artigo, "conteudo": conteudo}
+
+
+def test_aliases_marcam_copias_exatas_e_quase_copias():
+    artigos = [
+        _artigo(1, "CF", "Artigo 22", INCISOS + " e outras receitas previstas em lei específica."),
+        _artigo(2, "ADCT", "Artigo 3", INCISOS.upper() + " E OUTRAS RECEITAS PREVISTAS EM LEI ESPECÍFICA"),
+        _artigo(3, "EC", "Artigo 1", INCISOS),
+    ]
+    canonicos, aliases = deduplicar(artigos)
+
+    assert [a["id"] for a in canonicos] == ["CF_1"]
+    assert {a["id"]: a["exato"] for a in aliases["CF_1"]} == {"ADCT_2": True, "EC_3": False}
+
+
+def test_cabecalho_separa_mesmo_texto_de_texto_quase_identico():
+    dados = {"tipo": "Lei", "artigo": "Artigo 22", "fonte": "CF", "aliases": [
+        {"artigo": "Artigo 3", "fonte": "ADCT", "exato": True},
+        {"artigo": "Artigo 1", "fonte": "EC", "exato": False},
+        # aliases.json anterior à marcação: não é afirmado como mesmo texto
+        {"artigo": "Artigo 9", "fonte": "EC"},
+    ]}
+    assert cabecalho_bloco(dados) == ("[Lei] Artigo 22 - CF (mesmo texto: Artigo 3 - ADCT; "
+                                      "texto quase idêntico: Artigo 1 - EC; Artigo 9 - EC)")
+
+
+def test_cabecalho_sem_quase_copias():
+    dados = {"tipo": "Lei", "artigo": "Artigo 22", "fonte": "CF",
+             "aliases": [{"artigo": "Artigo 3", "fonte": "ADCT", "exato": True}]}
+    assert cabecalho_bloco(dados) == "[Lei] Artigo 22 - CF (mesmo texto: Artigo 3 - ADCT)"
@@ -0,0 +1,40 @@
+from indice_artigos import construir_indice_artigos, buscar_artigos, detectar_fontes, extrair_artigos
+
+CHUNKS = [
+    {"fonte": "Constituição Federal", "artigo": "Artigo 5", "parte": 1},
+    {"fonte": "Constituição Federal", "artigo": "Artigo 5", "parte": 2},
+    {"fonte": "Constituição Federal", "artigo": "Artigo 15"},
+    {"fonte": "Constituição Federal", "artigo": "Artigo 50"},
+    {"fonte": "Constituição Federal", "artigo": "Artigo 5-A"},
+    {"fonte": "Código Penal", "artigo": "Artigo 5"},
+    {"fonte": "Código Penal", "artigo": "Artigo 7"},
+    {"fonte": "Código Penal", "artigo": "Artigo 121"},
+]
+
+
+def _indice():
+    return construir_indice_artigos(CHUNKS)
+
+
+def test_artigo_nao_casa_com_numeros_ou_sufixos_vizinhos():
+    # 5 em todas as fontes, sem 15, 50 ou 5-A
+    assert buscar_artigos(_indice(), "o que diz o artigo 5?") == [[5], [0, 1]]
+    assert buscar_artigos(_indice(), "art. 5º-A") == [[4]]
+    assert extrair_artigos("artigo 5") == [("5", "")]
+
+
+def test_varios_artigos_da_mesma_fonte():
+    assert buscar_artigos(_indice(), "artigos 5 e 7 do Código Penal") == [[5], [6]]
+
+
+def test_fonte_por_alias():
+    indice = _indice()
+    assert detectar_fontes("artigo 5 da CF", indice["fontes"]) == ["constituicao federal"]
+    assert detectar_fontes("pena no CP", indice["fontes"]) == ["codigo penal"]
+    # "cf" só vale como palavra inteira
+    assert detectar_fontes("artigo 5 da cfx", indice["fontes"]) == []
+    assert buscar_artigos(indice, "artigo 5 da CF") == [[0, 1]]
+
+
+def test_sem_mencao_a_artigo():
+    assert buscar_artigos(_indice(), "o que é legítima defesa?") == []
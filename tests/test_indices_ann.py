@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from indices_ann import criar_index, remover_ids, ids_do_indice
+
+CONFIGS = [
+    {"tipo": "flat"},
+    {"tipo": "flat", "armazenamento": "fp16"},
+    {"tipo": "flat", "armazenamento": "sq8"},
+    {"tipo": "hnsw", "hnsw_m": 16, "ef_construction": 40, "ef_search": 64},
+    {"tipo": "ivf", "nlist": 8, "nprobe": 8},
+    {"tipo": "ivf", "nlist": 8, "nprobe": 8, "pca": 16},
+    {"tipo": "ivfpq", "nlist": 8, "nprobe": 8, "pq_m": 4, "pq_bits": 8},
+]
+
+
+def _vetores(total=400, dimensao=32):
+    vetores = np.random.default_rng(0).standard_normal((total, dimensao)).astype(np.float32)
+    return vetores / np.linalg.norm(vetores, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda c: "-".join(str(v) for v in c.values()))
+def test_remover_ids_preserva_ids_dos_vetores(config):
+    vetores = _vetores()
+    ids = np.arange(len(vetores), dtype=np.int64) * 7 + 3
+    index = criar_index(config, vetores.shape[1], vetores)
+    index.add_with_ids(vetores, ids)
+
+    index = remover_ids(index, ids[:10], config)
+
+    assert index.ntotal == len(vetores) - 10
+    assert sorted(ids_do_indice(index).tolist()) == sorted(ids[10:].tolist())
+    # Cada vetor restante continua sendo encontrado pelo seu próprio id
+    _, I = index.search(vetores[10:], 1)
+    acertos = np.mean(I[:, 0] == ids[10:])
+    assert acertos >= (1.0 if config["tipo"] == 'flat' else 0.9)
+    assert not np.isin(I, ids[:10]).any()
@@ -0,0 +1,46 @@
+import re
+
+import pytest
+
+from normalizacao import normalizar_documento, pares_titulo_conteudo, padrao_segmentacao
+
+# Saídas da sequência de re.sub original do convert_jsonl.py para os casos de
+# borda em que a ordem das regras importa (ver benchmarks/normalizacao.py)
+CASOS = [
+    ("Art. 5º Todos são iguais perante a lei, sem distinção de qualquer natureza",
+     " Artigo  5(o)  Todos são iguais perante lei, sem distinção de qualquer natureza"),
+    ("art. 121. Matar alguém: Pena - reclusão, de seis a vinte anos. § 1º Se o agente",
+     "Artigo. 121. Matar alguém: Pena  reclusão, de seis vinte anos. Parágrafo  1(o)  Se agente"),
+    ("ARTIGO IV, inciso XX, alínea a e o parágrafo único; XIV não é convertido; VI, C, XC, LX",
+     "Artigo quarto, inciso vigésimo, alínea e parágrafo único; XIV não é convertido; "
+     "sexto, centésimo, nonagésimo, LX"),
+    ("Presidência da República Secretaria-Geral Subchefia para Assuntos Jurídicos Página 3 de 10",
+     "   "),
+    ("texto ![figura](img/a.png) meio <!-- image --> fim < image qualquer > fim",
+     "texto  meio <! image > fim  fim"),
+    ("Sumário .......... 12 Título I ..... 3", ""),
+    ("C.C. C.P. C.F. Inc. R$ 10/20 “citação” ‘outra’ — travessão – meia-risca",
+     " Código Civil   Código Penal   Constituição Federal   Inciso   reais  10 de 20  \" citação \"   "
+     "' outra '     travessão    meiarisca"),
+    ("a-b -- c --- d ___ e ... f .-. g ..*.. h #título **negrito** - item",
+     "ab  c  d  e  f  g .... h título negrito  item"),
+    (" o a o  a b o", "o b o"),
+    ("art.IV art.12 Art.12 artigo 7-A e art 8º-B",
+     "ArtigoIV Artigo12  Artigo 12 Artigo 7A e Artigo 8(o) B"),
+    ("", ""),
+    ("Página 1 de 2<image a>12 e Página 3 de 4Presidência da República56 XC<image>.C.P.",
+     " e  décimo Código Civil P."),
+]
+
+
+@pytest.mark.parametrize("texto, esperado", CASOS)
+def test_normalizar_documento(texto, esperado):
+    assert normalizar_documento(texto) == esperado
+
+
+def test_pares_titulo_conteudo_igual_ao_split():
+    texto = normalizar_documento("Lei nº 1. Art. 1º Fica instituído o código. Art. 2º-A Revoga-se. art 3 Fim")
+    blocos = re.split(padrao_segmentacao, texto)
+    esperado = [(blocos[i], blocos[i + 1] if i + 1 < len(blocos) else "") for i in range(1, len(blocos), 2)]
+    assert list(pares_titulo_conteudo(texto)) == esperado
+    assert list(pares_titulo_conteudo("sem artigos")) == []
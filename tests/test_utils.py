@@ -0,0 +1,32 @@
+from utils import chunk_por_tokens
+
+
+def _tokenizar(palavras):
+    """Simula o tokenizador: cada palavra é uma lista de pedaços (tokens)."""
+    texto, ids, offsets, word_ids = "", [], [], []
+    for indice, pedacos in enumerate(palavras):
+        if texto:
+            texto += " "
+        for pedaco in pedacos:
+            offsets.append((len(texto), len(texto) + len(pedaco)))
+            ids.append(len(ids))
+            word_ids.append(indice)
+            texto += pedaco
+    return texto, ids, offsets, word_ids
+
+
+def test_sobreposicao_com_palavra_maior_que_o_orcamento():
+    palavras = [["a"], ["inconstitu", "cional", "issima", "mente", "dito"], ["b"], ["c"], ["d"], ["e"]]
+    texto, ids, offsets, word_ids = _tokenizar(palavras)
+
+    blocos = chunk_por_tokens(texto, ids, offsets, word_ids, 4, sobreposicao=2)
+
+    # O contexto de cada bloco termina no seu conteúdo e começa no início de
+    # uma palavra ou, se a palavra foi cortada, no próprio conteúdo
+    fim = 0
+    for conteudo, contexto, ids_bloco in blocos:
+        assert conteudo and contexto.endswith(conteudo)
+        assert len(ids_bloco) <= 4
+        assert ids_bloco[0] <= fim <= ids_bloco[-1]
+        fim = ids_bloco[-1] + 1
+    assert fim == len(ids)